@@ -5,13 +5,18 @@ import sys
 import marshmallow as ma
 from flask import Flask
 from webargs.flaskparser import FlaskParser
+from werkzeug.middleware.proxy_fix import ProxyFix
 
-from . import routes
+from . import notifications, routes
 from .extensions import api  # Api interface module
 from .extensions import db  # SQLAlchemy instance
 from .extensions import flaat  # Flask authentication with tokens
 from .extensions import mail  # Mail ext. to send notifications
 from .extensions import migrate  # Alembic ext. manage db migrations
+from .utils import metrics  # Prometheus metrics of the requests
+from .utils import pool  # Database connection pool configuration
+from .utils import ratelimit  # Rate limiter of the client requests
+from .utils import slowlog  # Log of the slow SQL statements
 
 #: Raise ValidationError when unknown fields in query
 FlaskParser.DEFAULT_UNKNOWN_BY_LOCATION["query"] = ma.RAISE
@@ -76,9 +81,13 @@ def create_app(config_base="backend.settings", **settings_override):
     app = Flask(__name__.split(".")[0])
     app.config.from_object(config_base)
     app.config.update(**settings_override)
-    app.wsgi_app = ReverseProxied(app.wsgi_app)
+    app.wsgi_app = ProxyFix(  # Client address from trusted proxies
+        ReverseProxied(app.wsgi_app), x_for=app.config['PROXY_FIX_X_FOR'],
+        x_proto=0, x_host=0,
+    )
     register_extensions(app)
     register_blueprints(app)
+    register_commands(app)
     configure_logger(app)
     return app
 
@@ -86,10 +95,14 @@ def create_app(config_base="backend.settings", **settings_override):
 def register_extensions(app):
     """Register Flask extensions."""
     api.init_app(app)
+    pool.init_app(app)
     db.init_app(app)
     migrate.init_app(app, db)
     flaat.init_app(app)
     mail.init_app(app)
+    metrics.init_app(app)
+    ratelimit.init_app(app)
+    slowlog.init_app(app)
 
 
 def register_blueprints(app):
@@ -99,10 +112,21 @@ def register_blueprints(app):
     api.register_blueprint(routes.results.blp, url_prefix='/results')
     api.register_blueprint(routes.sites.blp, url_prefix='/sites')
     api.register_blueprint(routes.flavors.blp, url_prefix='/flavors')
+    api.register_blueprint(
+        routes.leaderboards.blp, url_prefix='/leaderboards',
+    )
+    api.register_blueprint(
+        routes.slow_queries.blp, url_prefix='/slow_queries',
+    )
     api.register_blueprint(routes.tags.blp, url_prefix='/tags')
     api.register_blueprint(routes.users.blp, url_prefix='/users')
 
 
+def register_commands(app):
+    """Register Flask command line groups."""
+    app.cli.add_command(notifications.cli)
+
+
 def configure_logger(app):
     """Configure loggers."""
     handler = logging.StreamHandler(sys.stdout)
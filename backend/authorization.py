@@ -1,28 +1,86 @@
-"""Authorization rules for the backend."""
+"""Authorization rules for the backend.
+
+The identity of the request user is resolved at most once per request:
+the user infos of the access token, the database user and the admin
+rights are kept on :data:`flask.g` until the request ends. Between
+requests, flaat already keeps the user infos of the recent tokens.
+"""
 from flaat.config import AccessLevel
+from flaat.flask import Flaat as BaseFlaat
 from flaat.requirements import IsTrue
-from flask import current_app
+from flask import current_app, g
 
 from backend import models
 
 
+class Flaat(BaseFlaat):
+    """Flaat extension keeping the user infos for the request."""
+
+    def init_app(self, app):
+        """Initialize the extension and clear the identity on teardown."""
+        super().init_app(app)
+        app.teardown_request(clear_cache)
+
+    def get_user_infos_from_access_token(self, access_token, *args):
+        """Return the user infos of an access token, once per request.
+
+        :param access_token: The access token of the user
+        :type access_token: str
+        :return: All the infos that could be retrieved or None
+        :rtype: :class:`flaat.user_infos.UserInfos`
+        """
+        request_cache = g.setdefault('user_infos', {})
+        if access_token not in request_cache:
+            user_infos = super().get_user_infos_from_access_token(
+                access_token, *args
+            )
+            request_cache[access_token] = user_infos
+        return request_cache[access_token]
+
+
+def clear_cache(exception=None):
+    """Remove the identity resolved for the request."""
+    for key in ['user_infos', 'users', 'admins']:
+        g.pop(key, None)
+
+
+def current_user(user_infos):
+    """Return the database user of the token, read once per request.
+
+    :param user_infos: Infos of the request access token
+    :type user_infos: :class:`flaat.user_infos.UserInfos`
+    :return: The registered user or None
+    :rtype: :class:`models.User`
+    """
+    users = g.setdefault('users', {})
+    subiss = user_infos.subject, user_infos.issuer
+    if subiss not in users:
+        users[subiss] = models.User.read(subiss)
+    return users[subiss]
+
+
 def is_registered(user_infos):
     """Assert user is registered in the database."""
-    user = models.User.read((user_infos.subject, user_infos.issuer))
-    return user is not None
+    return current_user(user_infos) is not None
 
 
 def is_admin(user_infos):
     """Assert registration and entitlements."""
+    admins = g.setdefault('admins', {})
+    subiss = user_infos.subject, user_infos.issuer
+    if subiss in admins:
+        return admins[subiss]
+
     if 'eduperson_entitlement' in user_infos.user_info:
         entitlements = set(user_infos.user_info['eduperson_entitlement'])
     else:
         entitlements = set()
-    return all([
+    admins[subiss] = all([
         (entitlements & set(current_app.config['ADMIN_ENTITLEMENTS']) or
          not current_app.config['ADMIN_ENTITLEMENTS']),
         is_registered(user_infos),
     ])
+    return admins[subiss]
 
 
 access_levels = [
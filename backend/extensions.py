@@ -10,7 +10,6 @@ Each extension requires of a specific class initialization which is
 lately initialized in the application factory using the settings and
 configurations from the environment.
 """
-from flaat.flask import Flaat
 from flask_mailman import Mail
 from flask_migrate import Migrate
 from flask_smorest import Api
@@ -19,7 +18,7 @@ from flask_sqlalchemy import SQLAlchemy
 from backend import authorization
 
 #: Flask extension that provides support for handling oidc Access Tokens
-flaat = Flaat(authorization.access_levels)
+flaat = authorization.Flaat(authorization.access_levels)
 
 #: Flask framework library for creating REST APIs (i.e. OpenAPI)
 api = Api()
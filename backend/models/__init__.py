@@ -23,21 +23,31 @@ main accessible properties. Some tables such as results_tags or
 report_association are built-in tables automatically generated by the
 corresponding mixin (i.e. report.NeedsApprove)
 """
+from .models import version
 from .models.benchmark import Benchmark
 from .models.flavor import Flavor
+from .models.leaderboard import Leaderboard, LeaderboardEntry
+from .models.notification import Notification
 from .models.reports import Claim, Submit
 from .models.result import Result
 from .models.site import Site
+from .models.slow_query import SlowQuery
 from .models.tag import Tag
 from .models.user import User
 
+version.track(Result.metadata)  # After all the tables are defined
+
 __all__ = [
     "Benchmark",
     "Claim",
     "Submit",
     "Result",
     "Site",
+    "SlowQuery",
     "Flavor",
+    "Leaderboard",
+    "LeaderboardEntry",
+    "Notification",
     "Tag",
     "User"
 ]
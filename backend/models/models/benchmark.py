@@ -2,11 +2,13 @@
 import jsonschema
 from flask_smorest import abort
 from jsonschema.exceptions import SchemaError
-from sqlalchemy import Column, ForeignKeyConstraint, Text, UniqueConstraint
-from sqlalchemy.dialects.postgresql import JSON
-from sqlalchemy.orm import column_property
+from sqlalchemy import (Column, Computed, ForeignKeyConstraint, Index, Text,
+                        UniqueConstraint)
+from sqlalchemy.dialects.postgresql import JSON, TSVECTOR
+from sqlalchemy.orm import column_property, deferred
 
 from ..core import PkModel
+from . import validators
 from .reports import NeedsApprove
 from .user import HasUploader
 
@@ -48,10 +50,18 @@ class Benchmark(NeedsApprove, HasUploader, PkModel):
     #: (Text) Short text describing the main benchmark features
     description = Column(Text, nullable=True)
 
+    #: (TSVECTOR, read_only) Text search vector of image, tag and description
+    search_vector = deferred(Column(TSVECTOR, Computed(
+        "to_tsvector('simple', docker_image || ' ' || docker_tag || ' ' || "
+        "coalesce(description, ''))", persisted=True,
+    )))
+
     __table_args__ = (
         UniqueConstraint('docker_image', 'docker_tag'),
         ForeignKeyConstraint(['uploader_iss', 'uploader_sub'],
                              ['user.iss', 'user.sub']),
+        Index('ix_benchmark_search_vector', 'search_vector',
+              postgresql_using='gin'),
     )
 
     def __init__(self, **properties):
@@ -63,6 +73,20 @@ class Benchmark(NeedsApprove, HasUploader, PkModel):
             abort(422, messages={'error': err.message, 'path': f"{err.path}"})
         super().__init__(**properties)
 
+    def update(self, properties):
+        """Update the benchmark and invalidate its cached validators.
+
+        :param properties: Values to set on the model properties
+        :type properties: dict
+        """
+        super().update(properties)
+        validators.invalidate(self.id)
+
+    def delete(self):
+        """Delete the benchmark and invalidate its cached validators."""
+        super().delete()
+        validators.invalidate(self.id)
+
     def __repr__(self) -> str:
         """Human-readable representation string."""
         return "<{} {}:{}>".format(
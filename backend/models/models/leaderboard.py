@@ -0,0 +1,355 @@
+"""Leaderboard module with the rankings of flavors on a result metric.
+
+Ranking flavors by a value inside the result JSON would require to
+extract, cast and aggregate the value of every result on each request.
+Instead, the score of each flavor is kept on a summary table which is
+updated by database triggers with the results created, deleted, claimed
+or restored on each statement, see :data:`apply`. Count, sum, minimum
+and maximum are updated with the changed values; the median, and the
+minimum or maximum when the current one is removed, are aggregated
+again from the results of the flavor, see :data:`refresh`.
+"""
+import enum
+
+from sqlalchemy import (DDL, Boolean, Column, Enum, Float, ForeignKey, Index,
+                        Integer, Text, case, event, func, select)
+from sqlalchemy.orm import backref, column_property, relationship
+
+from ...extensions import db
+from ..core import BaseCRUD, PkModel
+from .result import Result
+
+
+class Aggregation(enum.Enum):
+    """Enum with the aggregations available to score the flavors."""
+
+    min = 1
+    max = 2
+    mean = 3
+    median = 4
+
+
+class Leaderboard(PkModel):
+    """Leaderboard model.
+
+    The Leaderboard model represents a ranking, defined by the
+    administrators, of the flavors used to execute a benchmark. Each
+    flavor is scored aggregating a numeric path of its results JSON.
+
+    **Properties**:
+    """
+
+    #: (Text, required) Name of the leaderboard
+    name = Column(Text, nullable=False)
+
+    #: (Text) Text with useful information for users
+    description = Column(Text, nullable=True)
+
+    #: (Benchmark.id, required) Id of the benchmark of the ranked results
+    benchmark_id = Column(ForeignKey('benchmark.id'), nullable=False)
+
+    #: (Benchmark, required) Benchmark of the ranked results
+    benchmark = relationship("Benchmark", backref=backref(
+        "_leaderboards", cascade="all, delete-orphan",
+    ))
+
+    #: (Text, required) Path of the numeric value, '.' as delimiter
+    path = Column(Text, nullable=False)
+
+    #: (Aggregation, required) Aggregation of the values of each flavor
+    aggregation = Column(Enum(Aggregation), nullable=False)
+
+    #: (Bool) Rank first the flavors with the highest score
+    descending = Column(Boolean, nullable=False, default=True)
+
+    #: ([LeaderboardEntry]) Scores of the flavors on the leaderboard
+    entries = relationship(
+        "LeaderboardEntry", back_populates="leaderboard",
+        cascade="all, delete-orphan", passive_deletes=True,
+    )
+
+    def __init__(self, **properties):
+        """Model initialization."""
+        super().__init__(**properties)
+
+    def __repr__(self) -> str:
+        """Human-readable representation string."""
+        return "<{} {}>".format(self.__class__.__name__, self.name)
+
+    def refresh(self):
+        """Calculate again the scores of all the flavors."""
+        db.session.flush()
+        db.session.execute(select(func.leaderboard_refresh(self.id, None)))
+        db.session.expire(self, ['entries'])
+
+
+class LeaderboardEntry(BaseCRUD):
+    """Leaderboard entry model.
+
+    The LeaderboardEntry model represents the score and rank of a flavor
+    on a leaderboard. Entries are written only by :data:`apply` and
+    :data:`refresh`, the rank is calculated when reading, see
+    :data:`ranking`.
+
+    **Properties**:
+    """
+
+    #: (Leaderboard.id, required) Id of the leaderboard
+    leaderboard_id = Column(
+        ForeignKey('leaderboard.id', ondelete="CASCADE"), primary_key=True,
+    )
+
+    #: (Leaderboard, required) Leaderboard of the entry
+    leaderboard = relationship("Leaderboard", back_populates="entries")
+
+    #: (Flavor.id, required) Id of the scored flavor
+    flavor_id = Column(
+        ForeignKey('flavor.id', ondelete="CASCADE"), primary_key=True,
+    )
+
+    #: (Flavor, required) Scored flavor
+    flavor = relationship("Flavor")
+
+    #: (Site, read_only) Site of the scored flavor
+    site = relationship(
+        "Site", secondary="flavor", uselist=False, viewonly=True,
+    )
+
+    #: (Float, required) Aggregated value of the flavor results
+    value = Column(Float, nullable=False)
+
+    #: (Int, required) Number of results aggregated
+    count = Column(Integer, nullable=False)
+
+    #: (Float, required) Sum of the values, to update the mean
+    total = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index('ix_leaderboard_entry_rank', 'leaderboard_id', 'value'),
+    )
+
+    def __repr__(self) -> str:
+        """Human-readable representation string."""
+        return "<{} {}: {}>".format(
+            self.__class__.__name__, self.flavor_id, self.value,
+        )
+
+
+_entry, _board = LeaderboardEntry.__table__.alias(), Leaderboard.__table__
+
+#: Subquery with the rank of the entries on the leaderboard of the outer
+#: entry, a leaderboard has few entries so ranking them is cheap.
+ranking = select(
+    _entry.c.flavor_id, func.rank().over(order_by=case(
+        (_board.c.descending, -_entry.c.value), else_=_entry.c.value,
+    )).label('rank'),
+).join(_board, _board.c.id == _entry.c.leaderboard_id).where(
+    _entry.c.leaderboard_id == LeaderboardEntry.leaderboard_id,
+).correlate(LeaderboardEntry.__table__).subquery()
+
+#: (Int, read_only) Position of the flavor, equal scores share rank
+LeaderboardEntry.rank = column_property(select(ranking.c.rank).where(
+    ranking.c.flavor_id == LeaderboardEntry.flavor_id,
+).scalar_subquery())
+
+
+#: Function upserting the scores of a leaderboard, only for the indicated
+#: flavors or for all of them when flavors is NULL. Entries of flavors
+#: without results left are deleted.
+refresh = DDL("""
+CREATE OR REPLACE FUNCTION leaderboard_refresh(board_id uuid, flavors uuid[])
+RETURNS void AS $$
+DECLARE
+    board RECORD;
+    path text[];
+BEGIN
+    SELECT * INTO board FROM leaderboard WHERE id = board_id;
+    path := string_to_array(board.path, '.');
+
+    -- Concurrent uploads of a flavor refresh its score in turns, so the
+    -- last one aggregates the results committed by the others.
+    PERFORM pg_advisory_xact_lock(hashtextextended(board.id || flavor, 0))
+    FROM unnest(flavors::text[]) AS flavor ORDER BY flavor;
+
+    INSERT INTO leaderboard_entry AS entry
+        (leaderboard_id, flavor_id, value, count, total)
+    SELECT board.id, item.flavor_id, CASE board.aggregation
+            WHEN 'min' THEN min(item.value)
+            WHEN 'max' THEN max(item.value)
+            WHEN 'mean' THEN avg(item.value)
+            ELSE percentile_cont(0.5) WITHIN GROUP (ORDER BY item.value)
+        END, count(*), sum(item.value)
+    FROM (
+        SELECT flavor_id, (json #>> path)::float AS value FROM result
+        WHERE benchmark_id = board.benchmark_id AND NOT deleted
+            AND jsonb_typeof(json #> path) = 'number'
+            AND (flavors IS NULL OR flavor_id = ANY(flavors))
+    ) AS item
+    GROUP BY item.flavor_id
+    ON CONFLICT (leaderboard_id, flavor_id) DO UPDATE
+        SET value = excluded.value, count = excluded.count,
+            total = excluded.total
+        WHERE (entry.value, entry.count, entry.total) IS DISTINCT FROM
+            (excluded.value, excluded.count, excluded.total);
+
+    DELETE FROM leaderboard_entry AS entry WHERE leaderboard_id = board.id
+        AND (flavors IS NULL OR flavor_id = ANY(flavors))
+        AND NOT EXISTS (
+            SELECT FROM result
+            WHERE benchmark_id = board.benchmark_id AND NOT deleted
+                AND flavor_id = entry.flavor_id
+                AND jsonb_typeof(json #> path) = 'number'
+        );
+END $$ LANGUAGE plpgsql;
+""")
+
+event.listen(
+    LeaderboardEntry.__table__, "after_create",
+    refresh.execute_if(dialect="postgresql"),
+)
+event.listen(
+    LeaderboardEntry.__table__, "before_drop",
+    DDL("DROP FUNCTION IF EXISTS leaderboard_refresh(uuid, uuid[])").
+    execute_if(dialect="postgresql"),
+)
+
+
+#: Function updating the scores of the leaderboards with the results
+#: added and removed by a statement. The running count, total, minimum
+#: and maximum are updated with the changed values, other cases call
+#: :data:`refresh` for the flavor.
+apply = DDL("""
+CREATE OR REPLACE FUNCTION leaderboard_apply(added result[], removed result[])
+RETURNS void AS $$
+DECLARE
+    board RECORD;
+    delta RECORD;
+    entry RECORD;
+    path text[];
+BEGIN
+    FOR board IN
+        SELECT * FROM leaderboard WHERE benchmark_id IN (
+            SELECT benchmark_id FROM unnest(added)
+            UNION SELECT benchmark_id FROM unnest(removed)
+        ) ORDER BY id
+    LOOP
+        path := string_to_array(board.path, '.');
+        FOR delta IN
+            SELECT item.flavor_id,
+                sum(item.sign) AS count, sum(item.sign * item.value) AS total,
+                min(item.value) FILTER (WHERE item.sign > 0) AS low,
+                max(item.value) FILTER (WHERE item.sign > 0) AS high,
+                min(item.value) FILTER (WHERE item.sign < 0) AS removed_low,
+                max(item.value) FILTER (WHERE item.sign < 0) AS removed_high
+            FROM (
+                SELECT flavor_id, 1 AS sign, (json #>> path)::float AS value
+                FROM unnest(added) WHERE benchmark_id = board.benchmark_id
+                    AND NOT deleted AND jsonb_typeof(json #> path) = 'number'
+                UNION ALL
+                SELECT flavor_id, -1, (json #>> path)::float
+                FROM unnest(removed) WHERE benchmark_id = board.benchmark_id
+                    AND NOT deleted AND jsonb_typeof(json #> path) = 'number'
+            ) AS item
+            GROUP BY item.flavor_id ORDER BY item.flavor_id
+        LOOP
+            -- Same lock as refresh, so updates apply on the last score.
+            PERFORM pg_advisory_xact_lock(
+                hashtextextended(board.id || delta.flavor_id::text, 0)
+            );
+            SELECT * INTO entry FROM leaderboard_entry
+            WHERE leaderboard_id = board.id AND flavor_id = delta.flavor_id;
+            IF NOT FOUND OR board.aggregation = 'median'
+                    OR (board.aggregation = 'min'
+                        AND delta.removed_low <= entry.value)
+                    OR (board.aggregation = 'max'
+                        AND delta.removed_high >= entry.value) THEN
+                PERFORM leaderboard_refresh(board.id, ARRAY[delta.flavor_id]);
+            ELSIF entry.count + delta.count <= 0 THEN
+                DELETE FROM leaderboard_entry WHERE leaderboard_id = board.id
+                    AND flavor_id = delta.flavor_id;
+            ELSIF delta.count <> 0 OR delta.low IS NOT NULL THEN
+                UPDATE leaderboard_entry SET
+                    count = entry.count + delta.count,
+                    total = entry.total + delta.total,
+                    value = CASE board.aggregation
+                        WHEN 'min' THEN least(entry.value, delta.low)
+                        WHEN 'max' THEN greatest(entry.value, delta.high)
+                        ELSE (entry.total + delta.total)
+                            / (entry.count + delta.count)
+                    END
+                WHERE leaderboard_id = board.id
+                    AND flavor_id = delta.flavor_id;
+            END IF;
+        END LOOP;
+    END LOOP;
+END $$ LANGUAGE plpgsql;
+""")
+
+event.listen(
+    LeaderboardEntry.__table__, "after_create",
+    apply.execute_if(dialect="postgresql"),
+)
+event.listen(
+    LeaderboardEntry.__table__, "before_drop",
+    DDL("DROP FUNCTION IF EXISTS leaderboard_apply(result[], result[])").
+    execute_if(dialect="postgresql"),
+)
+
+
+#: Statement triggers applying to the leaderboards the results inserted,
+#: deleted or updated on the json, deleted (claims), benchmark or flavor
+#: columns, only rows of benchmarks with leaderboards are collected.
+sync_leaderboards = DDL("""
+CREATE OR REPLACE FUNCTION result_sync_leaderboards() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM leaderboard_apply(ARRAY(
+            SELECT n::result FROM new_rows AS n
+            WHERE n.benchmark_id IN (SELECT benchmark_id FROM leaderboard)
+        ), '{}');
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM leaderboard_apply('{}', ARRAY(
+            SELECT o::result FROM old_rows AS o
+            WHERE o.benchmark_id IN (SELECT benchmark_id FROM leaderboard)
+        ));
+    ELSE
+        PERFORM leaderboard_apply(ARRAY(
+            SELECT n::result FROM old_rows AS o JOIN new_rows AS n USING (id)
+            WHERE (o.json, o.deleted, o.benchmark_id, o.flavor_id)
+                IS DISTINCT FROM
+                (n.json, n.deleted, n.benchmark_id, n.flavor_id)
+                AND n.benchmark_id IN (SELECT benchmark_id FROM leaderboard)
+        ), ARRAY(
+            SELECT o::result FROM old_rows AS o JOIN new_rows AS n USING (id)
+            WHERE (o.json, o.deleted, o.benchmark_id, o.flavor_id)
+                IS DISTINCT FROM
+                (n.json, n.deleted, n.benchmark_id, n.flavor_id)
+                AND o.benchmark_id IN (SELECT benchmark_id FROM leaderboard)
+        ));
+    END IF;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE TRIGGER result_insert_leaderboards
+    AFTER INSERT ON result REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE PROCEDURE result_sync_leaderboards();
+
+CREATE TRIGGER result_delete_leaderboards
+    AFTER DELETE ON result REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE PROCEDURE result_sync_leaderboards();
+
+CREATE TRIGGER result_update_leaderboards
+    AFTER UPDATE ON result
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE PROCEDURE result_sync_leaderboards();
+""")
+
+event.listen(
+    Result.__table__, "after_create",
+    sync_leaderboards.execute_if(dialect="postgresql"),
+)
+event.listen(
+    Result.__table__, "before_drop",
+    DDL("DROP FUNCTION IF EXISTS result_sync_leaderboards() CASCADE").
+    execute_if(dialect="postgresql"),
+)
@@ -0,0 +1,82 @@
+"""Notification module with the outbox of email notifications."""
+import enum
+from datetime import datetime as dt
+
+from sqlalchemy import Column, DateTime, Enum, Index, Integer, Text, text
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+
+from ..core import PkModel
+
+
+class DeliveryStatus(enum.Enum):
+    """Enum with the possible delivery status of a notification."""
+
+    pending = 1
+    sent = 2
+    failed = 3
+
+
+class Notification(PkModel):
+    """Notification model.
+
+    The Notification model represents an email waiting on the outbox to
+    be delivered. Notifications are written in the same transaction as
+    the change they notify and sent later by the notifications
+    dispatcher, see :func:`backend.notifications.dispatch`.
+
+    **Properties**:
+    """
+
+    #: (Text, required) Email subject
+    subject = Column(Text, nullable=False)
+
+    #: (Text, required) Email body
+    body = Column(Text, nullable=False)
+
+    #: (Text, required) Email sender
+    from_email = Column(Text, nullable=False)
+
+    #: ([Text], required) Email recipients
+    to = Column(ARRAY(Text), nullable=False, default=[])
+
+    #: ([Text], required) Email carbon copy recipients
+    cc = Column(ARRAY(Text), nullable=False, default=[])
+
+    #: (JSON, required) Email extra headers
+    headers = Column(JSONB, nullable=False, default={})
+
+    #: (DeliveryStatus) Delivery status of the notification
+    status = Column(
+        Enum(DeliveryStatus), nullable=False,
+        default=DeliveryStatus.pending,
+    )
+
+    #: (Integer) Number of failed delivery attempts
+    attempts = Column(Integer, nullable=False, default=0)
+
+    #: (Text) Error raised on the last failed delivery attempt
+    error = Column(Text, nullable=True)
+
+    #: (ISO8601, read_only) Datetime the notification was created
+    created_datetime = Column(DateTime, nullable=False, default=dt.now)
+
+    #: (ISO8601) Datetime from which the next delivery can be attempted
+    next_attempt = Column(DateTime, nullable=False, default=dt.now)
+
+    #: (ISO8601) Datetime the notification was delivered
+    sent_datetime = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index(
+            'ix_notification_pending', 'next_attempt',
+            postgresql_where=text("status = 'pending'"),
+        ),
+    )
+
+    def __repr__(self) -> str:
+        """Human-readable representation string."""
+        return "<{} {}: {}>".format(
+            self.__class__.__name__,
+            self.status.name if self.status else None,
+            self.subject,
+        )
@@ -0,0 +1,86 @@
+"""Promoted module with the registry of indexed result JSON paths.
+
+Filtering or sorting results by a value inside the result JSON requires
+to extract and cast the value from every row. Paths frequently used on
+the filters of a benchmark can be promoted, so a typed expression index
+is created for the results of such benchmark and the filters and
+sorting on the path are compiled into the same indexed expression.
+
+To promote a path, add an entry to :data:`registry` and write the
+database migration of the deployment by hand: ``flask db migrate``
+cannot reflect expression indexes and skips them with a warning. Print
+the statement of each promoted index from ``flask shell``::
+
+    from sqlalchemy.schema import CreateIndex
+    from backend.extensions import db
+    from backend.models import Result
+    for index in Result.__table__.indexes:
+        if index.name.startswith("ix_result_promoted_"):
+            print(CreateIndex(index).compile(db.engine))
+
+Then create a revision with ``flask db revision`` and run the statement
+concurrently, so uploads are not blocked while the index is built::
+
+    def upgrade():
+        with op.get_context().autocommit_block():
+            op.execute(
+                "CREATE INDEX CONCURRENTLY ix_result_promoted_<digest> "
+                "ON result (CAST(json #>> '{time}' AS FLOAT)) "
+                "WHERE benchmark_id = '<benchmark_id>'"
+            )
+
+    def downgrade():
+        op.drop_index('ix_result_promoted_<digest>', table_name='result')
+
+Removing a path from :data:`registry` needs the reverse migration.
+"""
+import hashlib
+from collections import namedtuple
+
+from sqlalchemy import Boolean, Float, Index
+
+#: Types available to promote a path and the cast to apply on the value
+types = {"number": Float, "boolean": Boolean, "string": None}
+
+#: Promoted path, the benchmark id is a string with the benchmark UUID,
+#: the path a tuple of keys and the type one of :data:`types`.
+PromotedPath = namedtuple("PromotedPath", ["benchmark_id", "path", "type"])
+
+#: List of promoted paths (:class:`PromotedPath`)
+registry = []
+
+
+def lookup(benchmark_id, path):
+    """Return the promoted type of a benchmark path or None."""
+    if benchmark_id is None:
+        return None
+    for promoted in registry:
+        if promoted.benchmark_id == str(benchmark_id) and \
+                tuple(promoted.path) == tuple(path):
+            return promoted.type
+    return None
+
+
+def expression(json, path, type):
+    """Return the typed expression indexed for a promoted path."""
+    element = json[tuple(path)].astext
+    return element if types[type] is None else element.cast(types[type])
+
+
+def indexes(json, benchmark_id):
+    """Return the expression indexes for the registry promoted paths."""
+    return [
+        Index(
+            index_name(promoted),
+            expression(json, promoted.path, promoted.type),
+            postgresql_where=benchmark_id == promoted.benchmark_id,
+        )
+        for promoted in registry
+    ]
+
+
+def index_name(promoted):
+    """Return an unique and stable index name for a promoted path."""
+    key = f"{promoted.benchmark_id}:{'.'.join(promoted.path)}"
+    digest = hashlib.sha1(key.encode()).hexdigest()[:12]  # nosec
+    return f"ix_result_promoted_{digest}"
@@ -1,17 +1,14 @@
 """Models module package for main models definition."""
-import jsonschema
 from flask_smorest import abort
 from jsonschema.exceptions import ValidationError
-from sqlalchemy import (Column, DateTime, ForeignKey, ForeignKeyConstraint,
-                        select)
-from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy.orm import backref, column_property, relationship
+from sqlalchemy import (DDL, Column, DateTime, FetchedValue, ForeignKey,
+                        ForeignKeyConstraint, Index, Text, event, text)
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy.orm import backref, deferred, query_expression, relationship
 
 from ..core import PkModel
-from .benchmark import Benchmark
-from .flavor import Flavor
+from . import promoted, validators
 from .reports import HasClaims
-from .site import Site
 from .tag import HasTags
 from .user import HasUploader
 
@@ -30,6 +27,10 @@ class Result(HasClaims, HasTags, HasUploader, PkModel):
     #: (JSON, required) Benchmark execution results
     json = Column(JSONB, nullable=False)
 
+    #: (JSON, read_only) Subtrees of json selected by a query, see
+    #: :func:`backend.utils.queries.json_projection`
+    json_projection = query_expression()
+
     #: (ISO8601, required) Benchmark execution **START**
     execution_datetime = Column(DateTime, nullable=False)
 
@@ -40,9 +41,11 @@ class Result(HasClaims, HasTags, HasUploader, PkModel):
     benchmark = relationship("Benchmark", backref=backref(
         "_results", cascade="all, delete-orphan"
     ))
-    benchmark_name = column_property(
-        select([Benchmark.name]).where(Benchmark.id == benchmark_id).
-        scalar_subquery()
+
+    #: (Text, read_only) Benchmark name, kept in sync by :data:`sync_names`
+    benchmark_name = Column(
+        Text, nullable=False,
+        server_default=FetchedValue(), server_onupdate=FetchedValue(),
     )
 
     #: (Conflicts Flavor) Id of the flavor used to executed the benchmark
@@ -52,9 +55,11 @@ class Result(HasClaims, HasTags, HasUploader, PkModel):
     flavor = relationship("Flavor", backref=backref(
         "_results", cascade="all, delete-orphan",
     ))
-    flavor_name = column_property(
-        select([Flavor.name]).where(Flavor.id == flavor_id).
-        scalar_subquery()
+
+    #: (Text, read_only) Flavor name, kept in sync by :data:`sync_names`
+    flavor_name = Column(
+        Text, nullable=False,
+        server_default=FetchedValue(), server_onupdate=FetchedValue(),
     )
 
     #: (Collected from flavor) Id of the site where the benchmar was executed
@@ -64,18 +69,40 @@ class Result(HasClaims, HasTags, HasUploader, PkModel):
     site = relationship("Site", backref=backref(
         "_results", cascade="all, delete-orphan"
     ))
-    site_name = column_property(
-        select([Site.name]).where(Site.id == site_id).
-        scalar_subquery()
+
+    #: (Text, read_only) Site name, kept in sync by :data:`sync_names`
+    site_name = Column(
+        Text, nullable=False,
+        server_default=FetchedValue(), server_onupdate=FetchedValue(),
     )
-    site_address = column_property(
-        select([Site.address]).where(Site.id == site_id).
-        scalar_subquery()
+
+    #: (Text, read_only) Site address, kept in sync by :data:`sync_names`
+    site_address = Column(
+        Text, nullable=False,
+        server_default=FetchedValue(), server_onupdate=FetchedValue(),
     )
 
+    #: (TSVECTOR, read_only) Search vector of names and tags, see
+    #: :data:`sync_search`
+    search_vector = deferred(Column(
+        TSVECTOR, nullable=False,
+        server_default=FetchedValue(), server_onupdate=FetchedValue(),
+    ))
+
     __table_args__ = (
         ForeignKeyConstraint(['uploader_iss', 'uploader_sub'],
                              ['user.iss', 'user.sub']),
+        Index('ix_result_search_vector', 'search_vector',
+              postgresql_using='gin'),
+        Index(
+            'ix_result_json_path_ops', json, postgresql_using='gin',
+            postgresql_ops={'json': 'jsonb_path_ops'},
+        ),
+        Index(
+            'ix_result_benchmark_flavor', 'benchmark_id', 'flavor_id',
+            postgresql_where=text("NOT deleted"),
+        ),
+        *promoted.indexes(json, benchmark_id),
     )
 
     def __init__(self, site=None, site_id=None, **properties):
@@ -86,7 +113,7 @@ class Result(HasClaims, HasTags, HasUploader, PkModel):
         """
         benchmark, json = properties['benchmark'], properties['json']
         try:
-            jsonschema.validate(json, schema=benchmark.json_schema)
+            validators.validate(benchmark, json)
         except ValidationError as err:
             abort(422, messages={'error': err.message, 'path': f"{err.path}"})
 
@@ -100,3 +127,130 @@ class Result(HasClaims, HasTags, HasUploader, PkModel):
     def __repr__(self) -> str:
         """Human-readable representation string."""
         return "<{} {}>".format(self.__class__.__name__, self.json)
+
+
+#: Triggers copying the benchmark, flavor and site names into the result
+#: columns on insert and when the referenced items are renamed, so results
+#: can be sorted and searched by name without joins or subqueries.
+sync_names = DDL("""
+CREATE OR REPLACE FUNCTION result_sync_names() RETURNS trigger AS $$
+BEGIN
+    SELECT docker_image || ':' || docker_tag INTO NEW.benchmark_name
+        FROM benchmark WHERE id = NEW.benchmark_id;
+    SELECT name INTO NEW.flavor_name
+        FROM flavor WHERE id = NEW.flavor_id;
+    SELECT name, address INTO NEW.site_name, NEW.site_address
+        FROM site WHERE id = NEW.site_id;
+    RETURN NEW;
+END $$ LANGUAGE plpgsql;
+
+CREATE TRIGGER result_sync_names
+    BEFORE INSERT OR UPDATE OF benchmark_id, flavor_id, site_id ON result
+    FOR EACH ROW EXECUTE PROCEDURE result_sync_names();
+
+CREATE OR REPLACE FUNCTION benchmark_sync_names() RETURNS trigger AS $$
+BEGIN
+    UPDATE result
+        SET benchmark_name = NEW.docker_image || ':' || NEW.docker_tag
+        WHERE benchmark_id = NEW.id;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE TRIGGER benchmark_sync_names
+    AFTER UPDATE OF docker_image, docker_tag ON benchmark
+    FOR EACH ROW EXECUTE PROCEDURE benchmark_sync_names();
+
+CREATE OR REPLACE FUNCTION flavor_sync_names() RETURNS trigger AS $$
+BEGIN
+    UPDATE result SET flavor_name = NEW.name WHERE flavor_id = NEW.id;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE TRIGGER flavor_sync_names
+    AFTER UPDATE OF name ON flavor
+    FOR EACH ROW EXECUTE PROCEDURE flavor_sync_names();
+
+CREATE OR REPLACE FUNCTION site_sync_names() RETURNS trigger AS $$
+BEGIN
+    UPDATE result SET site_name = NEW.name, site_address = NEW.address
+        WHERE site_id = NEW.id;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE TRIGGER site_sync_names
+    AFTER UPDATE OF name, address ON site
+    FOR EACH ROW EXECUTE PROCEDURE site_sync_names();
+""")
+
+event.listen(
+    Result.__table__, "after_create",
+    sync_names.execute_if(dialect="postgresql"),
+)
+
+
+#: Triggers computing the result text search vector from the benchmark,
+#: flavor and site names and the result tags names when any of them
+#: changes. Defined after the tags association table is created.
+sync_search = DDL("""
+CREATE OR REPLACE FUNCTION result_search_vector(item result)
+RETURNS tsvector AS $$
+    SELECT to_tsvector('simple', concat_ws(' ',
+        item.benchmark_name, item.site_name, item.site_address,
+        item.flavor_name, (
+            SELECT string_agg(tag.name, ' ') FROM result_tags
+            JOIN tag ON tag.id = result_tags.tag_id
+            WHERE result_tags.result_id = item.id
+        )
+    ))
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION result_sync_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := result_search_vector(NEW);
+    RETURN NEW;
+END $$ LANGUAGE plpgsql;
+
+CREATE TRIGGER result_sync_vector
+    BEFORE INSERT OR UPDATE OF
+        benchmark_name, flavor_name, site_name, site_address ON result
+    FOR EACH ROW EXECUTE PROCEDURE result_sync_vector();
+
+CREATE OR REPLACE FUNCTION result_tags_sync_vector() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        UPDATE result SET search_vector = result_search_vector(result)
+            WHERE id = OLD.result_id;
+    ELSE
+        UPDATE result SET search_vector = result_search_vector(result)
+            WHERE id = NEW.result_id;
+    END IF;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE TRIGGER result_tags_sync_vector
+    AFTER INSERT OR DELETE ON result_tags
+    FOR EACH ROW EXECUTE PROCEDURE result_tags_sync_vector();
+
+CREATE OR REPLACE FUNCTION tag_sync_vector() RETURNS trigger AS $$
+BEGIN
+    UPDATE result SET search_vector = result_search_vector(result)
+        WHERE id IN (
+            SELECT result_id FROM result_tags WHERE tag_id = NEW.id
+        );
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE TRIGGER tag_sync_vector
+    AFTER UPDATE OF name ON tag
+    FOR EACH ROW EXECUTE PROCEDURE tag_sync_vector();
+""")
+
+event.listen(
+    Result.metadata.tables["result_tags"], "after_create",
+    sync_search.execute_if(dialect="postgresql"),
+)
+event.listen(
+    Result.__table__, "before_drop",
+    DDL("DROP FUNCTION IF EXISTS result_search_vector(result)").
+    execute_if(dialect="postgresql"),
+)
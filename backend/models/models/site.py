@@ -1,6 +1,7 @@
 """Sites module."""
-from sqlalchemy import Column, ForeignKeyConstraint, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Computed, ForeignKeyConstraint, Index, Text
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred, relationship
 
 from ..core import PkModel
 from .reports import NeedsApprove
@@ -29,9 +30,17 @@ class Site(NeedsApprove, HasUploader, PkModel):
         cascade="all, delete-orphan",
     )
 
+    #: (TSVECTOR, read_only) Search vector of name, address and description
+    search_vector = deferred(Column(TSVECTOR, Computed(
+        "to_tsvector('simple', name || ' ' || address || ' ' || "
+        "coalesce(description, ''))", persisted=True,
+    )))
+
     __table_args__ = (
         ForeignKeyConstraint(['uploader_iss', 'uploader_sub'],
                              ['user.iss', 'user.sub']),
+        Index('ix_site_search_vector', 'search_vector',
+              postgresql_using='gin'),
     )
 
     def __init__(self, **properties):
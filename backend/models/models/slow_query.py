@@ -0,0 +1,53 @@
+"""Slow query module with the statements exceeding the time threshold."""
+from datetime import datetime as dt
+
+from sqlalchemy import Column, DateTime, Float, Integer, Text
+from sqlalchemy.dialects.postgresql import JSONB
+
+from ..core import BaseCRUD
+
+
+class SlowQuery(BaseCRUD):
+    """Slow query model.
+
+    The SlowQuery model represents an SQL statement executed by an API
+    operation which took longer than SLOW_QUERY_THRESHOLD. Executions
+    of the same statement by the same operation are accumulated on a
+    single record, which keeps the parameters and plan of the slowest
+    one. Records are written by :mod:`backend.utils.slowlog`.
+
+    **Properties**:
+    """
+
+    #: (Text, required) Hash of the operation and statement
+    fingerprint = Column(Text, primary_key=True)
+
+    #: (Text, required) OperationId of the route executing the statement
+    operation = Column(Text, nullable=False)
+
+    #: (Text, required) SQL statement with parameter placeholders
+    statement = Column(Text, nullable=False)
+
+    #: (JSON, required) Parameters of the slowest execution
+    parameters = Column(JSONB, nullable=False, default={})
+
+    #: (JSON) Estimated EXPLAIN plan of the slowest execution
+    plan = Column(JSONB(none_as_null=True), nullable=True)
+
+    #: (Int, required) Number of slow executions
+    calls = Column(Integer, nullable=False, default=1)
+
+    #: (Float, required) Milliseconds spent on all the slow executions
+    total_time = Column(Float, nullable=False)
+
+    #: (Float, required) Milliseconds spent on the slowest execution
+    max_time = Column(Float, nullable=False)
+
+    #: (ISO8601, read_only) Datetime of the last slow execution
+    last_datetime = Column(DateTime, nullable=False, default=dt.now)
+
+    def __repr__(self) -> str:
+        """Human-readable representation string."""
+        return "<{} {}: {}>".format(
+            self.__class__.__name__, self.operation, self.max_time,
+        )
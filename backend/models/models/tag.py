@@ -8,7 +8,8 @@ shared among all parents.
 See examples/generic_associations/table_per_association at the sqlalchemy
 documentation.
 """
-from sqlalchemy import Column, ForeignKey, Table, Text
+from sqlalchemy import (Column, ForeignKey, Index, Table, Text, distinct, func,
+                        select)
 from sqlalchemy.ext.associationproxy import association_proxy
 from sqlalchemy.ext.declarative import declared_attr
 from sqlalchemy.orm import relationship
@@ -57,9 +58,12 @@ class HasTags(object):
                 primary_key=True),
             Column(
                 "tag_id", ForeignKey("tag.id", ondelete="CASCADE"),
-                primary_key=True)
+                primary_key=True),
+            Index(f"ix_{name}_tags_tag_id", "tag_id", f"{name}_id"),
+        )
+        return relationship(
+            Tag, secondary=tag_association, order_by=Tag.name,
         )
-        return relationship(Tag, secondary=tag_association)
 
     @declared_attr
     def tags_ids(self):
@@ -70,3 +74,30 @@ class HasTags(object):
     def tags_names(self):
         """([Tag.name], read_only) List of associated tag as only names."""
         return association_proxy('tags', 'name')
+
+    @classmethod
+    def tagged(cls, tags_ids, mode="all"):
+        """Return a condition to select the items with the indicated tags.
+
+        The condition is a single semi-join on the association table,
+        grouped by item when all the tags are required.
+
+        :param tags_ids: Ids of the tags to match
+        :type tags_ids: [uuid]
+        :param mode: Match items with "all" or "any" of the tags
+        :type mode: str
+        :return: Condition to use on the model query filter
+        :rtype: :class:`sqlalchemy.sql.expression.BinaryExpression`
+        """
+        tags_ids = set(tags_ids)
+        association = cls.tags.property.secondary
+        item_id = association.c[f"{cls.__tablename__}_id"]
+        tag_id = association.c["tag_id"]
+        items = select(item_id).where(tag_id.in_(tags_ids))
+        if mode == "all":
+            items = items.group_by(item_id).having(
+                func.count(distinct(tag_id)) == len(tags_ids)
+            )
+        elif mode != "any":
+            raise ValueError(f"Unknown tags mode '{mode}'")
+        return cls.id.in_(items)
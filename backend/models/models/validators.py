@@ -0,0 +1,90 @@
+"""Validators module with the cache of compiled benchmark JSON Schemas.
+
+Validating a result against the benchmark JSON Schema requires to check
+the schema and compile it into a validator. As results are uploaded much
+more often than benchmarks change, the compiled validators are kept on a
+process-wide LRU cache keyed by the benchmark id.
+
+The cache is invalidated for a benchmark when it is updated or deleted,
+see :meth:`Benchmark.update` and :meth:`Benchmark.delete`. As other
+workers may update the benchmark, each entry keeps the schema it was
+compiled from and it is only returned while it equals the benchmark one.
+"""
+import threading
+from collections import OrderedDict
+
+import jsonschema
+from prometheus_client import Counter, Histogram
+
+#: Maximum number of compiled validators kept in the cache
+maxsize = 128
+
+#: Seconds spent validating each result, compiling the schema if missing
+validation_time = Histogram(
+    "json_schema_validation_seconds",
+    "Seconds spent validating a result against the benchmark JSON Schema",
+)
+
+#: Number of lookups on the validators cache by result (hit or miss)
+lookups = Counter(
+    "json_schema_validator_lookups",
+    "Lookups on the compiled JSON Schema validators cache", ["result"],
+)
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def get(benchmark):
+    """Return the compiled validator for the benchmark JSON Schema.
+
+    :param benchmark: Benchmark which results to validate
+    :type benchmark: :class:`backend.models.Benchmark`
+    :return: Validator for the benchmark JSON Schema
+    :rtype: :class:`jsonschema.protocols.Validator`
+    """
+    schema = benchmark.json_schema
+    with _lock:
+        entry = _cache.get(benchmark.id)
+        if entry is not None and (entry[0] is schema or entry[0] == schema):
+            _cache.move_to_end(benchmark.id)
+            lookups.labels("hit").inc()
+            return entry[1]
+    lookups.labels("miss").inc()
+
+    validator = jsonschema.validators.validator_for(schema)(schema)
+    with _lock:
+        _cache[benchmark.id] = schema, validator
+        _cache.move_to_end(benchmark.id)
+        while len(_cache) > maxsize:
+            _cache.popitem(last=False)
+    return validator
+
+
+def validate(benchmark, instance):
+    """Validate an instance against the benchmark JSON Schema.
+
+    :param benchmark: Benchmark which JSON Schema to validate against
+    :type benchmark: :class:`backend.models.Benchmark`
+    :param instance: Result JSON to validate
+    :type instance: dict
+    :raises ValidationError: The instance does not pass the schema
+    """
+    with validation_time.time():
+        get(benchmark).validate(instance)
+
+
+def invalidate(benchmark_id):
+    """Remove the cached validator of a benchmark.
+
+    :param benchmark_id: Id of the benchmark to remove from the cache
+    :type benchmark_id: :class:`uuid.UUID`
+    """
+    with _lock:
+        _cache.pop(benchmark_id, None)
+
+
+def clear():
+    """Remove all the cached validators."""
+    with _lock:
+        _cache.clear()
@@ -0,0 +1,83 @@
+"""Version module with the version counters of the database tables.
+
+Each tracked table has counters on :data:`versions` incremented by a
+statement trigger on every insert, update, delete or truncate. The
+counter is updated in the same transaction as the change, so readers
+see the new version together with the new rows. Responses built from
+a set of tables can be identified by the versions of those tables,
+see :func:`backend.utils.queries.add_etag`.
+
+The counter row stays locked until the transaction commits, so each
+table has :data:`slots` counters and every database session increments
+only the one of its backend process. The version of a table is the sum
+of its counters.
+"""
+from sqlalchemy import (DDL, BigInteger, Column, SmallInteger, Table, Text,
+                        cast, event, func, select)
+
+from ...extensions import db
+
+#: Number of version counters of each tracked table
+slots = 16
+
+#: Table with the version counters of each tracked table
+versions = Table(
+    "table_version", db.metadata,
+    Column("name", Text, primary_key=True),
+    Column("slot", SmallInteger, primary_key=True),
+    Column("version", BigInteger, nullable=False),
+)
+
+#: Tables without version counter
+untracked = {
+    "notification", "query_cache", "rate_limit", "slow_query",
+    "table_version",
+}
+
+#: Trigger incrementing a table version counter on each modifying statement
+version_trigger = DDL("""
+CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO table_version (name, slot, version)
+        VALUES (TG_TABLE_NAME, pg_backend_pid() %% %(slots)s, 1)
+        ON CONFLICT (name, slot)
+        DO UPDATE SET version = table_version.version + 1;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE TRIGGER table_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %(fullname)s
+    FOR EACH STATEMENT EXECUTE PROCEDURE bump_table_version();
+""", context={'slots': slots})
+
+
+def track(metadata):
+    """Attach the version trigger to the tracked metadata tables."""
+    for table in metadata.tables.values():
+        if table.name not in untracked:
+            event.listen(
+                table, "after_create",
+                version_trigger.execute_if(dialect="postgresql"),
+            )
+
+
+def current(names):
+    """Return the current version of the indicated tables.
+
+    :param names: Names of the tables
+    :type names: list
+    :return: Version of each table, 0 for tables never modified
+    :rtype: dict
+    """
+    statement = select(
+        versions.c.name, cast(func.sum(versions.c.version), BigInteger),
+    ).where(versions.c.name.in_(names)).group_by(versions.c.name)
+    found = dict(db.session.execute(statement).all())
+    return {name: found.get(name, 0) for name in sorted(names)}
+
+
+event.listen(
+    versions, "before_drop",
+    DDL("DROP FUNCTION IF EXISTS bump_table_version() CASCADE").
+    execute_if(dialect="postgresql"),
+)
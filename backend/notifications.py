@@ -1,8 +1,32 @@
-"""Module with notification definitions for users and admins."""
+"""Module with notification definitions for users and admins.
+
+Notifications are not sent inside the requests, they are written into
+the outbox (:class:`backend.models.Notification`) in the same database
+transaction as the change they notify. The notifications dispatcher,
+started with ``flask notifications dispatch``, sends the pending
+notifications in batches over a single SMTP connection and retries
+the failed deliveries with an exponential backoff.
+"""
+import time
+from datetime import datetime as dt
+from datetime import timedelta
 from functools import wraps
 
+import click
 from flask import current_app
+from flask.cli import AppGroup
 from flask_mailman import EmailMessage
+from prometheus_client import Histogram
+
+from . import models
+from .extensions import db, mail
+from .models.models.notification import DeliveryStatus
+
+#: Seconds spent sending each notification email by delivery status
+send_time = Histogram(
+    "notifications_send_seconds", "Seconds spent sending a notification",
+    ["status"],
+)
 
 
 def warning_if_fail(notification):
@@ -18,6 +42,100 @@ def warning_if_fail(notification):
     return decorated
 
 
+def enqueue(subject, body, to, cc=None, headers=None):
+    """Add a notification to the outbox on the current transaction.
+
+    :param subject: Email subject
+    :type subject: str
+    :param body: Email body
+    :type body: str
+    :param to: Email recipients
+    :type to: list
+    :param cc: Email carbon copy recipients, defaults to None
+    :type cc: list, optional
+    :param headers: Email extra headers, defaults to None
+    :type headers: dict, optional
+    :return: The notification added to the outbox
+    :rtype: :class:`models.Notification`
+    """
+    notification = models.Notification(
+        subject=subject, body=body,
+        from_email=current_app.config["MAIL_FROM"],
+        to=to, cc=cc or [], headers=headers or {},
+    )
+    db.session.add(notification)
+    return notification
+
+
+def dispatch():
+    """Send a batch of pending notifications from the outbox.
+
+    The notifications are locked so multiple dispatchers do not send
+    the same notification. Failed deliveries are retried after
+    NOTIFICATIONS_RETRY_DELAY seconds, doubled on each attempt, and
+    marked as failed after NOTIFICATIONS_MAX_ATTEMPTS.
+
+    :return: Number of notifications processed
+    :rtype: int
+    """
+    config, now = current_app.config, dt.now()
+    pending = models.Notification.query.filter(
+        models.Notification.status == DeliveryStatus.pending,
+        models.Notification.next_attempt <= now,
+    ).order_by(models.Notification.next_attempt).limit(
+        config['NOTIFICATIONS_BATCH_SIZE']
+    ).with_for_update(skip_locked=True).all()
+    if not pending:
+        db.session.commit()
+        return 0
+
+    connection = mail.get_connection()
+    try:
+        connection.open()
+        for notification in pending:
+            start = time.perf_counter()
+            try:
+                EmailMessage(
+                    subject=notification.subject,
+                    body=notification.body,
+                    from_email=notification.from_email,
+                    to=notification.to, cc=notification.cc,
+                    headers=notification.headers,
+                    connection=connection,
+                ).send()
+            except Exception as err:  # noqa: B902
+                send_time.labels("failed").observe(time.perf_counter() - start)
+                __failed(notification, err, now)
+            else:
+                send_time.labels("sent").observe(time.perf_counter() - start)
+                notification.status = DeliveryStatus.sent
+                notification.sent_datetime = dt.now()
+                notification.error = None
+    except Exception as err:  # noqa: B902
+        for notification in pending:
+            if notification.status == DeliveryStatus.pending:
+                __failed(notification, err, now)
+    finally:
+        connection.close()
+
+    db.session.commit()
+    return len(pending)
+
+
+def __failed(notification, error, now):
+    """Record a failed delivery and schedule the next attempt."""
+    config = current_app.config
+    notification.attempts += 1
+    notification.error = f"{error}"
+    if notification.attempts >= config['NOTIFICATIONS_MAX_ATTEMPTS']:
+        notification.status = DeliveryStatus.failed
+    else:
+        delay = config['NOTIFICATIONS_RETRY_DELAY']
+        delay = delay * 2 ** (notification.attempts - 1)
+        notification.next_attempt = now + timedelta(seconds=delay)
+    current_app.logger.warning(f"{notification}: {error}")
+
+
 # -------------------------------------------------------------------
 # User welcome ------------------------------------------------------
 user_welcome_body = """
@@ -34,12 +152,11 @@ perf-support
 @warning_if_fail
 def user_welcome(user):
     """Email user after registration."""
-    return EmailMessage(
+    return enqueue(
         subject="Thank you for registering",
         body=user_welcome_body,
-        from_email=current_app.config["MAIL_FROM"],
         to=[user.email],
-    ).send()
+    )
 
 
 # -------------------------------------------------------------------
@@ -58,12 +175,11 @@ perf-support
 @warning_if_fail
 def email_updated(user):
     """Send an email notification to the user when information is updated."""
-    return EmailMessage(
+    return enqueue(
         subject="Your user information was updated",
         body=email_update_body,
-        from_email=current_app.config["MAIL_FROM"],
         to=[user.email],
-    ).send()
+    )
 
 
 # -------------------------------------------------------------------
@@ -86,14 +202,13 @@ perf-support
 def resource_submitted(resource):
     """Email user a resource is submitted."""
     resource_type = resource.submit_report.resource_type
-    return EmailMessage(
+    return enqueue(
         subject=f"New {resource_type} resource submitted: {resource.id}",
         body=resource_submitted_body.format(resource=resource),
         headers={"Resource-ID": f"{resource.id}"},
-        from_email=current_app.config["MAIL_FROM"],
         to=[resource.uploader.email],
         cc=[current_app.config["MAIL_SUPPORT"]],
-    ).send()
+    )
 
 
 # -------------------------------------------------------------------
@@ -114,14 +229,13 @@ perf-support
 @warning_if_fail
 def resource_approved(resource):
     """Email user a resource is approved."""
-    return EmailMessage(
+    return enqueue(
         subject=f"Resource approved: {resource.id}",
         body=resource_approved_body.format(resource=resource),
         headers={"Resource-ID": f"{resource.id}"},
-        from_email=current_app.config["MAIL_FROM"],
         to=[resource.uploader.email],
         cc=[current_app.config["MAIL_SUPPORT"]],
-    ).send()
+    )
 
 
 # -------------------------------------------------------------------
@@ -144,14 +258,13 @@ perf-support
 @warning_if_fail
 def resource_rejected(uploader, resource):
     """Email user a resource is rejected."""
-    return EmailMessage(
+    return enqueue(
         subject=f"Resource rejected: {resource.id}",
         body=resource_rejected_body.format(resource=resource),
         headers={"Resource-ID": f"{resource.id}"},
-        from_email=current_app.config["MAIL_FROM"],
         to=[uploader.email],
         cc=[current_app.config["MAIL_SUPPORT"]],
-    ).send()
+    )
 
 
 # -------------------------------------------------------------------
@@ -176,14 +289,13 @@ perf-support
 @warning_if_fail
 def result_claimed(result, claim):
     """Email user a result is claimed."""
-    return EmailMessage(
+    return enqueue(
         subject=f"Claim submitted on result: {result.id}",
         body=result_claimed_body.format(result=result, claim=claim),
         headers={"Result-ID": f"{result.id}", "Claim-ID": f"{claim.id}"},
-        from_email=current_app.config["MAIL_FROM"],
         to=[result.uploader.email],
         cc=[current_app.config["MAIL_SUPPORT"]],
-    ).send()
+    )
 
 
 # -------------------------------------------------------------------
@@ -205,11 +317,28 @@ perf-support
 @warning_if_fail
 def result_restored(result):
     """Email user a result is restored."""
-    return EmailMessage(
+    return enqueue(
         subject=f"Result restored: {result.id}",
         body=result_restored_body.format(result=result),
-        headers={"Result-ID": result.id},
-        from_email=current_app.config["MAIL_FROM"],
+        headers={"Result-ID": f"{result.id}"},
         to=[result.uploader.email],
         cc=[current_app.config["MAIL_SUPPORT"]],
-    ).send()
+    )
+
+
+# -------------------------------------------------------------------
+# Notifications dispatcher ------------------------------------------
+#: Command line group to manage the notifications outbox
+cli = AppGroup("notifications", help="Manage the notifications outbox.")
+
+
+@cli.command("dispatch")
+@click.option("--once", is_flag=True, help="Send a single batch and exit.")
+def dispatch_command(once):
+    """Send the pending notifications from the outbox."""
+    while True:
+        count = dispatch()
+        if once:
+            break
+        if count == 0:
+            time.sleep(current_app.config['NOTIFICATIONS_POLL_INTERVAL'])
@@ -4,15 +4,14 @@ Benchmark URL routes. Collection of controller methods to create and
 operate existing benchmarks on the database.
 """
 from flask_smorest import Blueprint, abort
-from sqlalchemy import or_
 from sqlalchemy.exc import IntegrityError
 
 import backend.utils.imagerepo as imagerepo
 
-from .. import models, notifications
+from .. import authorization, models, notifications
 from ..extensions import db, flaat
 from ..schemas import args, schemas
-from ..utils import queries
+from ..utils import filters, queries, ratelimit
 
 blp = Blueprint(
     'benchmarks', __name__, description='Operations on benchmarks'
@@ -26,6 +25,7 @@ resource_url = "/<uuid:benchmark_id>"
 @blp.doc(operationId='ListBenchmarks')
 @blp.arguments(args.BenchmarkFilter, location='query')
 @blp.response(200, schemas.Benchmarks)
+@queries.add_etag(models.Benchmark, schemas.Benchmark)
 @queries.to_pagination()
 @queries.add_sorting(models.Benchmark)
 @queries.add_datefilter(models.Benchmark)
@@ -54,6 +54,7 @@ def __list(query_args):
 
 @blp.route(collection_url, methods=["POST"])
 @blp.doc(operationId='CreateBenchmark')
+@ratelimit.cost(5)
 @flaat.access_level("user")
 @flaat.inject_user_infos()
 @blp.arguments(schemas.CreateBenchmark)
@@ -89,17 +90,17 @@ def __create(body_args, user_infos):
         error_msg = f"Could not validate container image: {err}"
         abort(422, messages={'error': error_msg})
 
-    subiss = user_infos.subject, user_infos.issuer
-    body_args['uploader'] = models.User.read(subiss)
+    body_args['uploader'] = authorization.current_user(user_infos)
     benchmark = models.Benchmark.create(body_args)
 
     try:  # Transaction execution
+        db.session.flush()
+        notifications.resource_submitted(benchmark)
         db.session.commit()
     except IntegrityError:
         error_msg = f"Benchmark {image}:{tag} already submitted/exists"
         abort(409, messages={'error': error_msg})
 
-    notifications.resource_submitted(benchmark)
     return benchmark
 
 
@@ -114,10 +115,11 @@ def search(*args, **kwargs):
     """(Public) Filter and list benchmarks.
 
     Use this method to get a list of benchmarks based on a general search
-    of terms. For example, calling this method with terms=v1&terms=0
-    returns all benchmarks with 'v1' and '0' on the 'docker_image',
-    'docker_tag' or 'description' fields. The response returns a
-    pagination object with the filtered benchmarks (if succeeds).
+    of terms. For example, calling this method with terms=v1&terms=b0
+    returns all benchmarks with words starting by 'v1' and 'b0' on the
+    'docker_image', 'docker_tag' or 'description' fields, most relevant
+    first. The response returns a pagination object with the filtered
+    benchmarks (if succeeds).
     """
     return __search(*args, **kwargs)
 
@@ -126,10 +128,11 @@ def __search(query_args):
     """Filter and list benchmarks using generic terms.
 
     Use this method to get a list of benchmarks based on a general search
-    of terms. For example, calling this method with terms=v1&terms=0
-    returns all benchmarks with 'v1' and '0' on the 'docker_image',
-    'docker_tag' or 'description' fields. The response returns a
-    pagination object with the filtered benchmarks (if succeeds).
+    of terms. For example, calling this method with terms=v1&terms=b0
+    returns all benchmarks with words starting by 'v1' and 'b0' on the
+    'docker_image', 'docker_tag' or 'description' fields, most relevant
+    first. The response returns a pagination object with the filtered
+    benchmarks (if succeeds).
     ---
 
     :param query_args: The request query arguments as python dictionary
@@ -138,14 +141,10 @@ def __search(query_args):
     :return: Pagination object with filtered benchmarks
     :rtype: :class:`flask_sqlalchemy.Pagination`
     """
-    search = models.Benchmark.query
-    for keyword in query_args.pop('terms'):
-        search = search.filter(
-            or_(
-                models.Benchmark.docker_image.contains(keyword),
-                models.Benchmark.docker_tag.contains(keyword),
-                models.Benchmark.description.contains(keyword)
-            ))
+    search = filters.text_search(
+        models.Benchmark.query, models.Benchmark.search_vector,
+        query_args.pop('terms'),
+    )
     return search.filter_by(**query_args)
 
 
@@ -294,13 +293,12 @@ def __approve(benchmark_id):
         abort(422, messages={'error': error_msg})
 
     try:  # Transaction execution
+        notifications.resource_approved(benchmark)
         db.session.commit()
     except IntegrityError:
         error_msg = f"Conflict deleting {benchmark_id}"
         abort(409, messages={'error': error_msg})
 
-    notifications.resource_approved(benchmark)
-
 
 @blp.route(resource_url + ":reject", methods=["POST"])
 @blp.doc(operationId='RejectBenchmark')
@@ -338,9 +336,8 @@ def __reject(benchmark_id):
         abort(422, messages={'error': error_msg})
 
     try:  # Transaction execution
+        notifications.resource_rejected(uploader, benchmark)
         db.session.commit()
     except IntegrityError:
         error_msg = f"Conflict deleting {benchmark_id}"
         abort(409, messages={'error': error_msg})
-
-    notifications.resource_rejected(uploader, benchmark)
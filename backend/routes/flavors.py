@@ -9,6 +9,7 @@ from sqlalchemy.exc import IntegrityError
 from .. import models, notifications
 from ..extensions import db, flaat
 from ..schemas import schemas
+from ..utils import queries
 
 blp = Blueprint(
     'flavors', __name__, description='Operations on flavors'
@@ -21,6 +22,7 @@ resource_url = "/<uuid:flavor_id>"
 @blp.route(resource_url, methods=["GET"])
 @blp.doc(operationId='GetFlavor')
 @blp.response(200, schemas.Flavor)
+@queries.add_etag(models.Flavor, schemas.Flavor)
 def get(*args, **kwargs):
     """(Public) Retrieve flavor details.
 
@@ -161,13 +163,12 @@ def __approve(flavor_id):
         abort(422, messages={'error': error_msg})
 
     try:  # Transaction execution
+        notifications.resource_approved(flavor)
         db.session.commit()
     except IntegrityError:
         error_msg = f"Conflict deleting {flavor_id}"
         abort(409, messages={'error': error_msg})
 
-    notifications.resource_approved(flavor)
-
 
 @blp.route(resource_url + ":reject", methods=["POST"])
 @blp.doc(operationId='RejectFlavor')
@@ -205,13 +206,12 @@ def __reject(flavor_id):
         abort(422, messages={'error': error_msg})
 
     try:  # Transaction execution
+        notifications.resource_rejected(uploader, flavor)
         db.session.commit()
     except IntegrityError:
         error_msg = f"Conflict deleting {flavor_id}"
         abort(409, messages={'error': error_msg})
 
-    notifications.resource_rejected(uploader, flavor)
-
 
 @blp.route(resource_url + '/site', methods=["GET"])
 @blp.response(200, schemas.Site)
@@ -0,0 +1,197 @@
+"""Routes for leaderboards.
+
+Leaderboard URL routes. Collection of controller methods to define
+rankings of flavors on a result metric and to read their entries.
+"""
+from flask_smorest import Blueprint, abort
+from sqlalchemy.exc import IntegrityError
+
+from .. import models
+from ..extensions import db, flaat
+from ..schemas import args, schemas
+from ..utils import queries
+
+blp = Blueprint(
+    'leaderboards', __name__, description='Operations on leaderboards'
+)
+
+collection_url = ""
+resource_url = "/<uuid:leaderboard_id>"
+
+
+@blp.route(collection_url, methods=["GET"])
+@blp.doc(operationId='ListLeaderboards')
+@blp.arguments(args.LeaderboardFilter, location='query')
+@blp.response(200, schemas.Leaderboards)
+@queries.add_etag(models.Leaderboard, schemas.Leaderboard)
+@queries.to_pagination()
+@queries.add_sorting(models.Leaderboard)
+def list(*args, **kwargs):
+    """(Public) Filter and list leaderboards.
+
+    Use this method to get a list of leaderboards filtered according to
+    your requirements. The response returns a pagination object with
+    the filtered leaderboards (if succeeds).
+    """
+    return __list(*args, **kwargs)
+
+
+def __list(query_args):
+    """Return a list of filtered leaderboards.
+
+    :param query_args: The request query arguments as python dictionary
+    :type query_args: dict
+    :raises UnprocessableEntity: Wrong query/body parameters
+    :return: Pagination object with filtered leaderboards
+    :rtype: :class:`flask_sqlalchemy.Pagination`
+    """
+    return models.Leaderboard.query.filter_by(**query_args)
+
+
+@blp.route(collection_url, methods=["POST"])
+@blp.doc(operationId='CreateLeaderboard')
+@flaat.access_level("admin")
+@blp.arguments(schemas.CreateLeaderboard)
+@blp.response(201, schemas.Leaderboard)
+def create(*args, **kwargs):
+    """(Admins) Create a new leaderboard.
+
+    Use this method to rank the flavors used to execute a benchmark by
+    the aggregation of a numeric field of their results. The scores are
+    calculated on creation and kept up to date as results change. The
+    method returns the created leaderboard (if succeeds).
+    """
+    return __create(*args, **kwargs)
+
+
+def __create(body_args):
+    """Create a new leaderboard in the database.
+
+    :param body_args: The request body arguments as python dictionary
+    :type body_args: dict
+    :raises Unauthorized: The server could not verify the user identity
+    :raises Forbidden: The user has not the required privileges
+    :raises NotFound: The benchmark does not exist in the database
+    :raises UnprocessableEntity: Wrong query/body parameters
+    :raises Conflict: Created object conflicts a database item
+    :return: The leaderboard created into the database.
+    :rtype: :class:`models.Leaderboard`
+    """
+    benchmark_id = body_args.pop('benchmark_id')
+    benchmark = models.Benchmark.read(benchmark_id)
+    if benchmark is None:
+        error_msg = f"Benchmark {benchmark_id} not in database"
+        abort(404, messages={'error': error_msg})
+    leaderboard = models.Leaderboard.create(
+        dict(benchmark=benchmark, **body_args)
+    )
+
+    try:  # Transaction execution
+        leaderboard.refresh()
+        db.session.commit()
+    except IntegrityError:
+        error_msg = "Integrity error"
+        abort(409, messages={'error': error_msg})
+
+    return leaderboard
+
+
+@blp.route(resource_url, methods=["GET"])
+@blp.doc(operationId='GetLeaderboard')
+@blp.response(200, schemas.Leaderboard)
+def get(*args, **kwargs):
+    """(Public) Retrieve leaderboard details.
+
+    Use this method to retrieve a specific leaderboard from the database.
+    """
+    return __get(*args, **kwargs)
+
+
+def __get(leaderboard_id):
+    """Return the id matching leaderboard.
+
+    If no leaderboard exists with the indicated id, then 404 NotFound
+    exception is raised.
+
+    :param leaderboard_id: The id of the leaderboard to retrieve
+    :type leaderboard_id: uuid
+    :raises NotFound: No leaderboard with id found
+    :return: The database leaderboard using the described id
+    :rtype: :class:`models.Leaderboard`
+    """
+    leaderboard = models.Leaderboard.read(leaderboard_id)
+    if leaderboard is None:
+        error_msg = f"Record {leaderboard_id} not found in the database"
+        abort(404, messages={'error': error_msg})
+    else:
+        return leaderboard
+
+
+@blp.route(resource_url, methods=["DELETE"])
+@blp.doc(operationId='DeleteLeaderboard')
+@flaat.access_level("admin")
+@blp.response(204)
+def delete(*args, **kwargs):
+    """(Admins) Delete an existing leaderboard.
+
+    Use this method to delete a specific leaderboard and its entries
+    from the database.
+    """
+    return __delete(*args, **kwargs)
+
+
+def __delete(leaderboard_id):
+    """Delete the id matching leaderboard.
+
+    If no leaderboard exists with the indicated id, then 404 NotFound
+    exception is raised.
+
+    :param leaderboard_id: The id of the leaderboard to delete
+    :type leaderboard_id: uuid
+    :raises Unauthorized: The server could not verify the user identity
+    :raises Forbidden: The user has not the required privileges
+    :raises NotFound: No leaderboard with id found
+    """
+    leaderboard = __get(leaderboard_id)
+    leaderboard.delete()
+
+    try:  # Transaction execution
+        db.session.commit()
+    except IntegrityError:
+        error_msg = f"Conflict deleting {leaderboard_id}"
+        abort(409, messages={'error': error_msg})
+
+
+@blp.route(resource_url + "/entries", methods=["GET"])
+@blp.doc(operationId='ListLeaderboardEntries')
+@blp.arguments(args.LeaderboardEntryFilter, location='query')
+@blp.response(200, schemas.LeaderboardEntries)
+@queries.add_etag(models.LeaderboardEntry, schemas.LeaderboardEntry)
+@queries.to_pagination()
+@queries.eager_loading(models.LeaderboardEntry, schemas.LeaderboardEntry)
+@queries.add_sorting(models.LeaderboardEntry)
+def list_entries(*args, **kwargs):
+    """(Public) Return the ranked flavors of a leaderboard.
+
+    Use this method to retrieve the flavors of a leaderboard, best
+    ranked first, with their score and number of results. Entries are
+    precalculated, so the request does not aggregate any result.
+    """
+    return __list_entries(*args, **kwargs)
+
+
+def __list_entries(query_args, leaderboard_id):
+    """Return the entries of the id matching leaderboard.
+
+    :param query_args: The request query arguments as python dictionary
+    :type query_args: dict
+    :param leaderboard_id: The id of the leaderboard
+    :type leaderboard_id: uuid
+    :raises NotFound: No leaderboard with id found
+    :return: Pagination object with the leaderboard entries
+    :rtype: :class:`flask_sqlalchemy.Pagination`
+    """
+    leaderboard = __get(leaderboard_id)
+    return models.LeaderboardEntry.query.filter_by(
+        leaderboard=leaderboard, **query_args
+    )
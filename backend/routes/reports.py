@@ -158,13 +158,12 @@ def __approve_claim(report_id):
         abort(422, messages={'error': error_msg})
 
     try:  # Transaction execution
+        notifications.resource_approved(claim)
         db.session.commit()
     except IntegrityError:
         error_msg = f"Conflict deleting {report_id}"
         abort(409, messages={'error': error_msg})
 
-    notifications.resource_approved(claim)
-
 
 @blp.route(result_claim_url + ':reject', methods=['POST'])
 @blp.doc(operationId='RejectClaim')
@@ -207,11 +206,10 @@ def __reject_claim(report_id):
         abort(422, messages={'error': error_msg})
 
     try:  # Transaction execution
+        notifications.resource_rejected(uploader, claim)
+        if not claim.resource.deleted:
+            notifications.result_restored(claim.resource)
         db.session.commit()
     except IntegrityError:
         error_msg = f"Conflict deleting {report_id}"
         abort(409, messages={'error': error_msg})
-
-    notifications.resource_rejected(uploader, claim)
-    if not claim.resource.deleted:
-        notifications.result_restored(claim.resource)
@@ -4,16 +4,24 @@ Results URL routes. Collection of controller methods to create and
 operate existing benchmark results on the database.
 """
 import datetime as dt
+import json
+import uuid
+from collections.abc import MutableSequence
 
+import jsonschema
 import pytz
+from flask import current_app, request, stream_with_context
 from flask_smorest import Blueprint, abort
-from sqlalchemy import and_, or_
+from marshmallow import ValidationError
+from sqlalchemy import Float, and_, func, insert
+from sqlalchemy.dialects.postgresql import array
 from sqlalchemy.exc import IntegrityError
 
-from .. import models, notifications
+from .. import authorization, models, notifications
 from ..extensions import db, flaat
+from ..models.models import promoted, validators
 from ..schemas import args, schemas
-from ..utils import filters, queries
+from ..utils import cache, exports, filters, queries, ratelimit
 
 blp = Blueprint(
     'results', __name__, description='Operations on results'
@@ -25,9 +33,13 @@ resource_url = "/<uuid:result_id>"
 
 @blp.route(collection_url, methods=["GET"])
 @blp.doc(operationId='ListResults')
+@ratelimit.cost(2)
 @blp.arguments(args.ResultFilter, location='query')
+@cache.cached(models.Result, schemas.Result)
 @blp.response(200, schemas.Results)
-@queries.to_pagination()
+@queries.add_projection(schemas.Result)
+@queries.to_pagination(budget=True)
+@queries.eager_loading(models.Result, schemas.Result)
 @queries.add_sorting(models.Result)
 @queries.add_datefilter(models.Result)
 def list(*args, **kwargs):
@@ -41,10 +53,12 @@ def list(*args, **kwargs):
     result. The filter is composed by 3 arguments separated by spaces
     ('%20' on URL-encoding): <path.separated.by.dots> <operator> <value>
 
-    There are five filter operators:
+    There are six comparison operators:
 
      - **Equals (==)**: Return results where path value is exact to the
        query value. For example *filters=cpu.count == 5*
+     - **Not equals (!=)**: Return results where path value is different
+       to the query value. For example *filters=cpu.count != 5*
      - **Greater than (>)**: Return results where path value strictly
        greater than the query value. For example *filters=cpu.count > 5*
      - **Less than (<)**: Return results where path value strictly lower
@@ -54,10 +68,27 @@ def list(*args, **kwargs):
      - **Less or equal (<=)**: Return results where path value is equal or
        lower than the query value. For example *filters=cpu.count <= 5*
 
+    Additionally, *filters=cpu.count in [4, 8]* matches any value of the
+    list, *filters=score between 10 and 20* a range of values and
+    *filters=has gpu.model* the results with the path. Filters can be
+    combined with 'and', 'or' and parentheses, for example
+    *filters=(cpu.count >= 8 or has gpu.model) and score > 10*.
+
+    Values in double quotes are strings, true and false are booleans and
+    numbers without exponent are numbers. Add ':number', ':boolean' or
+    ':string' to the path to set the type, for example
+    *filters=score:number > 1e3*. Use ExplainResults to check how the
+    filters are interpreted and the plan of the query.
+
     Note that in the provided examples the filter is not URL-encoded as
     most libraries do it automatically, however there might be exception.
     In such cases, use the url encoding guide at:
     https://datatracker.ietf.org/doc/html/rfc3986#section-2.1
+
+    To reduce the response size, use *fields* to return only some of the
+    result fields, for example *fields=id,flavor.name,json*, and
+    *json_fields* to return only some paths of the result json, for
+    example *json_fields=machine.cpu.count,score*.
     """
     return __list(*args, **kwargs)
 
@@ -77,8 +108,10 @@ def __list(query_args):
     query = models.Result.query  # Create the base query
 
     # Extend query with tags
-    for tags_ids in query_args.pop('tags_ids', []):
-        query = query.filter(models.Result.tags_ids.in_([tags_ids]))
+    tags_ids = query_args.pop('tags_ids', [])
+    tags_mode = query_args.pop('tags_mode')
+    if tags_ids:
+        query = query.filter(models.Result.tagged(tags_ids, tags_mode))
 
     # Extend query with execution times
     before = query_args.pop('execution_before', None)
@@ -91,21 +124,18 @@ def __list(query_args):
 
     # Extend query with filters
     parsed_filters = []
+    benchmark_id = query_args.get('benchmark_id', None)
     for filter in query_args.pop('filters'):
         try:
-            new_filter = filters.new_filter(models.Result, filter)
+            new_filter = filters.new_filter(
+                models.Result, filter, benchmark_id
+            )
             parsed_filters.append(new_filter)
         except ValueError as err:
             abort(422, messages={
                 'filter': filter, 'reason': err.args,
-                'hint': "Probably missing spaces (%20)",
-                'example': "filters=machine.cpu.count%20%3E%205"
-            })
-        except KeyError as err:
-            abort(422, message={
-                'filter': filter, 'reason': err.args,
-                'hint': "Use only one of ['==', '>', '<', '>=', '<=']",
-                'example': "filters=machine.cpu.count%20%3E%205"
+                'hint': "See the filter language on ListResults",
+                'example': "filters=machine.cpu.count%20in%20%5B4%2C8%5D"
             })
     query = query.filter(and_(True, *parsed_filters))
 
@@ -115,6 +145,7 @@ def __list(query_args):
 
 @blp.route(collection_url, methods=["POST"])
 @blp.doc(operationId='CreateResult')
+@ratelimit.cost(5)
 @flaat.access_level("user")
 @flaat.inject_user_infos()
 @blp.arguments(args.ResultContext, location='query')
@@ -173,7 +204,7 @@ def __create(query_args, body_args, user_infos):
         benchmark=get(models.Benchmark, query_args.pop('benchmark_id')),
         flavor=get(models.Flavor, query_args.pop('flavor_id')),
         tags=[get(models.Tag, id) for id in query_args.pop('tags_ids')],
-        uploader=models.User.read((user_infos.subject, user_infos.issuer)),
+        uploader=authorization.current_user(user_infos),
         json=body_args, **query_args
     ))
 
@@ -186,22 +217,212 @@ def __create(query_args, body_args, user_infos):
     return result
 
 
+@blp.route(collection_url + ':batch', methods=["POST"])
+@blp.doc(operationId='CreateResults', requestBody={
+    'required': True,
+    'content': {
+        'application/json': {'schema': {
+            'type': 'array', 'items': schemas.CreateResult,
+        }},
+        'application/x-ndjson': {'schema': schemas.CreateResult},
+    },
+})
+@ratelimit.cost(20)
+@flaat.access_level("user")
+@flaat.inject_user_infos()
+@blp.response(200, schemas.ResultsBatch)
+def batch(*args, **kwargs):
+    """(Users) Upload a batch of new results.
+
+    Use this method to create multiple results in a single request. The
+    body is a JSON array or a newline delimited JSON (NDJSON, content type
+    'application/x-ndjson') of result records, each one including the
+    same fields that the query and body of a single result upload.
+
+    Records are validated independently and all the valid records are
+    created in a single transaction. The method returns the status of
+    each record: 201 when created, 404 when a referenced item does not
+    exist or 422 when the record is not valid.
+    """
+    return __batch(*args, **kwargs)
+
+
+def __batch(user_infos):
+    """Create multiple results in the database.
+
+    :param user_infos: The user information from the access token
+    :type user_infos: :class:`flaat.user_infos.UserInfos`
+    :raises Unauthorized: The server could not verify the user identity
+    :raises Forbidden: The user is not registered
+    :raises UnprocessableEntity: The body is not a list of records
+    :raises Conflict: Created objects conflict database items
+    :return: The status of each of the batch records
+    :rtype: dict
+    """
+    uploader = authorization.current_user(user_infos)
+    if uploader is None:
+        error_msg = "User not registered"
+        abort(403, messages={'error': error_msg})
+
+    statuses, records = [], []
+    for index, record in enumerate(__batch_records()):
+        try:
+            record = __batch_record(record)
+        except ValidationError as err:
+            statuses.append(dict(index=index, status=422, errors=err.messages))
+        else:
+            records.append((index, record))
+
+    def collect(model, ids):
+        items = model.query.filter(model.id.in_(ids)).all()
+        return {item.id: item for item in items}
+
+    benchmarks = collect(models.Benchmark, {
+        record['benchmark_id'] for _, record in records
+    })
+    flavors = collect(models.Flavor, {
+        record['flavor_id'] for _, record in records
+    })
+    tags = collect(models.Tag, {
+        tag_id for _, record in records for tag_id in record['tags_ids']
+    })
+
+    rows, tags_rows = [], []
+    for index, record in records:
+        benchmark = benchmarks.get(record['benchmark_id'])
+        flavor = flavors.get(record['flavor_id'])
+        missing = [
+            f"{name} {id} not in database" for name, id, item in [
+                ("Benchmark", record['benchmark_id'], benchmark),
+                ("Flavor", record['flavor_id'], flavor),
+                *[("Tag", id, tags.get(id)) for id in record['tags_ids']],
+            ] if item is None
+        ]
+        if missing:
+            errors = {'error': missing[0]}
+            statuses.append(dict(index=index, status=404, errors=errors))
+            continue
+        unapproved = [
+            f"{item.__class__.__name__} {item.id} not approved"
+            for item in (benchmark, flavor) if item.status.name != "approved"
+        ]
+        if unapproved:
+            errors = {'error': unapproved[0]}
+            statuses.append(dict(index=index, status=422, errors=errors))
+            continue
+        try:
+            validators.validate(benchmark, record['json'])
+        except jsonschema.ValidationError as err:
+            errors = {'error': err.message, 'path': f"{err.path}"}
+            statuses.append(dict(index=index, status=422, errors=errors))
+            continue
+
+        result_id = uuid.uuid4()
+        rows.append(dict(
+            id=result_id, json=record['json'],
+            execution_datetime=record['execution_datetime'],
+            benchmark_id=benchmark.id, flavor_id=flavor.id,
+            site_id=flavor.site_id, uploader_sub=uploader.sub,
+            uploader_iss=uploader.iss,
+        ))
+        tags_rows += [
+            dict(result_id=result_id, tag_id=tag_id)
+            for tag_id in set(record['tags_ids'])
+        ]
+        statuses.append(dict(index=index, status=201, id=result_id))
+
+    if rows:  # Single transaction with multiple values statements
+        db.session.execute(insert(models.Result.__table__), rows)
+    if tags_rows:
+        association = models.Result.tags.property.secondary
+        db.session.execute(insert(association), tags_rows)
+    try:  # Transaction execution
+        db.session.commit()
+    except IntegrityError:
+        error_msg = "Integrity error"
+        abort(409, messages={'error': error_msg})
+
+    return {
+        'created': len(rows), 'failed': len(statuses) - len(rows),
+        'items': sorted(statuses, key=lambda x: x['index']),
+    }
+
+
+def __batch_records():
+    """Return the list of records from the request body.
+
+    :raises UnprocessableEntity: The body is not a list of records
+    :return: The records, records which are not valid JSON are None
+    :rtype: list
+    """
+    limit = current_app.config['RESULTS_BATCH_LIMIT']
+    if request.mimetype == "application/x-ndjson":
+        records = []
+        for line in request.stream:  # Parse the body while it is read
+            if line.strip() == b"":
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                records.append(None)
+            if len(records) > limit:
+                break
+    else:
+        records = request.get_json(silent=True)
+        if not isinstance(records, MutableSequence):  # JSON array
+            error_msg = "Body must be a JSON array or NDJSON of records"
+            abort(422, messages={'error': error_msg})
+    if len(records) > limit:
+        error_msg = f"Batch exceeds the limit of {limit} records"
+        abort(422, messages={'error': error_msg})
+    return records
+
+
+def __batch_record(record):
+    """Load and validate a batch record.
+
+    :param record: The record data as python dictionary
+    :type record: dict
+    :raises ValidationError: Invalid record
+    :return: The loaded record
+    :rtype: dict
+    """
+    if not isinstance(record, dict):
+        error_msg = "Record must be a JSON object"
+        raise ValidationError({'error': error_msg})
+    record = schemas.CreateResult().load(record)
+    if record['execution_datetime'].tzinfo is None:
+        error_msg = "Execution date must include timezone"
+        raise ValidationError({'error': error_msg})
+    if record['execution_datetime'] > dt.datetime.now(pytz.utc):
+        error_msg = "Execution date cannot be in future"
+        raise ValidationError({'error': error_msg})
+    return record
+
+
 @blp.route(collection_url + ':search', methods=["GET"])
 @blp.doc(operationId='SearchResults')
+@ratelimit.cost(2)
 @blp.arguments(args.ResultSearch, location='query')
+@cache.cached(models.Result, schemas.Result)
 @blp.response(200, schemas.Results)
-@queries.to_pagination()
+@queries.add_projection(schemas.Result)
+@queries.to_pagination(budget=True)
+@queries.eager_loading(models.Result, schemas.Result)
 @queries.add_sorting(models.Result)
 @queries.add_datefilter(models.Result)
 def search(*args, **kwargs):
     """(Public) Filter and list results.
 
     Use this method to get a list of results based on a general search
-    of terms. For example, calling this method with terms=v1&terms=0
-    returns all results with 'v1' and '0' on the 'docker_image',
-    'docker_tag', 'site_name', 'flavor_name' fields or 'tags'.
-    The response returns a pagination object with the filtered results
-    (if succeeds).
+    of terms. For example, calling this method with terms=v1&terms=b0
+    returns all results with words starting by 'v1' and 'b0' on the
+    'docker_image', 'docker_tag', 'site_name', 'site_address',
+    'flavor_name' fields or 'tags', most relevant first. The response
+    returns a pagination object with the filtered results (if succeeds).
+
+    Use *fields* and *json_fields* as on ListResults to return only some
+    fields of the results.
     """
     return __search(*args, **kwargs)
 
@@ -215,24 +436,268 @@ def __search(query_args):
     :return: Pagination object with filtered results
     :rtype: :class:`flask_sqlalchemy.Pagination`
     """
-    search = models.Result.query
-    for keyword in query_args.pop('terms'):
-        search = search.filter(
-            or_(
-                models.Result.benchmark_name.contains(keyword),
-                models.Result.site_name.contains(keyword),
-                models.Result.site_address.contains(keyword),
-                models.Result.flavor_name.contains(keyword),
-                models.Result.tags_names == keyword
-            ))
+    search = filters.text_search(
+        models.Result.query, models.Result.search_vector,
+        query_args.pop('terms'),
+    )
 
     # Model filter with remaining standard parameters
     return search.filter_by(**query_args)
 
 
+@blp.route(collection_url + ':stats', methods=["GET"])
+@blp.doc(operationId='GetResultsStats')
+@ratelimit.cost(5)
+@blp.arguments(args.ResultStats, location='query')
+@cache.cached(models.Result, schemas.Result)
+@blp.response(200, schemas.ResultsStats)
+def stats(*args, **kwargs):
+    """(Public) Aggregate a numeric JSON field of the results.
+
+    Use this method to compare sites, flavors, benchmarks or tags on a
+    result metric without downloading the results. It accepts the same
+    filters as ListResults plus the 'path' of a numeric JSON field, for
+    example *path=machine.cpu.count*, and returns the count, minimum,
+    maximum, mean, standard deviation and continuous percentiles of the
+    values for the filtered results or for each 'group_by' group.
+    Results without a number on the path are not aggregated.
+    """
+    return __stats(*args, **kwargs)
+
+
+def __stats(query_args):
+    """Return the statistics of a JSON path on the filtered results.
+
+    :param query_args: The request query arguments as python dictionary
+    :type query_args: dict
+    :raises UnprocessableEntity: Wrong query/body parameters
+    :return: Statistics of each group of results
+    :rtype: dict
+    """
+    path = tuple(query_args.pop('path').split('.'))
+    group_by = query_args.pop('group_by', None)
+    percentiles = query_args.pop('percentiles')
+    benchmark_id = query_args.get('benchmark_id')
+    query = queries.add_datefilter(models.Result)(__list)(query_args)
+
+    # Aggregate only the numbers, the cast would fail on other values
+    json = models.Result.json[path]
+    query = query.filter(func.jsonb_typeof(json) == 'number')
+    if promoted.lookup(benchmark_id, path) == "number":
+        value = promoted.expression(models.Result.json, path, "number")
+    else:
+        value = json.astext.cast(Float)
+
+    aggregates = [
+        func.count(value).label('count'),
+        func.min(value).label('min'),
+        func.max(value).label('max'),
+        func.avg(value).label('mean'),
+        func.stddev_samp(value).label('stddev'),
+    ]
+    if percentiles:  # Single sort for all the percentiles
+        fractions = array(percentiles, type_=Float)
+        aggregates.append(func.percentile_cont(fractions).within_group(
+            value).label('percentiles'))
+
+    keys = []
+    if group_by == 'tag':
+        query = query.join(models.Result.tags)
+        keys = [models.Tag.id, models.Tag.name]
+    elif group_by is not None:
+        keys = [
+            getattr(models.Result, f"{group_by}_id"),
+            getattr(models.Result, f"{group_by}_name"),
+        ]
+    query = query.with_entities(
+        *[key.label(x) for key, x in zip(keys, ['id', 'name'])],
+        *aggregates,
+    )
+    if keys:
+        query = query.group_by(*keys).order_by(keys[1], keys[0])
+
+    items = []
+    for row in query:
+        item = dict(row._mapping)
+        values = item.pop('percentiles', None) or []
+        item['percentiles'] = dict(zip(map(str, percentiles), values))
+        items.append(item)
+    return {'path': '.'.join(path), 'group_by': group_by, 'items': items}
+
+
+@blp.route(collection_url + ':export', methods=["GET"])
+@blp.doc(operationId='ExportResults')
+@ratelimit.cost(10)
+@blp.arguments(args.ResultExport, location='query')
+@blp.response(200, description="Streamed file with the results")
+def export(*args, **kwargs):
+    """(Public) Export the filtered results as a single file.
+
+    Use this method to download all the results matching the same
+    filters as ListResults, instead of requesting them page by page. The
+    results are streamed as they are read from the database in the
+    requested 'format': ndjson (default), csv or parquet. On csv and
+    parquet files, nested fields and the json paths are flattened into
+    columns named by their path, for example *json.machine.cpu.count*.
+    Use *fields* and *json_fields* as on ListResults to export only some
+    fields of the results.
+    """
+    return __export(*args, **kwargs)
+
+
+def __export(query_args):
+    """Stream the filtered results in the requested format.
+
+    :param query_args: The request query arguments as python dictionary
+    :type query_args: dict
+    :raises UnprocessableEntity: Wrong query/body parameters
+    :return: Response streaming the exported file
+    :rtype: :class:`flask.Response`
+    """
+    format = query_args.pop('format')
+    if not exports.available(format):
+        error_msg = f"Format '{format}' not available on this server"
+        abort(422, messages={'error': error_msg})
+    if format != "ndjson" and not db.session().in_transaction():
+        # Columns and items are read from the same snapshot
+        db.session.connection(execution_options={
+            'isolation_level': "REPEATABLE READ",
+        })
+    schema = schemas.Result()
+    names = query_args.get('fields')  # Consumed by eager_loading
+    paths = query_args.get('json_fields')  # Consumed by eager_loading
+    tree = queries.selection(schema, names, paths)
+    query = queries.eager_loading(models.Result, schemas.Result)(
+        queries.add_sorting(models.Result)(
+            queries.add_datefilter(models.Result)(__list)
+        )
+    )(query_args)
+
+    columns = None
+    if format != "ndjson":
+        json_fields = tree.get('json') or []
+        json_paths = [] if 'json' not in tree else exports.json_paths(
+            query, models.Result.json,
+            prefixes=['.'.join(x) for x in json_fields] or None,
+        )
+        columns = exports.columns(schema, tree, json_paths)
+
+    batch_size = current_app.config['RESULTS_EXPORT_BATCH_SIZE']
+    projected = names is not None or paths is not None
+
+    def items():
+        for item in query.yield_per(batch_size):
+            if projected:
+                item = queries.project(item, schema, tree)
+            yield schema.dump(item)
+
+    writer, mimetype = exports.writers[format]
+    chunks = writer(items(), columns, batch_size)
+    first = next(chunks, "")  # Errors on the first batch fail the request
+
+    def stream():
+        yield first
+        try:
+            yield from chunks
+        except Exception:  # noqa: B902
+            current_app.logger.exception("Results export interrupted")
+            raise  # The client gets an unterminated response
+
+    response = current_app.response_class(
+        stream_with_context(stream()), mimetype=mimetype,
+    )
+    filename = f"results.{format}"
+    response.headers['Content-Disposition'] = \
+        f'attachment; filename="{filename}"'
+    return response
+
+
+@blp.route(collection_url + ':explain', methods=["GET"])
+@blp.doc(operationId='ExplainResults')
+@ratelimit.cost(2)
+@blp.arguments(args.ResultFilter, location='query')
+@blp.response(200, schemas.ResultsExplain)
+def explain(*args, **kwargs):
+    """(Public) Explain how a results list would be solved.
+
+    Use this method to check a request to ListResults without running
+    it. It accepts the same arguments and returns the filters as they
+    are interpreted, for example with the inferred types, and the plan
+    estimated by the database for the statements that collect and count
+    the page, including their cost and the indexes they would use.
+    Requests with a cost over 'max_cost' are rejected by ListResults.
+    """
+    return __explain(*args, **kwargs)
+
+
+def __explain(query_args):
+    """Return the interpreted filters and plans of a results list.
+
+    :param query_args: The request query arguments as python dictionary
+    :type query_args: dict
+    :raises UnprocessableEntity: Wrong query/body parameters
+    :return: The interpreted filters and the statement plans
+    :rtype: dict
+    """
+    per_page = query_args.pop('per_page')
+    page = query_args.pop('page')
+    count = query_args.pop('count', "exact")
+    after = query_args.get('after')  # Consumed by add_sorting
+    interpreted = []
+    for filter in query_args['filters']:
+        try:
+            interpreted.append(filters.render(filters.parse(filter)))
+        except ValueError:
+            interpreted.append(filter)  # Reported by __list
+    for key in ['fields', 'json_fields']:
+        query_args.pop(key, None)  # Projection does not change the plan
+    query = queries.add_sorting(models.Result)(
+        queries.add_datefilter(models.Result)(__list)
+    )(query_args)
+
+    statements = queries.page_statements(query, page, per_page, count, after)
+    max_cost = current_app.config['RESULTS_QUERY_MAX_COST']
+    return {
+        'filters': interpreted,
+        'max_cost': max_cost or None,
+        'statements': [
+            queries.explain(query.session, x) for x in statements
+        ],
+    }
+
+
+@blp.route(collection_url + ':cache', methods=["GET"])
+@blp.doc(operationId='GetResultsCache')
+@flaat.access_level("admin")
+@blp.response(200, schemas.QueryCache)
+def cache_info():
+    """(Admins) Return the statistics of the results query cache.
+
+    Use this method to monitor the cache of the list and search
+    responses. Hits and misses are counted on the worker process that
+    serves the request; size and memory are those of the backend.
+    """
+    return __cache_info()
+
+
+def __cache_info():
+    """Return the statistics of the configured cache backend.
+
+    :raises Unauthorized: The server could not verify the user identity
+    :raises Forbidden: The user has not the required privileges
+    :return: The cache statistics
+    :rtype: :class:`backend.utils.cache.CacheInfo`
+    """
+    cache_backend = cache.backend()
+    if cache_backend is None:
+        return cache.CacheInfo("none", 0, 0, 0, 0, 0)
+    return cache_backend.info()
+
+
 @blp.route(resource_url, methods=["GET"])
 @blp.doc(operationId='GetResult')
 @blp.response(200, schemas.Result)
+@queries.add_etag(models.Result, schemas.Result)
 def get(*args, **kwargs):
     """(Public) Retrieve result details.
 
@@ -297,6 +762,7 @@ def __delete(result_id):
 
 @blp.route(resource_url + ":claim", methods=["POST"])
 @blp.doc(operationId='ClaimReport')
+@ratelimit.cost(5)
 @flaat.access_level("user")
 @flaat.inject_user_infos()
 @blp.arguments(schemas.CreateClaim)
@@ -327,17 +793,18 @@ def __claim(body_args, result_id, user_infos):
     """
     result = __get(result_id)
     claim = result.claim(
-        claimer=models.User.read((user_infos.subject, user_infos.issuer)),
+        claimer=authorization.current_user(user_infos),
         message=body_args['message']
     )
 
     try:  # Transaction execution
+        db.session.flush()
+        notifications.result_claimed(result, claim)
         db.session.commit()
     except IntegrityError:
         error_msg = f"Conflict updating {result_id}"
         abort(409, messages={'error': error_msg})
 
-    notifications.result_claimed(result, claim)
     return claim
 
 
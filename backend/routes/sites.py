@@ -7,10 +7,10 @@ from flask_smorest import Blueprint, abort
 from sqlalchemy import or_
 from sqlalchemy.exc import IntegrityError
 
-from .. import models, notifications
+from .. import authorization, models, notifications
 from ..extensions import db, flaat
 from ..schemas import args, schemas
-from ..utils import queries
+from ..utils import filters, queries
 
 blp = Blueprint(
     'sites', __name__, description='Operations on sites'
@@ -24,6 +24,7 @@ resource_url = "/<uuid:site_id>"
 @blp.doc(operationId='ListSites')
 @blp.arguments(args.SiteFilter, location='query')
 @blp.response(200, schemas.Sites)
+@queries.add_etag(models.Site, schemas.Site)
 @queries.to_pagination()
 @queries.add_sorting(models.Site)
 @queries.add_datefilter(models.Site)
@@ -78,17 +79,17 @@ def __create(body_args, user_infos):
     :return: The site created into the database.
     :rtype: :class:`models.Site`
     """
-    subiss = user_infos.subject, user_infos.issuer
-    body_args['uploader'] = models.User.read(subiss)
+    body_args['uploader'] = authorization.current_user(user_infos)
     site = models.Site.create(body_args)
 
     try:  # Transaction execution
+        db.session.flush()
+        notifications.resource_submitted(site)
         db.session.commit()
     except IntegrityError:
         error_msg = f"Site {body_args['name']} already submitted/exists"
         abort(409, messages={'error': error_msg})
 
-    notifications.resource_submitted(site)
     return site
 
 
@@ -104,9 +105,10 @@ def search(*args, **kwargs):
 
     Use this method to get a list of sites based on a general search
     of terms. For example, calling this method with terms=K&terms=T
-    returns all sites with 'K' and 'T' on the 'name', 'address',
-    or 'description' fields. The response returns a pagination object
-    with the filtered sites (if succeeds).
+    returns all sites with words starting by 'K' and 'T' on the 'name',
+    'address', or 'description' fields, most relevant first. The
+    response returns a pagination object with the filtered sites (if
+    succeeds).
     """
     return __search(*args, **kwargs)
 
@@ -120,14 +122,10 @@ def __search(query_args):
     :return: Pagination object with filtered sites
     :rtype: :class:`flask_sqlalchemy.Pagination`
     """
-    search = models.Site.query
-    for keyword in query_args.pop('terms'):
-        search = search.filter(
-            or_(
-                models.Site.name.contains(keyword),
-                models.Site.address.contains(keyword),
-                models.Site.description.contains(keyword)
-            ))
+    search = filters.text_search(
+        models.Site.query, models.Site.search_vector,
+        query_args.pop('terms'),
+    )
     return search.filter_by(**query_args)
 
 
@@ -266,13 +264,12 @@ def __approve(site_id):
         abort(422, messages={'error': error_msg})
 
     try:  # Transaction execution
+        notifications.resource_approved(site)
         db.session.commit()
     except IntegrityError:
         error_msg = f"Conflict deleting {site_id}"
         abort(409, messages={'error': error_msg})
 
-    notifications.resource_approved(site)
-
 
 @blp.route(resource_url + ":reject", methods=["POST"])
 @blp.doc(operationId='RejectSite')
@@ -310,13 +307,12 @@ def __reject(site_id):
         abort(422, messages={'error': error_msg})
 
     try:  # Transaction execution
+        notifications.resource_rejected(uploader, site)
         db.session.commit()
     except IntegrityError:
         error_msg = f"Conflict deleting {site_id}"
         abort(409, messages={'error': error_msg})
 
-    notifications.resource_rejected(uploader, site)
-
 
 @blp.route(resource_url + '/flavors', methods=['GET'])
 @blp.doc(operationId='ListFlavors')
@@ -383,18 +379,18 @@ def __create_flavor(body_args, site_id, user_infos):
     """
     __get(site_id)   # Return 404 if the site does not exist
 
-    subiss = user_infos.subject, user_infos.issuer
-    body_args['uploader'] = models.User.read(subiss)
+    body_args['uploader'] = authorization.current_user(user_infos)
     body_args['site_id'] = site_id
     flavor = models.Flavor.create(body_args)
 
     try:  # Transaction execution
+        db.session.flush()
+        notifications.resource_submitted(flavor)
         db.session.commit()
     except IntegrityError:
         error_msg = f"Flavor {body_args['name']} already submitted/exists"
         abort(409, messages={'error': error_msg})
 
-    notifications.resource_submitted(flavor)
     return flavor
 
 
@@ -0,0 +1,78 @@
+"""Routes for slow queries.
+
+Slow query URL routes. Collection of controller methods to list and
+clear the SQL statements which exceeded SLOW_QUERY_THRESHOLD.
+"""
+from flask_smorest import Blueprint, abort
+from sqlalchemy.exc import IntegrityError
+
+from .. import models
+from ..extensions import db, flaat
+from ..schemas import args, schemas
+from ..utils import queries
+
+blp = Blueprint(
+    'slow_queries', __name__, description='Operations on slow queries'
+)
+
+collection_url = ""
+
+
+@blp.route(collection_url, methods=["GET"])
+@blp.doc(operationId='ListSlowQueries')
+@flaat.access_level("admin")
+@blp.arguments(args.SlowQueryFilter, location='query')
+@blp.response(200, schemas.SlowQueries)
+@queries.to_pagination()
+@queries.add_sorting(models.SlowQuery)
+def list(*args, **kwargs):
+    """(Admins) Filter and list the slow queries.
+
+    Use this method to find the SQL statements which exceeded the slow
+    query threshold, by default the ones with the most accumulated time
+    first. Each item includes the operation which executed the
+    statement and the parameters and plan of its slowest execution.
+    """
+    return __list(*args, **kwargs)
+
+
+def __list(query_args):
+    """Return a list of filtered slow queries.
+
+    :param query_args: The request query arguments as python dictionary
+    :type query_args: dict
+    :raises Unauthorized: The server could not verify the user identity
+    :raises Forbidden: The user has not the required privileges
+    :raises UnprocessableEntity: Wrong query/body parameters
+    :return: Pagination object with filtered slow queries
+    :rtype: :class:`flask_sqlalchemy.Pagination`
+    """
+    return models.SlowQuery.query.filter_by(**query_args)
+
+
+@blp.route(collection_url, methods=["DELETE"])
+@blp.doc(operationId='ClearSlowQueries')
+@flaat.access_level("admin")
+@blp.response(204)
+def clear():
+    """(Admins) Delete all the slow queries.
+
+    Use this method to start collecting the slow queries again, for
+    example after adding an index.
+    """
+    return __clear()
+
+
+def __clear():
+    """Delete all the slow queries from the database.
+
+    :raises Unauthorized: The server could not verify the user identity
+    :raises Forbidden: The user has not the required privileges
+    """
+    models.SlowQuery.query.delete()
+
+    try:  # Transaction execution
+        db.session.commit()
+    except IntegrityError:
+        error_msg = "Conflict deleting slow queries"
+        abort(409, messages={'error': error_msg})
@@ -24,6 +24,7 @@ resource_url = "/<uuid:tag_id>"
 @blp.doc(operationId='ListTags')
 @blp.arguments(args.TagFilter, location='query')
 @blp.response(200, schemas.Tags)
+@queries.add_etag(models.Tag, schemas.Tag)
 @queries.to_pagination()
 @queries.add_sorting(models.Tag)
 def list(*args, **kwargs):
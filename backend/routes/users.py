@@ -6,7 +6,7 @@ operate existing users on the database.
 from flask_smorest import Blueprint, abort
 from sqlalchemy.exc import IntegrityError
 
-from .. import models, notifications
+from .. import authorization, models, notifications
 from ..extensions import db, flaat
 from ..schemas import args, schemas
 from ..utils import queries
@@ -85,12 +85,12 @@ def __register(user_infos):
     user = models.User.create(user_properties)
 
     try:  # Transaction execution
+        notifications.user_welcome(user)
         db.session.commit()
     except IntegrityError:
         error_msg = "User already submitted/exists"
         abort(409, messages={'error': error_msg})
 
-    notifications.user_welcome(user)
     return user
 
 
@@ -193,7 +193,7 @@ def __get(user_infos):
     :return: The database user matching the oidc token information
     :rtype: :class:`models.User`
     """
-    user = models.User.read((user_infos['sub'], user_infos['iss']))
+    user = authorization.current_user(user_infos)
     if user is None:
         error_msg = "User not registered"
         abort(404, messages={'error': error_msg})
@@ -235,13 +235,12 @@ def __update(user_infos):
     user.update({'email': user_infos['email']})
 
     try:  # Transaction execution
+        notifications.email_updated(user)
         db.session.commit()
     except IntegrityError:
         error_msg = "Existing user already using email"
         abort(409, messages={'error': error_msg})
 
-    notifications.email_updated(user)
-
 
 @blp.route(resource_url + ":try_admin", methods=["GET"])
 @blp.doc(operationId='TryAdmin')
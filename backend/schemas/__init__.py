@@ -102,6 +102,13 @@ class Pagination(Schema):
         required=True, dump_only=True
     )
 
+    #: (Str, dump_only):
+    #: Cursor to request the next page when using 'after'.
+    next_after = fields.String(
+        description="Cursor to request the next page when using 'after'",
+        dump_only=True
+    )
+
 
 class Id(Schema):
     """Id schema."""
@@ -1,6 +1,6 @@
 """Module to define query arguments."""
 from marshmallow import fields
-from marshmallow.validate import OneOf, Range
+from marshmallow.validate import Length, OneOf, Range, Regexp
 
 from . import BaseSchema as Schema
 from . import Search, Status, UploadFilter
@@ -23,6 +23,27 @@ class Pagination(Schema):
         validate=Range(min=1), load_default=1
     )
 
+    #: (Str):
+    #: Cursor to return the items after (disables page and total count)
+    after = fields.String(
+        description="{}<br>{}".format(
+            "Cursor from 'next_after' to return the following items.",
+            "Use an empty value to start; page and total are not used.",
+        ),
+        example="WyIyMDIwLTAxLTAxVDAwOjAwOjAwIl0=",
+    )
+
+    #: (Str, default="exact"):
+    #: Method to calculate the total number of items and pages
+    count = fields.String(
+        description="{}<br>{}<br>{}".format(
+            "Method to calculate 'total' and 'pages'.",
+            "'estimate' uses the database statistics (faster, approximate).",
+            "'none' does not return 'total' nor 'pages' (fastest).",
+        ),
+        validate=OneOf(["exact", "estimate", "none"]), load_default="exact",
+    )
+
 
 class UserFilter(Pagination, Schema):
     """User filter arguments."""
@@ -228,8 +249,8 @@ class FlavorSearch(Pagination, UploadFilter, Status, Search, Schema):
     """Flavor search arguments."""
 
 
-class ResultFilter(Pagination, UploadFilter, Schema):
-    """Result filter arguments."""
+class ResultConditions(UploadFilter, Schema):
+    """Result filter conditions arguments."""
 
     #: (ISO8601):
     #: Execution datetime of the instance before a specific date
@@ -281,17 +302,60 @@ class ResultFilter(Pagination, UploadFilter, Schema):
         ],
     )
 
+    #: (String, default="all"):
+    #: Return results including all or any of the 'tags_ids'
+    tags_mode = fields.String(
+        description="Return results with 'all' or 'any' of the tags_ids",
+        example="any", validate=OneOf(["all", "any"]), load_default="all",
+    )
+
     #: (String; <json.path> <operation> <value>)
     #: Expression to condition the returned results on JSON field
     filters = fields.List(
         fields.String(
             description="JSON filter condition (space sparated)",
-            example="machine.cpu.count > 4", required=True,
+            example="machine.cpu.count in [4, 8] or has gpu.model",
+            required=True,
+        ),
+        description=(
+            "List of filter conditions (space separated). A condition "
+            "not valid on the filter language is read as a single "
+            "'<json.path> <operator> <value>', so keys named 'in', 'has', "
+            "'and', 'or' or 'between' and values including ',', '=', "
+            "'<', '>' or '!' work as before the language"
         ),
-        description="List of filter conditions (space separated)",
         example=["cpu.count > 4", "cpu.count < 80"], load_default=[]
     )
 
+
+class ResultProjection(Schema):
+    """Result projection arguments."""
+
+    #: (String; <json.path>,<json.path>):
+    #: Subtrees of the result JSON to return separated by coma
+    json_fields = fields.String(
+        description="{}<br>{}".format(
+            "JSON paths to return from the result json (coma separated).",
+            "Use '.' as json field delimiter, other fields are omitted.",
+        ),
+        example="machine.cpu.count,score",
+        validate=Regexp(r"^[^.,]+(\.[^.,]+)*(,[^.,]+(\.[^.,]+)*)*$"),
+    )
+
+    #: (String; <field>,<field>):
+    #: Fields of the results to return separated by coma
+    fields = fields.String(
+        description="{}<br>{}".format(
+            "Result fields to return (coma separated), default all.",
+            "Use '.' to select fields of nested items: [benchmark.id].",
+        ),
+        example="id,execution_datetime,flavor.name,json",
+    )
+
+
+class ResultFilter(Pagination, ResultProjection, ResultConditions, Schema):
+    """Result filter arguments."""
+
     #: (Str):
     #: Order to return the results separated by coma
     sort_by = fields.String(
@@ -307,6 +371,62 @@ class ResultFilter(Pagination, UploadFilter, Schema):
     )
 
 
+class ResultExport(ResultProjection, ResultConditions, Schema):
+    """Result export arguments."""
+
+    #: (String, default="ndjson"):
+    #: Format of the exported file
+    format = fields.String(
+        description="{}<br>{}<br>{}<br>{}".format(
+            "Format of the exported file:",
+            "ndjson: One JSON result per line.",
+            "csv: One result per line, json flattened ('.' delimiter).",
+            "parquet: Columns as csv, numbers and booleans typed.",
+        ),
+        example="csv", load_default="ndjson",
+        validate=OneOf(["ndjson", "csv", "parquet"]),
+    )
+
+    #: (Str):
+    #: Order to return the results separated by coma, default none
+    sort_by = fields.String(
+        description="{}<br>{}".format(
+            "Order to return the results (coma separated), default none.",
+            "Same fields as ListResults.",
+        ),
+        example="+execution_datetime",
+    )
+
+
+class ResultStats(ResultConditions, Schema):
+    """Result statistics arguments."""
+
+    #: (String, required; <json.path>):
+    #: Numeric JSON field to aggregate, '.' as json field delimiter
+    path = fields.String(
+        description="Numeric JSON field to aggregate ('.' separated)",
+        example="machine.cpu.count", required=True,
+        validate=Regexp(r"^[^.]+(\.[^.]+)*$"),
+    )
+
+    #: (String):
+    #: Group the results by site, flavor, benchmark or tag
+    group_by = fields.String(
+        description="Group the results by site, flavor, benchmark or tag",
+        example="site",
+        validate=OneOf(["site", "flavor", "benchmark", "tag"]),
+    )
+
+    #: ([Float], default=[0.5, 0.9, 0.99]):
+    #: Fractions of the percentiles to calculate
+    percentiles = fields.List(
+        fields.Float(validate=Range(min=0, max=1)),
+        description="Fractions of the percentiles to calculate (0 to 1)",
+        example=[0.5, 0.9, 0.99], load_default=[0.5, 0.9, 0.99],
+        validate=Length(max=10),
+    )
+
+
 class ResultContext(Schema):
     """Result context arguments."""
 
@@ -347,5 +467,70 @@ class ResultContext(Schema):
     )
 
 
-class ResultSearch(Pagination, UploadFilter, Search, Schema):
+class ResultSearch(Pagination, ResultProjection, UploadFilter, Search,
+                   Schema):
     """Result search arguments."""
+
+
+class LeaderboardFilter(Pagination, Schema):
+    """Leaderboard filter arguments."""
+
+    #: (Benchmark.id):
+    #: Unique Identifier of the benchmark of the ranked results
+    benchmark_id = fields.UUID(
+        description="UUID benchmark unique identification",
+        example="17d56d83-24e0-47ca-bf4b-c76a467d7e0c",
+    )
+
+    #: (Text):
+    #: Name of the leaderboard
+    name = fields.String(
+        description="Name of the leaderboard",
+        example="Fastest flavors",
+    )
+
+    #: (Str):
+    #: Order to return the leaderboards separated by coma
+    sort_by = fields.String(
+        description="{}<br>{}<br>{}".format(
+            "Order to return the leaderboards (coma separated).",
+            "Generic fields: [id]",
+            "Specific fields: [name,benchmark_id]",
+        ),
+        example="+name", load_default="+name"
+    )
+
+
+class LeaderboardEntryFilter(Pagination, Schema):
+    """Leaderboard entry filter arguments."""
+
+    #: (Str):
+    #: Order to return the entries separated by coma
+    sort_by = fields.String(
+        description="{}<br>{}".format(
+            "Order to return the entries (coma separated).",
+            "Specific fields: [rank,value,count,flavor_id]",
+        ),
+        example="+rank", load_default="+rank,+flavor_id"
+    )
+
+
+class SlowQueryFilter(Pagination, Schema):
+    """Slow query filter arguments."""
+
+    #: (Text):
+    #: OperationId of the route executing the statement
+    operation = fields.String(
+        description="OperationId of the route executing the statement",
+        example="ListResults",
+    )
+
+    #: (Str):
+    #: Order to return the slow queries separated by coma
+    sort_by = fields.String(
+        description="{}<br>{}".format(
+            "Order to return the slow queries (coma separated).",
+            "Specific fields: [calls,total_time,max_time,last_datetime]",
+        ),
+        example="-max_time", load_default="-total_time"
+    )
@@ -1,7 +1,8 @@
 """Schemas module for schemas definition."""
 from marshmallow import INCLUDE, post_dump
-from marshmallow.validate import OneOf
+from marshmallow.validate import OneOf, Regexp
 
+from ..models.models.leaderboard import Aggregation
 from . import BaseSchema as Schema
 from . import Id, Pagination, UploadDatetime, fields
 
@@ -383,6 +384,494 @@ class Results(Pagination, Schema):
     items = fields.Nested(Result, required=True, many=True)
 
 
+class CreateResult(Schema):
+    """Result upload record schema definition."""
+
+    #: (ISO8601, required) :
+    #: Benchmark execution **START**
+    execution_datetime = fields.DateTime(
+        description="START execution datetime and timezone of the result",
+        example='2020-05-21T10:31:00.000+01:00', required=True,
+    )
+
+    #: (Benchmark.id, required):
+    #: Unique Identifier for result associated benchmark
+    benchmark_id = fields.UUID(
+        description="UUID benchmark unique identification",
+        example="cc4f0a67-c626-4778-8658-62835b9cf899", required=True,
+    )
+
+    #: (Flavor.id, required):
+    #: Unique Identifier for result associated flavor
+    flavor_id = fields.UUID(
+        description="UUID flavor unique identification",
+        example="2fc5aba1-0330-43ee-8e6d-ea42786d3495", required=True,
+    )
+
+    #: ([Tag.id], default=[]):
+    #: Unique Identifiers for result associated tags
+    tags_ids = fields.List(
+        fields.UUID(
+            description="UUID tag unique identification",
+            example="960110b3-c41e-4534-8612-852fdad7be74", required=True,
+        ),
+        description="UUID tags unique identifications",
+        load_default=[],
+    )
+
+    #: (JSON, required):
+    #: Benchmark execution results
+    json = fields.Dict(required=True)
+
+
+class BatchStatus(Schema):
+    """Batch record upload status schema definition."""
+
+    #: (Int, required, dump_only):
+    #: Position of the record in the uploaded batch (0 indexed)
+    index = fields.Integer(
+        description="Position of the record in the batch (0 indexed)",
+        example=0, required=True, dump_only=True,
+    )
+
+    #: (Int, required, dump_only):
+    #: Status code of the record upload
+    status = fields.Integer(
+        description="Status code of the record, 201 if created",
+        example=201, required=True, dump_only=True,
+    )
+
+    #: (UUID, dump_only):
+    #: Unique Identifier of the created result
+    id = fields.UUID(
+        description="UUID of the created result",
+        example="77e88a60-5d33-43d3-b802-27273278489e", dump_only=True,
+    )
+
+    #: (Dict, dump_only):
+    #: Errors found on the record when not created
+    errors = fields.Dict(
+        description="Errors found on the record when not created",
+        example={"error": "Execution date cannot be in future"},
+        dump_only=True,
+    )
+
+
+class ResultsBatch(Schema):
+    """Results batch upload schema definition."""
+
+    #: (Int, required, dump_only):
+    #: Number of records created
+    created = fields.Integer(
+        description="Number of records created",
+        required=True, dump_only=True,
+    )
+
+    #: (Int, required, dump_only):
+    #: Number of records not created
+    failed = fields.Integer(
+        description="Number of records not created",
+        required=True, dump_only=True,
+    )
+
+    #: ([BatchStatus], required):
+    #: Status of each of the batch records
+    items = fields.Nested(BatchStatus, required=True, many=True)
+
+
+class StatsGroup(Schema):
+    """Statistics of a group of results schema definition."""
+
+    #: (UUID, dump_only):
+    #: Unique Identifier of the group site, flavor, benchmark or tag
+    id = fields.UUID(
+        description="UUID of the group site, flavor, benchmark or tag",
+        example="86067ee9-5cb5-43e5-a361-568abe479fe2", dump_only=True,
+    )
+
+    #: (Text, dump_only):
+    #: Name of the group site, flavor, benchmark or tag
+    name = fields.String(
+        description="Name of the group site, flavor, benchmark or tag",
+        example="site-1", dump_only=True,
+    )
+
+    #: (Int, required, dump_only):
+    #: Number of results with a numeric value on the path
+    count = fields.Integer(
+        description="Number of results with a numeric value on the path",
+        example=12, required=True, dump_only=True,
+    )
+
+    #: (Float, dump_only):
+    #: Minimum value on the path
+    min = fields.Float(
+        description="Minimum value on the path",
+        example=1.0, dump_only=True,
+    )
+
+    #: (Float, dump_only):
+    #: Maximum value on the path
+    max = fields.Float(
+        description="Maximum value on the path",
+        example=12.0, dump_only=True,
+    )
+
+    #: (Float, dump_only):
+    #: Mean of the values on the path
+    mean = fields.Float(
+        description="Mean of the values on the path",
+        example=6.5, dump_only=True,
+    )
+
+    #: (Float, dump_only):
+    #: Sample standard deviation of the values on the path
+    stddev = fields.Float(
+        description="Sample standard deviation of the values on the path",
+        example=3.6, dump_only=True,
+    )
+
+    #: (Dict, dump_only):
+    #: Continuous percentiles of the values on the path by fraction
+    percentiles = fields.Dict(
+        keys=fields.String(), values=fields.Float(),
+        description="Continuous percentiles of the values by fraction",
+        example={"0.5": 6.5, "0.9": 10.9}, dump_only=True,
+    )
+
+
+class ResultsStats(Schema):
+    """Results statistics schema definition."""
+
+    #: (Text, required, dump_only):
+    #: Numeric JSON field aggregated
+    path = fields.String(
+        description="Numeric JSON field aggregated",
+        example="machine.cpu.count", required=True, dump_only=True,
+    )
+
+    #: (Text, dump_only):
+    #: Field used to group the results
+    group_by = fields.String(
+        description="Field used to group the results",
+        example="site", dump_only=True,
+    )
+
+    #: ([StatsGroup], required):
+    #: Statistics of each group of results
+    items = fields.Nested(StatsGroup, required=True, many=True)
+
+
+class QueryCache(Schema):
+    """Query cache statistics schema definition."""
+
+    #: (Text, required, dump_only):
+    #: Backend used to cache the responses
+    backend = fields.String(
+        description="Backend used to cache the responses",
+        example="memory", required=True, dump_only=True,
+    )
+
+    #: (Int, required, dump_only):
+    #: Lookups that found a cached response
+    hits = fields.Integer(
+        description="Lookups that found a cached response",
+        example=90, required=True, dump_only=True,
+    )
+
+    #: (Int, required, dump_only):
+    #: Lookups that did not find a cached response
+    misses = fields.Integer(
+        description="Lookups that did not find a cached response",
+        example=10, required=True, dump_only=True,
+    )
+
+    #: (Float, required, dump_only):
+    #: Fraction of the lookups that found a cached response
+    hit_rate = fields.Float(
+        description="Fraction of the lookups that found a cached response",
+        example=0.9, required=True, dump_only=True,
+    )
+
+    #: (Int, required, dump_only):
+    #: Maximum number of cached responses
+    maxsize = fields.Integer(
+        description="Maximum number of cached responses",
+        example=1024, required=True, dump_only=True,
+    )
+
+    #: (Int, required, dump_only):
+    #: Number of cached responses
+    currsize = fields.Integer(
+        description="Number of cached responses",
+        example=100, required=True, dump_only=True,
+    )
+
+    #: (Int, required, dump_only):
+    #: Memory used by the cached responses in bytes
+    nbytes = fields.Integer(
+        description="Memory used by the cached responses in bytes",
+        example=524288, required=True, dump_only=True,
+    )
+
+
+# ---------------------------------------------------------------------
+# Definition of SlowQuery schemas
+
+class StatementPlan(Schema):
+    """Statement plan schema definition."""
+
+    #: (Text, required, dump_only):
+    #: SQL statement with parameter placeholders
+    statement = fields.String(
+        description="SQL statement with parameter placeholders",
+        example="SELECT result.id FROM result WHERE ...",
+        required=True, dump_only=True,
+    )
+
+    #: (Dict, required, dump_only):
+    #: Parameters of the statement
+    parameters = fields.Dict(
+        description="Parameters of the statement",
+        example={"param_1": "machine.cpu.count"},
+        required=True, dump_only=True,
+    )
+
+    #: (Float, required, dump_only):
+    #: Planner estimated cost of the statement
+    cost = fields.Float(
+        description="Planner estimated cost of the statement",
+        example=1520.3, required=True, dump_only=True,
+    )
+
+    #: (Int, required, dump_only):
+    #: Planner estimated rows returned by the statement
+    rows = fields.Integer(
+        description="Planner estimated rows returned by the statement",
+        example=101, required=True, dump_only=True,
+    )
+
+    #: ([Text], required, dump_only):
+    #: Indexes scanned by the plan
+    indexes = fields.List(
+        fields.String(), description="Indexes scanned by the plan",
+        example=["ix_result_json_path_ops"], required=True, dump_only=True,
+    )
+
+    #: (Dict, required, dump_only):
+    #: EXPLAIN plan of the statement, it is not executed
+    plan = fields.Dict(
+        description="EXPLAIN plan of the statement, it is not executed",
+        example={"Node Type": "Bitmap Heap Scan"},
+        required=True, dump_only=True,
+    )
+
+
+class ResultsExplain(Schema):
+    """Results explain schema definition."""
+
+    #: ([Text], required, dump_only):
+    #: Filters as interpreted by the server
+    filters = fields.List(
+        fields.String(), description="Filters as interpreted by the server",
+        example=["cpu.count in [4, 8] or has gpu.model"],
+        required=True, dump_only=True,
+    )
+
+    #: (Float, dump_only):
+    #: Maximum cost of the statements, null if not limited
+    max_cost = fields.Float(
+        description="Maximum cost of the statements, null if not limited",
+        example=100000.0, dump_only=True,
+    )
+
+    #: ([StatementPlan], required):
+    #: Plans of the statements collecting and counting the page
+    statements = fields.Nested(StatementPlan, required=True, many=True)
+
+
+class SlowQuery(Schema):
+    """Slow query schema definition."""
+
+    #: (Text, required, dump_only):
+    #: Hash of the operation and statement
+    fingerprint = fields.String(
+        description="Hash of the operation and statement",
+        example="2fd4e1c67a2d28fced849ee1bb76e7391b93eb12",
+        required=True, dump_only=True,
+    )
+
+    #: (Text, required, dump_only):
+    #: OperationId of the route executing the statement
+    operation = fields.String(
+        description="OperationId of the route executing the statement",
+        example="ListResults", required=True, dump_only=True,
+    )
+
+    #: (Text, required, dump_only):
+    #: SQL statement with parameter placeholders
+    statement = fields.String(
+        description="SQL statement with parameter placeholders",
+        example="SELECT result.id FROM result WHERE ...",
+        required=True, dump_only=True,
+    )
+
+    #: (Dict, required, dump_only):
+    #: Parameters of the slowest execution
+    parameters = fields.Dict(
+        description="Parameters of the slowest execution",
+        example={"param_1": "machine.cpu.count"},
+        required=True, dump_only=True,
+    )
+
+    #: (List, dump_only):
+    #: Estimated EXPLAIN plan of the slowest execution
+    plan = fields.Raw(
+        description="Estimated EXPLAIN plan of the slowest execution",
+        example=[{"Plan": {"Node Type": "Seq Scan"}}], dump_only=True,
+    )
+
+    #: (Int, required, dump_only):
+    #: Number of slow executions
+    calls = fields.Integer(
+        description="Number of slow executions",
+        example=12, required=True, dump_only=True,
+    )
+
+    #: (Float, required, dump_only):
+    #: Milliseconds spent on all the slow executions
+    total_time = fields.Float(
+        description="Milliseconds spent on all the slow executions",
+        example=15230.5, required=True, dump_only=True,
+    )
+
+    #: (Float, required, dump_only):
+    #: Milliseconds spent on the slowest execution
+    max_time = fields.Float(
+        description="Milliseconds spent on the slowest execution",
+        example=2310.2, required=True, dump_only=True,
+    )
+
+    #: (ISO8601, required, dump_only):
+    #: Datetime of the last slow execution
+    last_datetime = fields.DateTime(
+        description="Datetime of the last slow execution",
+        example="2021-09-08 20:37:10.192459",
+        required=True, dump_only=True,
+    )
+
+
+class SlowQueries(Pagination, Schema):
+    """Slow queries pagination schema definition."""
+
+    #: ([SlowQuery], required):
+    #: List of slow query items for the pagination object
+    items = fields.Nested(SlowQuery, required=True, many=True)
+
+
+# ---------------------------------------------------------------------
+# Definition of Leaderboard schemas
+
+class CreateLeaderboard(Schema):
+    """Create leaderboard schema definition."""
+
+    #: (Text, required):
+    #: Name of the leaderboard
+    name = fields.String(
+        description="Name of the leaderboard",
+        example="Fastest flavors", required=True,
+    )
+
+    #: (Text):
+    #: Text with useful information for users
+    description = fields.String(
+        description="String with an statement about the object",
+        example="This is a simple description example",
+    )
+
+    #: (Benchmark.id, required):
+    #: Unique Identifier of the benchmark of the ranked results
+    benchmark_id = fields.UUID(
+        description="UUID of the benchmark of the ranked results",
+        example="17d56d83-24e0-47ca-bf4b-c76a467d7e0c", required=True,
+    )
+
+    #: (Text, required; <json.path>):
+    #: Numeric JSON field to score the flavors, '.' as delimiter
+    path = fields.String(
+        description="Numeric JSON field to score the flavors ('.' separated)",
+        example="execution.time", required=True,
+        validate=Regexp(r"^[^.]+(\.[^.]+)*$"),
+    )
+
+    #: (Aggregation, required):
+    #: Aggregation of the values of each flavor
+    aggregation = fields.Enum(
+        Aggregation, description="Aggregation of the values of each flavor",
+        example="median", required=True,
+    )
+
+    #: (Bool, default=True):
+    #: Rank first the flavors with the highest score
+    descending = fields.Boolean(
+        description="Rank first the flavors with the highest score",
+        example=False, load_default=True,
+    )
+
+
+class Leaderboard(Id, CreateLeaderboard):
+    """Leaderboard schema definition."""
+
+
+class Leaderboards(Pagination, Schema):
+    """Leaderboards pagination schema definition."""
+
+    #: ([Leaderboard], required):
+    #: List of leaderboard items for the pagination object
+    items = fields.Nested(Leaderboard, required=True, many=True)
+
+
+class LeaderboardEntry(Schema):
+    """Leaderboard entry schema definition."""
+
+    #: (Int, required, dump_only):
+    #: Position of the flavor, equal scores share rank
+    rank = fields.Integer(
+        description="Position of the flavor, equal scores share rank",
+        example=1, required=True, dump_only=True,
+    )
+
+    #: (Float, required, dump_only):
+    #: Aggregated value of the flavor results
+    value = fields.Float(
+        description="Aggregated value of the flavor results",
+        example=10.5, required=True, dump_only=True,
+    )
+
+    #: (Int, required, dump_only):
+    #: Number of results aggregated
+    count = fields.Integer(
+        description="Number of results aggregated",
+        example=12, required=True, dump_only=True,
+    )
+
+    #: (Flavor, required):
+    #: Scored flavor
+    flavor = fields.Nested("Flavor", required=True, dump_only=True)
+
+    #: (Site, required):
+    #: Site of the scored flavor
+    site = fields.Nested("Site", required=True, dump_only=True)
+
+
+class LeaderboardEntries(Pagination, Schema):
+    """Leaderboard entries pagination schema definition."""
+
+    #: ([LeaderboardEntry], required):
+    #: List of leaderboard entries for the pagination object
+    items = fields.Nested(LeaderboardEntry, required=True, many=True)
+
+
 class Json(Schema):
     """Special schema to allow free JSON property."""
 
@@ -145,6 +145,56 @@ DB_CONNECTION = f'postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}'
 SQLALCHEMY_DATABASE_URI = f'{DB_CONNECTION}/{DB_NAME}'
 SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+DB_POOL_SIZE = int("DB_POOL_SIZE", default=5)
+"""| Number of connections each worker keeps open to the database;
+| default value is 5.
+
+:meta hide-value:
+"""
+
+DB_MAX_OVERFLOW = int("DB_MAX_OVERFLOW", default=10)
+"""| Number of connections each worker can open over `DB_POOL_SIZE`
+| when all of them are in use; default value is 10.
+
+:meta hide-value:
+"""
+
+DB_POOL_TIMEOUT = int("DB_POOL_TIMEOUT", default=30)
+"""| Seconds a request waits for a free connection before failing;
+| default value is 30.
+
+:meta hide-value:
+"""
+
+DB_POOL_RECYCLE = int("DB_POOL_RECYCLE", default=-1)
+"""| Seconds after which a connection is replaced on the next checkout;
+| default value is -1 (connections are never replaced).
+
+:meta hide-value:
+"""
+
+DB_POOL_PRE_PING = bool("DB_POOL_PRE_PING", default=False)
+"""| Test each connection when it is taken from the pool and replace it
+| if the database closed it; default value is False.
+
+:meta hide-value:
+"""
+
+DB_STATEMENT_TIMEOUT = int("DB_STATEMENT_TIMEOUT", default=0)
+"""| Milliseconds after which the database cancels a statement;
+| default value is 0 (statements are never canceled).
+
+:meta hide-value:
+"""
+
+DB_PGBOUNCER = bool("DB_PGBOUNCER", default=False)
+"""| Connect through PgBouncer in transaction pooling mode. Connections
+| do not send startup options or keep session state, so the statement
+| timeout is set at the beginning of each transaction; default is False.
+
+:meta hide-value:
+"""
+
 
 # Crypt configuration
 BCRYPT_LOG_ROUNDS = int("BCRYPT_LOG_ROUNDS", default=12)
@@ -155,6 +205,113 @@ BCRYPT_LOG_ROUNDS = int("BCRYPT_LOG_ROUNDS", default=12)
 """
 
 
+# Results configuration
+RESULTS_BATCH_LIMIT = int("RESULTS_BATCH_LIMIT", default=10000)
+"""| Maximum number of results accepted on a single batch upload.
+| See `/results:batch`; default value is 10000.
+
+:meta hide-value:
+"""
+
+RESULTS_EXPORT_BATCH_SIZE = int("RESULTS_EXPORT_BATCH_SIZE", default=1000)
+"""| Number of results read from the database cursor and written at once
+| when streaming an export. See `/results:export`; default value is 1000.
+
+:meta hide-value:
+"""
+
+RESULTS_QUERY_MAX_COST = int("RESULTS_QUERY_MAX_COST", default=0)
+"""| Maximum planner cost of the statements executed to list or search
+| results, more expensive queries fail with 422 before they are executed.
+| See `EXPLAIN` on PostgreSQL; default value is 0 (not limited).
+
+:meta hide-value:
+"""
+
+RESULTS_QUERY_TIMEOUT = int("RESULTS_QUERY_TIMEOUT", default=0)
+"""| Milliseconds after which the statements executed to list or search
+| results are canceled and the request fails with 503; default value is
+| 0 (DB_STATEMENT_TIMEOUT applies).
+
+:meta hide-value:
+"""
+
+
+# Slow query log configuration
+SLOW_QUERY_THRESHOLD = int("SLOW_QUERY_THRESHOLD", default=0)
+"""| Milliseconds after which an SQL statement is logged and recorded on
+| `/slow_queries`; default value is 0 (statements are not recorded).
+
+:meta hide-value:
+"""
+
+SLOW_QUERY_EXPLAIN = bool("SLOW_QUERY_EXPLAIN", default=False)
+"""| Capture the estimated plan of the slow SELECT statements with
+| `EXPLAIN`, they are not executed again; default value is False.
+
+:meta hide-value:
+"""
+
+
+# Container registry configuration
+REGISTRY_TIMEOUT = int("REGISTRY_TIMEOUT", default=10)
+"""| Seconds to wait for a container registry to connect or respond when
+| validating a benchmark image; default value is 10.
+
+:meta hide-value:
+"""
+
+REGISTRY_CACHE_TTL = int("REGISTRY_CACHE_TTL", default=3600)
+"""| Seconds an image manifest found on a registry is cached;
+| default value is 3600.
+
+:meta hide-value:
+"""
+
+REGISTRY_CACHE_NEGATIVE_TTL = int("REGISTRY_CACHE_NEGATIVE_TTL", default=60)
+"""| Seconds an image manifest not found or not authorized on a registry
+| is cached; default value is 60.
+
+:meta hide-value:
+"""
+
+
+# HTTP caching configuration
+HTTP_CACHE_MAX_AGE = int("HTTP_CACHE_MAX_AGE", default=0)
+"""| Seconds clients and proxies can reuse the responses of the public
+| endpoints with ETag before validating them again; default value is 0.
+
+:meta hide-value:
+"""
+
+
+# Query cache configuration
+QUERY_CACHE_BACKEND = str("QUERY_CACHE_BACKEND", default="memory",
+                          validate=OneOf(["memory", "database", "none"]))
+"""| Backend to cache the responses of frequent public list queries:
+|  - 'memory': LRU cache on each worker process (default)
+|  - 'database': Unlogged table shared by all the workers
+|  - 'none': Responses are not cached
+
+:meta hide-value:
+"""
+
+QUERY_CACHE_MAXSIZE = int("QUERY_CACHE_MAXSIZE", default=1024)
+"""| Maximum number of responses kept on the query cache;
+| default value is 1024.
+
+:meta hide-value:
+"""
+
+# Metrics configuration
+METRICS_ENABLED = bool("METRICS_ENABLED", default=True)
+"""| Measure the requests and publish the Prometheus metrics on `/metrics`.
+| With multiple gunicorn workers, set PROMETHEUS_MULTIPROC_DIR to an
+| empty directory shared by the workers; default value is True.
+
+:meta hide-value:
+"""
+
 # Authorization configuration.
 TRUSTED_OP_LIST = list("TRUSTED_OP_LIST", default=[
     'https://aai.egi.eu/oidc',
@@ -178,6 +335,48 @@ ADMIN_ENTITLEMENTS = list("ADMIN_ENTITLEMENTS", dev_default=[])
 :meta hide-value:
 """
 
+# Rate limiting configuration
+RATE_LIMIT_BACKEND = str("RATE_LIMIT_BACKEND", default="none",
+                         validate=OneOf(["memory", "database", "none"]))
+"""| Backend keeping the token buckets of the rate limiter, each one
+| identified by the token (sub, iss) or, for anonymous requests, the
+| client IP:
+|  - 'memory': Buckets on each worker process
+|  - 'database': Unlogged table shared by all the workers
+|  - 'none': Requests are not rate limited (default)
+
+:meta hide-value:
+"""
+
+RATE_LIMIT_CAPACITY = int("RATE_LIMIT_CAPACITY", default=120)
+"""| Maximum tokens of a bucket, the burst a client can send at once.
+| Each request takes from 1 token to the cost of its route;
+| default value is 120.
+
+:meta hide-value:
+"""
+
+RATE_LIMIT_RATE = int("RATE_LIMIT_RATE", default=60)
+"""| Tokens per minute refilled on each bucket; default value is 60.
+
+:meta hide-value:
+"""
+
+RATE_LIMIT_CONCURRENCY = int("RATE_LIMIT_CONCURRENCY", default=0)
+"""| Maximum requests served at the same time to each client by a
+| worker process; default value is 0 (not limited).
+
+:meta hide-value:
+"""
+
+PROXY_FIX_X_FOR = int("PROXY_FIX_X_FOR", default=0)
+"""| Number of trusted proxies in front of the application appending the
+| client address to X-Forwarded-For. The address added by the furthest
+| of them is used as client IP; default value is 0 (header ignored).
+
+:meta hide-value:
+"""
+
 # Email and notification configuration.
 MAIL_SUPPORT = str("MAIL_SUPPORT", default="")
 """ Email list for application support. This email receives administration
@@ -207,6 +406,34 @@ MAIL_PORT = int("MAIL_PORT", default=25)
 if MAIL_SERVER == "":  # Mail into console
     MAIL_BACKEND = 'console'
 
+NOTIFICATIONS_BATCH_SIZE = int("NOTIFICATIONS_BATCH_SIZE", default=100)
+"""| Maximum number of notifications sent over a single SMTP connection
+| by the notifications dispatcher; default value is 100.
+
+:meta hide-value:
+"""
+
+NOTIFICATIONS_MAX_ATTEMPTS = int("NOTIFICATIONS_MAX_ATTEMPTS", default=5)
+"""| Delivery attempts before a notification is marked as failed;
+| default value is 5.
+
+:meta hide-value:
+"""
+
+NOTIFICATIONS_RETRY_DELAY = int("NOTIFICATIONS_RETRY_DELAY", default=60)
+"""| Seconds to wait before retrying a failed delivery, doubled on each
+| new attempt; default value is 60.
+
+:meta hide-value:
+"""
+
+NOTIFICATIONS_POLL_INTERVAL = int("NOTIFICATIONS_POLL_INTERVAL", default=5)
+"""| Seconds the notifications dispatcher waits when the outbox has no
+| pending notifications; default value is 5.
+
+:meta hide-value:
+"""
+
 
 # API specs configuration
 BACKEND_ROUTE = str("BACKEND_ROUTE", default="/")
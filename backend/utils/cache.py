@@ -0,0 +1,309 @@
+"""Module with the cache of the responses of frequent queries.
+
+Public list methods, such as ListResults, receive the same queries over
+and over from the frontend. The responses of those queries are kept on
+a cache keyed by the endpoint, the normalized query arguments and the
+version of the tables the response is built from. Any change on those
+tables increases their version, see :mod:`backend.models.models.version`,
+so outdated entries are never returned again and are evicted as the
+cache fills.
+
+The backend is selected with QUERY_CACHE_BACKEND:
+ - memory: Process-wide LRU cache, each worker keeps its own entries.
+ - database: Unlogged table shared by all the workers and hosts.
+ - none: Responses are not cached.
+
+Additional backends can be registered on :data:`backends`.
+"""
+import abc
+import functools
+import hashlib
+import json
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import datetime as dt
+
+from flask import current_app, request
+from prometheus_client import Counter
+from sqlalchemy import (Column, DateTime, Index, LargeBinary, Table, Text,
+                        delete, func, select)
+from sqlalchemy.dialects.postgresql import insert
+
+from ..extensions import db
+from ..models.models import version
+from .queries import etag_tables
+
+#: Unlogged table with the entries of the database backend
+entries = Table(
+    "query_cache", db.metadata,
+    Column("key", Text, primary_key=True),
+    Column("value", LargeBinary, nullable=False),
+    Column("created", DateTime, nullable=False, default=dt.now),
+    Index("ix_query_cache_created", "created"),
+    prefixes=["UNLOGGED"],
+)
+
+#: Number of lookups on the cache by backend and result (hit or miss)
+lookups = Counter(
+    "query_cache_lookups", "Lookups on the query cache", ["backend", "result"],
+)
+
+_backends = {}
+_lock = threading.Lock()
+
+
+class CacheInfo(namedtuple("CacheInfo", [
+    "backend", "hits", "misses", "maxsize", "currsize", "nbytes",
+])):
+    """Cache statistics, hits and misses are counted per process."""
+
+    @property
+    def hit_rate(self):
+        """Fraction of the cache lookups that found a response."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class Backend(abc.ABC):
+    """Base class for the query cache backends.
+
+    Subclasses implement how entries are read, stored, removed and
+    measured; lookups are counted on this class.
+
+    :param maxsize: Maximum number of entries kept in the cache
+    :type maxsize: int
+    """
+
+    #: Name of the backend on QUERY_CACHE_BACKEND
+    name = None
+
+    def __init__(self, maxsize):
+        """Create an empty cache backend."""
+        self.maxsize = maxsize
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value for the key or None if missing.
+
+        :param key: Key of the entry
+        :type key: str
+        :return: The cached value
+        :rtype: bytes
+        """
+        value = self._get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        lookups.labels(self.name, "miss" if value is None else "hit").inc()
+        return value
+
+    def set(self, key, value):
+        """Store the value for the key, evicting the oldest entries.
+
+        :param key: Key of the entry
+        :type key: str
+        :param value: Value to cache
+        :type value: bytes
+        """
+        self._set(key, value)
+
+    def clear(self):
+        """Remove all the entries and reset the counters."""
+        self._clear()
+        with self._lock:
+            self.hits = self.misses = 0
+
+    def info(self):
+        """Return the cache hits, misses, maxsize and current usage.
+
+        :return: Cache statistics
+        :rtype: :class:`CacheInfo`
+        """
+        currsize, nbytes = self._usage()
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        return CacheInfo(
+            self.name, hits, misses, self.maxsize, currsize, nbytes,
+        )
+
+    @abc.abstractmethod
+    def _get(self, key):
+        """Return the stored value for the key or None."""
+
+    @abc.abstractmethod
+    def _set(self, key, value):
+        """Store the value for the key and evict the oldest entries."""
+
+    @abc.abstractmethod
+    def _clear(self):
+        """Remove all the entries."""
+
+    @abc.abstractmethod
+    def _usage(self):
+        """Return the number of entries and their size in bytes."""
+
+
+class MemoryBackend(Backend):
+    """Process-wide LRU cache of responses."""
+
+    name = "memory"
+
+    def __init__(self, maxsize):
+        """Create an empty cache backend."""
+        super().__init__(maxsize)
+        self._cache = OrderedDict()
+        self._nbytes = 0
+
+    def _get(self, key):
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        return None
+
+    def _set(self, key, value):
+        with self._lock:
+            if key in self._cache:
+                self._nbytes -= len(self._cache.pop(key))
+            self._cache[key] = value
+            self._nbytes += len(value)
+            while len(self._cache) > self.maxsize:
+                self._nbytes -= len(self._cache.popitem(last=False)[1])
+
+    def _clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._nbytes = 0
+
+    def _usage(self):
+        with self._lock:
+            return len(self._cache), self._nbytes
+
+
+class DatabaseBackend(Backend):
+    """Cache of responses shared on an unlogged database table.
+
+    Entries are written on the request session once the response is
+    built and committed at once, cached methods only read, so they are
+    available to other workers without a second connection of the pool.
+    """
+
+    name = "database"
+
+    def _get(self, key):
+        statement = select(entries.c.value).where(entries.c.key == key)
+        return db.session.execute(statement).scalar()
+
+    def _set(self, key, value):
+        statement = insert(entries).values(key=key, value=value)
+        statement = statement.on_conflict_do_update(
+            index_elements=[entries.c.key],
+            set_={'value': value, 'created': dt.now()},
+        )
+        cutoff = select(entries.c.created).order_by(
+            entries.c.created.desc()
+        ).offset(self.maxsize).limit(1).scalar_subquery()  # Index scan
+        db.session.execute(statement)
+        db.session.execute(delete(entries).where(entries.c.created <= cutoff))
+        db.session.commit()
+
+    def _clear(self):
+        db.session.execute(delete(entries))
+        db.session.commit()
+
+    def _usage(self):
+        statement = select(func.count(), func.coalesce(func.sum(
+            func.octet_length(entries.c.key) +
+            func.octet_length(entries.c.value)
+        ), 0))
+        currsize, nbytes = db.session.execute(statement).one()
+        return currsize, int(nbytes)
+
+
+#: Backends available to select on QUERY_CACHE_BACKEND
+backends = {
+    MemoryBackend.name: MemoryBackend,
+    DatabaseBackend.name: DatabaseBackend,
+}
+
+
+def backend():
+    """Return the cache backend configured on the application.
+
+    :return: The cache backend or None if the cache is disabled
+    :rtype: :class:`Backend`
+    """
+    config = current_app.config
+    name = config['QUERY_CACHE_BACKEND']
+    if name == "none":
+        return None
+    key = name, config['QUERY_CACHE_MAXSIZE']
+    with _lock:
+        if key not in _backends:
+            _backends[key] = backends[name](key[1])
+        return _backends[key]
+
+
+def cached(model, schema):
+    """Cache the responses of a controller method.
+
+    Place it between the arguments and response decorators, so the
+    parsed query arguments are used as key and the serialized response
+    is cached. Only responses with status 200 are cached.
+
+    :param model: Model returned by the controller method
+    :type model: :class:`backend.model.core.BaseModel`
+    :param schema: Schema used to serialize the returned items
+    :type schema: :class:`marshmallow.Schema`
+    :return: Decorated function
+    :rtype: fun
+    """
+    def decorator_cached(func):
+        @functools.wraps(func)
+        def decorator(*args, **kwargs):
+            """Return the cached response if the tables did not change."""
+            cache = backend()
+            if cache is None:
+                return func(*args, **kwargs)
+            versions = version.current(etag_tables(model, schema()))
+            key = cache_key(request.endpoint, args[0], versions)
+            value = cache.get(key)
+            if value is not None:
+                return current_app.response_class(
+                    value, mimetype="application/json",
+                )
+            response = func(*args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.get_data())
+            return response
+        return decorator
+    return decorator_cached
+
+
+def cache_key(endpoint, query_args, versions):
+    """Return the key of a response on the cache.
+
+    :param endpoint: Endpoint of the request
+    :type endpoint: str
+    :param query_args: Parsed query arguments of the request
+    :type query_args: dict
+    :param versions: Version of the tables the response is built from
+    :type versions: dict
+    :return: The cache key
+    :rtype: str
+    """
+    dump = json.dumps(
+        [endpoint, query_args, versions],
+        sort_keys=True, separators=(',', ':'), default=str,
+    )
+    return hashlib.sha256(dump.encode()).hexdigest()
+
+
+def clear():
+    """Remove the cached responses of the configured backend."""
+    cache = backend()
+    if cache is not None:
+        cache.clear()
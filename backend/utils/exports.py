@@ -0,0 +1,265 @@
+"""Module with the writers to stream query items as files.
+
+Exports read the query with a server side cursor, see
+:meth:`sqlalchemy.orm.Query.yield_per`, and write each batch of items
+into the response as soon as it is collected, so the memory used does
+not depend on the number of exported items.
+
+Each writer receives the serialized items and the columns to write:
+ - ndjson: One JSON document per line, columns are not used.
+ - csv: One line per item with the nested items and json paths
+   flattened into columns named by their path ('.' delimiter), other
+   objects and lists written as JSON.
+ - parquet: One row group per batch with the flattened columns, it
+   requires the optional package pyarrow.
+
+Additional writers can be registered on :data:`writers`.
+"""
+import csv as _csv
+import io
+import itertools
+import json
+
+from marshmallow import fields as ma_fields
+from sqlalchemy import Text, func, select, true
+from sqlalchemy.dialects.postgresql import array
+
+try:  # Optional dependency to write parquet files
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover
+    pyarrow = None
+
+
+def ndjson(items, columns=None, batch_size=1000):
+    """Write each item as a JSON document on a new line.
+
+    :param items: Serialized items to write
+    :type items: iterable
+    :param columns: Not used, items are written complete
+    :type columns: list
+    :param batch_size: Number of items on each chunk
+    :type batch_size: int
+    :return: Generator with the text chunks of the file
+    :rtype: generator
+    """
+    for batch in _batches(items, batch_size):
+        yield "".join(json.dumps(item) + "\n" for item in batch)
+
+
+def csv(items, columns, batch_size=1000):
+    """Write each item flattened as a line of comma separated values.
+
+    :param items: Serialized items to write
+    :type items: iterable
+    :param columns: Names and types of the columns to write
+    :type columns: list
+    :param batch_size: Number of items on each chunk
+    :type batch_size: int
+    :return: Generator with the text chunks of the file
+    :rtype: generator
+    """
+    buffer = io.StringIO()
+    names = [name for name, _ in columns]
+    writer = _csv.DictWriter(buffer, names)
+    writer.writeheader()
+    for batch in _batches(items, batch_size):
+        writer.writerows(row(item, names) for item in batch)
+        yield _collect(buffer)
+    yield _collect(buffer)
+
+
+def parquet(items, columns, batch_size=1000):
+    """Write the items flattened as row groups of a parquet file.
+
+    Columns of json paths with only numbers or booleans are typed, other
+    columns are written as strings.
+
+    :param items: Serialized items to write
+    :type items: iterable
+    :param columns: Names and types of the columns to write
+    :type columns: list
+    :param batch_size: Number of items on each row group
+    :type batch_size: int
+    :return: Generator with the binary chunks of the file
+    :rtype: generator
+    """
+    types = {"number": pyarrow.float64(), "boolean": pyarrow.bool_()}
+    schema = pyarrow.schema([
+        (name, types.get(type, pyarrow.string())) for name, type in columns
+    ])
+    sink = _Chunks()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema)
+    for batch in _batches(items, batch_size):
+        rows = [row(item, schema.names) for item in batch]
+        writer.write_table(pyarrow.Table.from_pydict({
+            field.name: [_typed(x[field.name], field.type) for x in rows]
+            for field in schema
+        }, schema=schema))
+        yield sink.collect()
+    writer.close()
+    yield sink.collect()
+
+
+#: Writers available by format, with their mimetype
+writers = {
+    "ndjson": (ndjson, "application/x-ndjson"),
+    "csv": (csv, "text/csv"),
+    "parquet": (parquet, "application/vnd.apache.parquet"),
+}
+
+
+def available(format):
+    """Return True if the format can be written on this installation."""
+    return format != "parquet" or pyarrow is not None
+
+
+def columns(schema, tree, json_paths=None):
+    """Return the flattened columns of the items serialized by a schema.
+
+    :param schema: Schema used to serialize the items
+    :type schema: :class:`marshmallow.Schema`
+    :param tree: Selected fields, see :func:`queries.selection`
+    :type tree: dict
+    :param json_paths: Leaf paths and types of the json field, if any
+    :type json_paths: list
+    :return: Names and value types of the columns
+    :rtype: list
+    """
+    result = []
+    for name, subtree in tree.items():
+        field = schema.fields[name]
+        if name == "json" and json_paths is not None:
+            result += [(f"json.{path}", type) for path, type in json_paths]
+        elif isinstance(field, ma_fields.Nested) and not field.many:
+            nested = subtree or {
+                x: None for x, y in field.schema.fields.items()
+                if not y.load_only
+            }
+            result += [
+                (f"{name}.{path}", type)
+                for path, type in columns(field.schema, nested)
+            ]
+        else:
+            result.append((name, None))
+    return result
+
+
+def json_paths(query, column, prefixes=None):
+    """Return the paths and types of the json leaves found by a query.
+
+    Objects are explored recursively by the database, any other value
+    (including arrays) is a leaf. The type of a path is the json type
+    of its values, or None when values of several types are found.
+
+    :param query: Query with the exported items
+    :type query: :class:`flask_sqlalchemy.BaseQuery`
+    :param column: Json column of the query model
+    :type column: :class:`sqlalchemy.Column`
+    :param prefixes: Selected json paths, default all
+    :type prefixes: list
+    :return: Sorted paths ('.' delimiter) and types
+    :rtype: list
+    """
+    items = query.order_by(None).with_entities(column.label("json"))
+    items = items.subquery()
+    each = func.jsonb_each(items.c.json).table_valued("key", "value")
+    leaves = select(
+        array([each.c.key], type_=Text).label("path"), each.c.value,
+    ).select_from(items).join(each, true()).cte(recursive=True)
+    nested = func.jsonb_each(leaves.c.value).table_valued("key", "value")
+    leaves = leaves.union_all(select(
+        leaves.c.path + array([nested.c.key], type_=Text), nested.c.value,
+    ).select_from(leaves).join(nested, true()).where(
+        func.jsonb_typeof(leaves.c.value) == "object"
+    ))
+    types = func.array_agg(func.distinct(func.jsonb_typeof(leaves.c.value)))
+    statement = select(leaves.c.path, types).where(
+        func.jsonb_typeof(leaves.c.value) != "object"
+    ).group_by(leaves.c.path).order_by(leaves.c.path)
+    result = []
+    for path, found in query.session.execute(statement):
+        path = ".".join(path)
+        if prefixes is not None and not any(
+            path == x or path.startswith(x + ".") for x in prefixes
+        ):
+            continue
+        found = set(found) - {"null"}
+        result.append((path, found.pop() if len(found) == 1 else None))
+    return result
+
+
+def row(item, names):
+    """Return the values of a serialized item for each column.
+
+    Objects and lists found on a column are written as JSON text and
+    columns not found on the item are None.
+
+    :param item: Serialized item
+    :type item: dict
+    :param names: Names of the columns, '.' as path delimiter
+    :type names: list
+    :return: Dictionary with the value of each column
+    :rtype: dict
+    """
+    result = {}
+    for name in names:
+        value = item
+        for key in name.split("."):
+            value = value.get(key) if isinstance(value, dict) else None
+        if isinstance(value, (dict, list)):
+            value = json.dumps(value)
+        result[name] = value
+    return result
+
+
+def _batches(items, batch_size):
+    """Return the items grouped in lists of batch size."""
+    items = iter(items)
+    while True:
+        batch = list(itertools.islice(items, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def _collect(buffer):
+    """Return the buffer content and empty it."""
+    data = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return data
+
+
+def _typed(value, type):
+    """Return a column value converted to a parquet column type."""
+    if value is None or type != pyarrow.string() or isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+
+class _Chunks(io.RawIOBase):
+    """Writable stream keeping the written bytes until collected."""
+
+    def __init__(self):
+        """Create an empty stream."""
+        self._chunks, self._position = [], 0
+
+    def writable(self):
+        """Return True, the stream is writable."""
+        return True
+
+    def write(self, data):
+        """Keep the written bytes."""
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        """Return the number of bytes written since creation."""
+        return self._position
+
+    def collect(self):
+        """Return and remove the bytes written since last collection."""
+        data, self._chunks = b"".join(self._chunks), []
+        return data
@@ -1,37 +1,446 @@
-"""Module with tools to handle sql filters."""
-from sqlalchemy import Boolean, Float
+"""Module with tools to handle sql filters.
+
+Result filters are written in a small language and compiled into
+SQLAlchemy expressions on the result json. A filter is a comparison
+``<path> <operator> <value>``, where the path uses '.' as delimiter and
+the operator is one of ``==``, ``!=``, ``<``, ``>``, ``<=``, ``>=``:
+
+ - ``cpu.count in [4, 8]``: The value is one of the list.
+ - ``score between 10 and 20``: The value is on the range (inclusive).
+ - ``has gpu.model``: The path exists on the result json.
+
+Filters are combined with ``and`` and ``or``, ``and`` binds first, and
+grouped with parentheses, for example
+``(cpu.count >= 8 or has gpu.model) and score > 10``.
+
+Values in double quotes are strings. Otherwise ``true`` and ``false``
+(and their capitalized spellings) are booleans, numbers without exponent
+are numbers and any other value is a string. Append ``:number``,
+``:boolean`` or ``:string`` to the path to set the type explicitly, for
+example ``version:string == 1e3`` or ``score:number > 1e3``.
+
+Filters accepted before the filter language, a single ``<path> <operator>
+<value>`` separated by spaces, keep working when they are not valid on
+the language, for example ``has == 1`` on a key named 'has' or
+``version == 1,2`` on an unquoted value with delimiters. Their path can
+not include types, delimiters or operators.
+
+Filters are parsed once and compiled into the expressions that can use
+the result indexes: equality and ``in`` use JSONB containment, or a JSON
+path match with the cast comparison for inferred numbers and booleans,
+and ``has`` a JSON path match (GIN `jsonb_path_ops` index) and the
+promoted paths of the benchmark their typed expression index, see
+:mod:`backend.models.models.promoted`.
+"""
+import functools
+import json
+import math
+import re
+from collections import namedtuple
+
+from sqlalchemy import Text, and_, func, literal, or_
+
+from ..models.models import promoted
 
 str_booleans = [
     "true", "True", "TRUE",
     "false", "False", "FALSE",
 ]
 
+#: Comparison operators
+operators = ["==", "!=", "<", ">", "<=", ">="]
+
+#: Numbers inferred from unquoted values, other need an explicit type
+inferred_number = re.compile(r"-?\d+(\.\d+)?")
+
+#: Numbers accepted with an explicit number type (JSON numbers)
+json_number = re.compile(r"-?(0|[1-9]\d*)(\.\d+)?([eE][+-]?\d+)?")
+
+#: Tokens of the filter language, whitespace is ignored
+tokens = re.compile(r"""
+    \s*(?:
+        (?P<string>"(?:[^"\\]|\\.)*")
+      | (?P<operator>==|!=|<=|>=|<|>)
+      | (?P<symbol>[()\[\],])
+      | (?P<word>[^\s()\[\],"<>=!]+)
+      | (?P<error>\S)
+    )
+""", re.VERBOSE)
+
+#: Filters written as '<path> <operator> <value>' before the language
+legacy = re.compile(r"""
+    (?P<path>[^\s()\[\],"<>=!:]+)
+    \ (?P<operator>==|!=|<=|>=|<|>)
+    \ (?P<value>\S+)
+""", re.VERBOSE)
+
+#: Value written on a filter, quoted values are always strings
+Literal = namedtuple("Literal", ["text", "quoted"])
+
+#: Comparison of the value on a path with one or more literals
+Comparison = namedtuple(
+    "Comparison", ["path", "type", "operator", "literals"],
+)
+
+#: Existence of a path on the result json
+Has = namedtuple("Has", ["path"])
+
+#: Filters combined with 'and' or 'or'
+Group = namedtuple("Group", ["operator", "items"])
+
+
+class FilterError(ValueError):
+    """Filter not following the filter language."""
+
+
+def new_filter(model, filter, benchmark_id=None):
+    """Create new filter from a string.
+
+    When the path is promoted for the benchmark, the value is interpreted
+    using the promoted type and the filter is compiled into the indexed
+    expression, see :mod:`backend.models.models.promoted`. Otherwise the
+    equality operator is compiled into JSONB containment, see
+    :func:`containment`.
+
+    :param model: Model with the json column to filter
+    :type model: :class:`backend.models.Result`
+    :param filter: Filter written in the filter language
+    :type filter: str
+    :param benchmark_id: Benchmark of the filtered results, if any
+    :type benchmark_id: str
+    :raises FilterError: The filter is not valid
+    :return: The filter expression
+    :rtype: :class:`sqlalchemy.sql.expression.ColumnElement`
+    """
+    return expression(parse(filter), model, benchmark_id)
+
+
+@functools.lru_cache(maxsize=1024)
+def parse(filter):
+    """Parse a filter string into its syntax tree.
+
+    :param filter: Filter written in the filter language
+    :type filter: str
+    :raises FilterError: The filter is not valid
+    :return: Root node of the filter
+    :rtype: :class:`Comparison`, :class:`Has` or :class:`Group`
+    """
+    try:
+        parser = _Parser(filter)
+        node = parser.expression()
+        if parser.peek() is not None:
+            parser.fail("Expected 'and', 'or' or the end of the filter")
+    except FilterError:
+        match = legacy.fullmatch(filter)
+        keys = tuple(match['path'].split(".")) if match else ()
+        if not keys or not all(keys):
+            raise
+        literals = Literal(match['value'], False),
+        return Comparison(keys, None, match['operator'], literals)
+    return node
+
+
+class _Parser:
+    """Recursive descent parser of the filter language."""
+
+    def __init__(self, filter):
+        self.filter, self.tokens = filter, []
+        for match in tokens.finditer(filter):
+            if match.lastgroup == "error":
+                raise FilterError(
+                    f"Unexpected '{match.group('error')}' "
+                    f"at position {match.start('error')}"
+                )
+            if match.lastgroup is not None:
+                kind = match.lastgroup
+                token = kind, match.group(kind), match.start(kind)
+                self.tokens.append(token)
+        self.index = 0
+
+    def peek(self, offset=0):
+        index = self.index + offset
+        return self.tokens[index] if index < len(self.tokens) else None
+
+    def next(self):
+        token = self.peek()
+        if token is None:
+            raise FilterError("Unexpected end of the filter")
+        self.index += 1
+        return token
+
+    def accept(self, kind, value=None):
+        token = self.peek()
+        if token is not None and token[0] == kind and \
+                (value is None or token[1] == value):
+            self.index += 1
+            return token
+        return None
+
+    def expect(self, kind, value=None):
+        token = self.accept(kind, value)
+        if token is None:
+            self.fail(f"Expected '{value or kind}'")
+        return token
+
+    def fail(self, reason):
+        token = self.peek()
+        if token is None:
+            raise FilterError(f"{reason}, found the end of the filter")
+        raise FilterError(
+            f"{reason}, found '{token[1]}' at position {token[2]}"
+        )
+
+    def expression(self):
+        items = [self.term()]
+        while self.accept("word", "or"):
+            items.append(self.term())
+        return items[0] if len(items) == 1 else Group("or", tuple(items))
 
-def new_filter(model, filter):
-    """Create new filter from a string."""
-    path, operator, value = tuple(filter.split(' '))
-    path = tuple(path.split('.'))
+    def term(self):
+        items = [self.factor()]
+        while self.accept("word", "and"):
+            items.append(self.factor())
+        return items[0] if len(items) == 1 else Group("and", tuple(items))
 
-    try:  # Resolve the correct operation
-        value = float(value)
-        element = model.json[path].astext.cast(Float)
-    except ValueError:
-        if value in str_booleans:
-            element = model.json[path].astext.cast(Boolean)
+    def factor(self):
+        if self.accept("symbol", "("):
+            node = self.expression()
+            self.expect("symbol", ")")
+            return node
+        if self.accept("word", "has"):
+            path, type = self.path()
+            if type is not None:
+                raise FilterError("Types are not allowed on 'has' paths")
+            return Has(path)
+        path, type = self.path()
+        if self.accept("word", "in"):
+            self.expect("symbol", "[")
+            literals = [self.literal()]
+            while self.accept("symbol", ","):
+                literals.append(self.literal())
+            self.expect("symbol", "]")
+            return Comparison(path, type, "in", tuple(literals))
+        if self.accept("word", "between"):
+            lower = self.literal()
+            self.expect("word", "and")
+            return Comparison(path, type, "between", (lower, self.literal()))
+        token = self.accept("operator")
+        if token is None:
+            self.fail(f"Expected one of {operators + ['in', 'between']}")
+        return Comparison(path, type, token[1], (self.literal(),))
+
+    def path(self):
+        token = self.accept("word")
+        if token is None:
+            self.fail("Expected a json path")
+        path, _, type = token[1].partition(":")
+        if type and type not in promoted.types:
+            raise FilterError(
+                f"Unknown type '{type}', use one of {sorted(promoted.types)}"
+            )
+        keys = tuple(path.split("."))
+        if not all(keys):
+            raise FilterError(f"Invalid json path '{path}'")
+        return keys, type or None
+
+    def literal(self):
+        kind, value, position = self.next()
+        if kind == "string":
+            return Literal(json.loads(value), True)
+        if kind == "word":
+            return Literal(value, False)
+        raise FilterError(f"Expected a value, found '{value}' at position "
+                          f"{position}")
+
+
+def render(node):
+    """Return the normalized text of a filter syntax tree.
+
+    :param node: Root node of the filter
+    :type node: :class:`Comparison`, :class:`Has` or :class:`Group`
+    :return: The filter text, parsed again returns the same tree
+    :rtype: str
+    """
+    if isinstance(node, Group):
+        items = [
+            f"({render(x)})" if isinstance(x, Group) else render(x)
+            for x in node.items
+        ]
+        return f" {node.operator} ".join(items)
+    if isinstance(node, Has):
+        return f"has {'.'.join(node.path)}"
+    path = ".".join(node.path) + (f":{node.type}" if node.type else "")
+    values = [
+        json.dumps(x.text) if x.quoted else x.text for x in node.literals
+    ]
+    if node.operator == "in":
+        return f"{path} in [{', '.join(values)}]"
+    if node.operator == "between":
+        return f"{path} between {values[0]} and {values[1]}"
+    return f"{path} {node.operator} {values[0]}"
+
+
+def expression(node, model, benchmark_id=None):
+    """Compile a filter syntax tree into a SQLAlchemy expression.
+
+    :param node: Root node of the filter
+    :type node: :class:`Comparison`, :class:`Has` or :class:`Group`
+    :param model: Model with the json column to filter
+    :type model: :class:`backend.models.Result`
+    :param benchmark_id: Benchmark of the filtered results, if any
+    :type benchmark_id: str
+    :raises FilterError: A value does not match the filter type
+    :return: The filter expression
+    :rtype: :class:`sqlalchemy.sql.expression.ColumnElement`
+    """
+    if isinstance(node, Group):
+        join = and_ if node.operator == "and" else or_
+        return join(*[expression(x, model, benchmark_id) for x in node.items])
+    if isinstance(node, Has):
+        return has(model, node.path)
+
+    promoted_type = promoted.lookup(benchmark_id, node.path)
+    type = node.type or promoted_type
+    values = [typed(x, type) for x in node.literals]
+    if node.operator in ("==", "in") and promoted_type is None:
+        conditions = [containment(model, node.path, x) for x in values]
+        if all(x is not None for x in conditions):
+            return or_(*conditions)
+
+    types = {value_type(x) for x in values}
+    if len(types) > 1:
+        raise FilterError(f"Values of different types on '{render(node)}'")
+    if type is not None and type == promoted_type:
+        element = promoted.expression(model.json, node.path, type)
+    else:
+        element = model.json[node.path].astext
+        cast = promoted.types[type or types.pop()]
+        element = element if cast is None else element.cast(cast)
+
+    values = [literal(x[0]) for x in values]  # Booleans as parameters
+    if node.operator == "in":
+        condition = element.in_(values)
+    elif node.operator == "between":
+        condition = element.between(*values)
+    else:
+        condition = {
+            "==": element.__eq__, "!=": element.__ne__,
+            "<": element.__lt__, ">": element.__gt__,
+            "<=": element.__le__, ">=": element.__ge__,
+        }[node.operator](values[0])
+    if node.operator in ("==", "in") and promoted_type is None:
+        return and_(has(model, node.path), condition)  # Indexed candidates
+    return condition
+
+
+def typed(literal, type=None):
+    """Return the value of a literal with the JSON values it matches.
+
+    The JSON values are the candidates of a containment filter, None
+    when containment would not match the same results than comparing
+    the cast path value, see :func:`containment`.
+
+    :param literal: Value written on the filter
+    :type literal: :class:`Literal`
+    :param type: Explicit or promoted type, inferred if None
+    :type type: str
+    :raises FilterError: The value does not match the type
+    :return: The typed value and the JSON values it matches on equality
+    :rtype: tuple
+    """
+    text = literal.text
+    if type is None:
+        if literal.quoted:
+            type = "string"
+        elif text in str_booleans:
+            type = "boolean"
+        elif inferred_number.fullmatch(text):
+            type = "number"
         else:
-            element = model.json[path].astext
-
-    if operator is None:
-        raise KeyError("Filter operator not defined")
-    elif operator == "<":
-        return element < value
-    elif operator == ">":
-        return element > value
-    elif operator == ">=":
-        return element >= value
-    elif operator == "<=":
-        return element <= value
-    elif operator == "==":
-        return element == value
+            type = "string"
+        inferred = True
     else:
-        raise KeyError(f"Unknown filter operator: '{operator}'")
+        inferred = False
+
+    if type == "number":
+        if not json_number.fullmatch(text) or not math.isfinite(float(text)):
+            raise FilterError(f"Expected number value, got '{text}'")
+        number = float(text)  # Inferred also match strings as '10.0'
+        return number, None if inferred else [number]
+    if type == "boolean":
+        if text not in str_booleans:
+            raise FilterError(f"Expected boolean value, got '{text}'")
+        truth = text.lower() == "true"  # Inferred also match 't' or 'yes'
+        return truth, None if inferred else [truth]
+    return text, None if text.startswith("{") else [text]  # '{}' objects
+
+
+def value_type(value):
+    """Return the filter type of a typed value."""
+    if isinstance(value[0], bool):
+        return "boolean"
+    return "number" if isinstance(value[0], float) else "string"
+
+
+def containment(model, path, value):
+    """Return an equality filter using the JSONB containment operator.
+
+    Containment is supported by the GIN `jsonb_path_ops` index on the
+    result json. Strings and values with explicit type match the JSON
+    values equal to them.
+
+    The value is the typed value and its candidates, see :func:`typed`.
+    Returns None when the filter cannot be expressed as containment, for
+    example when the path contains an array index or the value has an
+    inferred number or boolean type, which also matches strings as
+    '10.0' or 't' when the path value is cast.
+    """
+    if value[1] is None or any(key.isdigit() for key in path):
+        return None  # Not matched by containment
+    return or_(*[model.json.contains(nest(path, x)) for x in value[1]])
+
+
+def has(model, path):
+    """Return a filter matching the results with a value on the path.
+
+    The filter is a JSON path match supported by the GIN `jsonb_path_ops`
+    index, except when the path contains an array index.
+    """
+    if any(key.isdigit() for key in path):
+        return model.json[path].isnot(None)
+    jsonpath = "$" + "".join(f".{json.dumps(key)}" for key in path)
+    return model.json.op("@?")(literal(jsonpath, Text))
+
+
+def nest(path, value):
+    """Return a JSON document containing the value on the path."""
+    for key in reversed(path):
+        value = {key: value}
+    return value
+
+
+def text_search(query, vector, terms):
+    """Filter the query items matching all the terms, most relevant first.
+
+    Terms are split into words and each word matches the words on the
+    text search vector starting with it, so `site` matches `site0`.
+    Items are sorted by `ts_rank`, a `sort_by` argument replaces the
+    relevance order, see :func:`backend.utils.queries.add_sorting`.
+
+    :param query: Query to filter and sort
+    :type query: :class:`flask_sqlalchemy.BaseQuery`
+    :param vector: Text search vector column (GIN indexed) of the model
+    :type vector: :class:`sqlalchemy.Column`
+    :param terms: List of terms to search
+    :type terms: [str]
+    :return: Filtered and sorted query
+    :rtype: :class:`flask_sqlalchemy.BaseQuery`
+    """
+    if not terms:
+        return query
+    words = func.plainto_tsquery('simple', " ".join(terms)).cast(Text)
+    tsquery = func.to_tsquery('simple', func.regexp_replace(
+        words, "'(?= |$)", "':*", 'g'  # Prefix match on every word
+    ))
+    query = query.filter(vector.op('@@')(tsquery))
+    return query.order_by(func.ts_rank(vector, tsquery).desc())
@@ -1,26 +1,213 @@
-"""Module to handle docker.io registry."""
-from udocker.container import localrepo
-from udocker.docker import DockerIoAPI
+"""Module to handle container image registries.
 
-doia = DockerIoAPI(localrepo.LocalRepository())
-default_registry = doia.registry_url
+Validating a benchmark requires to find the manifest of its image on
+the container registry. The manifests found, and the images not found
+or not authorized, are kept on a process-wide cache for
+REGISTRY_CACHE_TTL and REGISTRY_CACHE_NEGATIVE_TTL seconds, so
+repeated submissions do not query the registry again.
+
+Each registry is queried with its own :class:`Registry` client, which
+reuses the connections to the registry and is safe to share between
+concurrent requests. Registry errors, such as timeouts, are not cached.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from flask import current_app
+
+#: Registry used for images without registry host, i.e. 'ubuntu'
+default_registry = "https://registry-1.docker.io"
+
+#: Hosts resolved to the default registry
+default_hosts = {"docker.io", "index.docker.io", "registry-1.docker.io"}
+
+#: Hosts reached without TLS, as the docker daemon does by default
+insecure_hosts = {"localhost", "127.0.0.1"}
+
+#: Media types accepted as image manifest
+accept = ", ".join([
+    "application/vnd.docker.distribution.manifest.v2+json",
+    "application/vnd.docker.distribution.manifest.list.v2+json",
+    "application/vnd.docker.distribution.manifest.v1+prettyjws",
+    "application/vnd.oci.image.manifest.v1+json",
+    "application/vnd.oci.image.index.v1+json",
+    "application/json",
+])
+
+#: Maximum number of manifests kept in the cache
+maxsize = 1024
+
+_cache = OrderedDict()
+_clients = {}
+_lock = threading.Lock()
+
+
+class RegistryError(Exception):
+    """The manifest could not be pulled from the registry."""
+
+
+class NotAuthorized(RegistryError):
+    """The registry did not authorize to pull the manifest."""
+
+
+class ManifestNotFound(RegistryError):
+    """The registry has no manifest for the image and tag."""
+
+
+class Registry:
+    """Client to pull image manifests from a container registry.
+
+    Connections are reused between calls and bearer tokens requested
+    when the registry challenges the request, as described on the
+    Docker Registry HTTP API V2.
+    """
+
+    def __init__(self, url):
+        """Create a client for the registry url."""
+        self.url = url
+        self.session = requests.Session()
+
+    def manifest(self, repository, tag, timeout):
+        """Return the manifest of a repository tag.
+
+        :param repository: Repository of the image, i.e. 'library/ubuntu'
+        :type repository: str
+        :param tag: Image tag or digest
+        :type tag: str
+        :param timeout: Seconds to wait to connect and for each response
+        :type timeout: int
+        :raises NotAuthorized: The registry did not authorize the pull
+        :raises ManifestNotFound: The manifest does not exist
+        :raises RegistryError: The registry failed or timed out
+        :return: The image manifest
+        :rtype: dict
+        """
+        url = f"{self.url}/v2/{repository}/manifests/{tag}"
+        headers = {"Accept": accept}
+        try:
+            response = self.session.get(url, headers=headers, timeout=timeout)
+            challenge = response.headers.get("WWW-Authenticate", "")
+            if response.status_code == 401 and \
+                    challenge.lower().startswith("bearer "):
+                token = self.token(challenge, timeout)
+                headers["Authorization"] = f"Bearer {token}"
+                response = self.session.get(
+                    url, headers=headers, timeout=timeout,
+                )
+            if response.status_code == 200:
+                return response.json()
+        except (requests.RequestException, ValueError) as err:
+            raise RegistryError("Error: pulling manifest") from err
+        if response.status_code == 401:
+            raise NotAuthorized("Error: not authorized")
+        elif response.status_code == 404:
+            raise ManifestNotFound("Error: manifest not found")
+        else:
+            raise RegistryError("Error: pulling manifest")
+
+    def token(self, challenge, timeout):
+        """Return an anonymous bearer token for a registry challenge.
+
+        :param challenge: Value of the WWW-Authenticate response header
+        :type challenge: str
+        :param timeout: Seconds to wait to connect and for the response
+        :type timeout: int
+        :return: The bearer token
+        :rtype: str
+        """
+        params = dict(re.findall(r'(\w+)="([^"]*)"', challenge))
+        realm = params.pop("realm", None)
+        if realm is None:
+            raise NotAuthorized("Error: not authorized")
+        response = self.session.get(realm, params=params, timeout=timeout)
+        if response.status_code != 200:
+            raise NotAuthorized("Error: not authorized")
+        body = response.json()
+        return body.get("token") or body.get("access_token")
+
+
+def parse(imagerepo):
+    """Return the registry url and repository of an image.
+
+    :param imagerepo: Image name, i.e. 'ubuntu' or 'ghcr.io/org/image'
+    :type imagerepo: str
+    :return: Registry url and repository
+    :rtype: tuple
+    """
+    components = imagerepo.split('/')
+    registry, host = default_registry, components[0]
+    if len(components) >= 2 and \
+            ('.' in host or ':' in host or host == "localhost"):
+        del components[0]
+        if host not in default_hosts:
+            scheme = "http" if host.split(':')[0] in insecure_hosts \
+                else "https"
+            registry = f"{scheme}://{host}"
+    if registry == default_registry and len(components) == 1:
+        components.insert(0, "library")
+    return registry, '/'.join(components)
+
+
+def client(registry):
+    """Return the shared client of a registry.
+
+    :param registry: Registry url
+    :type registry: str
+    :return: The registry client
+    :rtype: :class:`Registry`
+    """
+    with _lock:
+        if registry not in _clients:
+            _clients[registry] = Registry(registry)
+        return _clients[registry]
 
 
 def manifest(imagerepo, tag):
-    """Return the manifest of an image."""
+    """Return the manifest of an image.
+
+    :param imagerepo: Image name, i.e. 'ubuntu' or 'ghcr.io/org/image'
+    :type imagerepo: str
+    :param tag: Image tag or digest
+    :type tag: str
+    :raises RegistryError: The manifest could not be pulled
+    :return: The image manifest
+    :rtype: dict
+    """
+    config, key = current_app.config, (imagerepo, tag)
+    with _lock:
+        entry = _cache.get(key)
+        if entry is not None and entry[0] < time.monotonic():
+            del _cache[key]
+            entry = None
+    if entry is not None:
+        _, found, value = entry
+        if found:
+            return value
+        raise type(value)(*value.args)
+
+    registry, repository = parse(imagerepo)
+    timeout = config['REGISTRY_TIMEOUT']
     try:
-        (imagerepo, remoterepo) = doia._parse_imagerepo(imagerepo)
-        (hdr_data, manifest) = doia.get_v2_image_manifest(remoterepo, tag)
-        status = doia.curl.get_status_code(hdr_data["X-ND-HTTPSTATUS"])
-    except Exception as err:  # noqa B902
-        raise err from err  # Forward the exception, but reset registry
-    finally:
-        doia.set_registry(default_registry)
-    if status == 200:
-        return manifest
-    elif status == 401:
-        raise Exception("Error: not authorized")
-    elif status == 404:
-        raise Exception("Error: manifest not found")
-    else:
-        raise Exception("Error: pulling manifest")
+        value = client(registry).manifest(repository, tag, timeout)
+    except (NotAuthorized, ManifestNotFound) as err:
+        __store(key, False, err, config['REGISTRY_CACHE_NEGATIVE_TTL'])
+        raise err
+    __store(key, True, value, config['REGISTRY_CACHE_TTL'])
+    return value
+
+
+def __store(key, found, value, ttl):
+    """Add a manifest or a registry error to the cache."""
+    with _lock:
+        _cache[key] = time.monotonic() + ttl, found, value
+        while len(_cache) > maxsize:
+            _cache.popitem(last=False)
+
+
+def clear():
+    """Remove all the cached manifests."""
+    with _lock:
+        _cache.clear()
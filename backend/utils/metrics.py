@@ -0,0 +1,138 @@
+"""Module with the Prometheus metrics of the application.
+
+The metrics are published in the Prometheus text format on `/metrics`
+when METRICS_ENABLED is set. Each request observes its latency and the
+number and duration of the SQL statements it executed, labeled by the
+operationId of the route. Other modules define the metrics of the code
+they measure, such as the pool checkout wait, the query cache lookups,
+the JSON Schema validations or the notification emails sent.
+
+Gunicorn serves the requests from multiple worker processes, each one
+with its own metrics. Set PROMETHEUS_MULTIPROC_DIR to an empty directory
+shared by the workers so `/metrics` aggregates the values of all of
+them, see `gunicorn.conf.py`.
+"""
+import os
+import time
+
+from flask import Response, current_app, g, has_request_context, request
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Histogram, generate_latest,
+                               multiprocess)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+#: Seconds spent serving each request
+request_latency = Histogram(
+    "http_request_duration_seconds", "Seconds spent serving a request",
+    ["operation", "method", "status"],
+)
+
+#: Number of SQL statements executed by each request
+request_statements = Histogram(
+    "http_request_sql_statements", "SQL statements executed by a request",
+    ["operation"], buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+)
+
+#: Seconds spent executing SQL statements by each request
+request_sql_latency = Histogram(
+    "http_request_sql_duration_seconds",
+    "Seconds spent executing SQL statements by a request",
+    ["operation"],
+)
+
+
+def init_app(app):
+    """Measure the requests of the application and add `/metrics`.
+
+    :param app: Application to measure
+    :type app: :class:`flask.Flask`
+    """
+    if not app.config['METRICS_ENABLED']:
+        return
+    app.before_request(start_request)
+    app.after_request(observe_request)
+    app.add_url_rule("/metrics", "metrics", view)
+
+
+def start_request():
+    """Start measuring the time and statements of the request."""
+    g.metrics = {'start': time.perf_counter(), 'statements': 0, 'sql': 0.0}
+
+
+def observe_request(response):
+    """Observe the latency and statements of the finished request.
+
+    :param response: Response to the request
+    :type response: :class:`flask.Response`
+    :return: The same response
+    :rtype: :class:`flask.Response`
+    """
+    measures = g.pop('metrics', None)
+    if measures is None:
+        return response
+    operation = operation_id()
+    request_latency.labels(
+        operation, request.method, response.status_code,
+    ).observe(time.perf_counter() - measures['start'])
+    request_statements.labels(operation).observe(measures['statements'])
+    request_sql_latency.labels(operation).observe(measures['sql'])
+    return response
+
+
+def operation_id():
+    """Return the operationId of the route matching the request.
+
+    :return: The operationId, the endpoint if the route has no
+        operationId or "none" if no route matches the request
+    :rtype: str
+    """
+    if request.endpoint is None:
+        return "none"
+    view = current_app.view_functions[request.endpoint]
+    manual_doc = getattr(view, '_apidoc', {}).get('manual_doc', {})
+    return manual_doc.get('operationId', request.endpoint)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def start_statement(conn, cursor, statement, parameters, context, many):
+    """Start measuring the time of an SQL statement."""
+    conn.info.setdefault('metrics_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def observe_statement(conn, cursor, statement, parameters, context, many):
+    """Add the SQL statement and its time to the request measures."""
+    start = conn.info['metrics_start'].pop()
+    if has_request_context() and 'metrics' in g:
+        g.metrics['statements'] += 1
+        g.metrics['sql'] += time.perf_counter() - start
+
+
+@event.listens_for(Engine, "handle_error")
+def discard_statement(context):
+    """Discard the start time of an SQL statement which failed."""
+    if context.connection is not None:
+        starts = context.connection.info.get('metrics_start')
+        if starts:
+            starts.pop()
+
+
+def registry():
+    """Return the registry with the metrics to publish.
+
+    :return: Registry aggregating the metrics of all the processes when
+        PROMETHEUS_MULTIPROC_DIR is set, otherwise the default one
+    :rtype: :class:`prometheus_client.CollectorRegistry`
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def view():
+    """Return the metrics in the Prometheus text format."""
+    metrics = generate_latest(registry())
+    return Response(metrics, content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,102 @@
+"""Module with the configuration of the database connection pool.
+
+Each worker keeps its own pool of connections to the database, sized
+with DB_POOL_SIZE and DB_MAX_OVERFLOW. When all the connections are in
+use, requests wait up to DB_POOL_TIMEOUT for a free one, so the time
+spent on each checkout is exported as a metric to detect an undersized
+pool, see :data:`wait_time`.
+
+Statements running longer than DB_STATEMENT_TIMEOUT are canceled by
+the database. The timeout is sent as startup option on each new
+connection, or set at the beginning of each transaction when
+DB_PGBOUNCER is enabled, as PgBouncer in transaction pooling mode
+rejects startup options and shares the server sessions.
+"""
+import time
+
+from prometheus_client import Counter, Histogram
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+#: Upper bounds, in seconds, of the checkout wait histogram buckets
+buckets = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+
+#: Seconds each checkout waited for a connection
+wait_time = Histogram(
+    "db_pool_checkout_wait_seconds", "Seconds waited for a connection",
+    buckets=buckets,
+)
+
+#: Number of checkouts which failed waiting for a connection
+timeouts = Counter(
+    "db_pool_checkout_timeouts", "Checkouts timed out waiting a connection",
+)
+
+
+class TimedQueuePool(QueuePool):
+    """Queue pool measuring the time each checkout waits for a connection.
+
+    The wait includes opening a new connection when the pool is not
+    full and is observed on :data:`wait_time`, also when the checkout
+    times out.
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            wait_time.observe(time.perf_counter() - start)
+            timeouts.inc()
+            raise
+        wait_time.observe(time.perf_counter() - start)
+        return connection
+
+
+def engine_options(config):
+    """Return the engine options for the pool settings of a config.
+
+    :param config: Application configuration with the DB_* settings
+    :type config: dict
+    :return: Keyword arguments for :func:`sqlalchemy.create_engine`
+    :rtype: dict
+    """
+    options = {
+        'poolclass': TimedQueuePool,
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+    }
+    timeout = config['DB_STATEMENT_TIMEOUT']
+    if timeout and config['DB_PGBOUNCER']:
+        options['execution_options'] = {'statement_timeout': timeout}
+    elif timeout:
+        options['connect_args'] = {
+            'options': f"-c statement_timeout={timeout}",
+        }
+    return options
+
+
+@event.listens_for(Engine, "begin")
+def set_statement_timeout(connection):
+    """Set the statement_timeout execution option on the transaction."""
+    timeout = connection.get_execution_options().get('statement_timeout')
+    if timeout:
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {timeout}")
+
+
+def init_app(app):
+    """Set the engine options of the application from the pool settings.
+
+    Call it before initializing the SQLAlchemy extension. Options
+    already defined on SQLALCHEMY_ENGINE_OPTIONS are kept.
+
+    :param app: Application to configure
+    :type app: :class:`flask.Flask`
+    """
+    options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    for key, value in engine_options(app.config).items():
+        options.setdefault(key, value)
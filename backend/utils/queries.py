@@ -1,12 +1,35 @@
 """Module with tools to unify query common operations."""
+import base64
+import binascii
+import datetime as dt
+import enum
 import functools
+import hashlib
+import json
+import uuid
 
 import flask_smorest
+from flask import after_this_request, current_app, request
+from flask_smorest.exceptions import NotModified
+from flask_sqlalchemy.pagination import QueryPagination
+from marshmallow import fields
+from psycopg2.errors import QueryCanceled
+from sqlalchemy import (DateTime, Text, and_, false, func, inspect, literal,
+                        or_, select, text, tuple_)
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import joinedload, load_only, selectinload, with_expression
+from sqlalchemy.sql.expression import ClauseElement, Executable
 
+from ..models.models import promoted, version
 
-def to_pagination():
+
+def to_pagination(budget=False):
     """Convert the result query into a pagination object.
 
+    :param budget: Check the query budget before collecting the page,
+        see :func:`check_budget`, defaults to False
+    :type budget: bool, optional
     :return: Decorated function
     :rtype: fun
     """
@@ -17,12 +40,555 @@ def to_pagination():
             query_args = args[0]
             per_page = query_args.pop("per_page")
             page = query_args.pop("page")
+            count = query_args.pop("count", "exact")
+            after = query_args.get("after")  # Consumed by add_sorting
             query = func(*args, **kwargs)
-            return query.paginate(page=page, per_page=per_page)
+            if budget:
+                check_budget(query, page, per_page, count, after)
+            try:
+                if after is None:
+                    return OffsetPagination(query, page, per_page, count)
+                return KeysetPagination(query, after, per_page)
+            except OperationalError as err:
+                if not budget or not isinstance(err.orig, QueryCanceled):
+                    raise
+                flask_smorest.abort(503, messages={
+                    'error': "Query canceled by the statement timeout",
+                    'hint': budget_hint,
+                })
         return decorator
     return decorator_add_sorting
 
 
+class OffsetPagination(QueryPagination):
+    """Page of items selected by page number with configurable count.
+
+    The total of items is calculated depending on the count method:
+     - exact: Counts the items matching the query (COUNT).
+     - estimate: Uses the planner estimation of the query rows (EXPLAIN),
+       it is never lower than the items up to the current page.
+     - none: The total and pages are not calculated.
+
+    Unless the count is exact, `has_next` is calculated collecting one
+    item more than the page size.
+
+    :param query: Query to paginate
+    :type query: :class:`flask_sqlalchemy.BaseQuery`
+    :param page: The page index to return (1 indexed)
+    :type page: int
+    :param per_page: The number of items to be displayed on a page
+    :type per_page: int
+    :param count: Method to calculate the total, default "exact"
+    :type count: str
+    """
+
+    def __init__(self, query, page, per_page, count="exact"):
+        """Collect the page items and the total number of items."""
+        self.count, self._has_next = count, None
+        super().__init__(
+            query=query, page=page, per_page=per_page,
+            count=count != "none",
+        )
+
+    def _query_items(self):
+        """Collect the page items and one more when the count is inexact."""
+        if self.count == "exact":
+            return super()._query_items()
+        query = self._query_args["query"]
+        query = query.limit(self.per_page + 1).offset(self._query_offset)
+        items = query.all()
+        self._has_next = len(items) > self.per_page
+        return items[:self.per_page]
+
+    def _query_count(self):
+        """Return the exact or estimated total of items."""
+        if self.count == "exact":
+            return super()._query_count()
+        query = self._query_args["query"].order_by(None)
+        statement = query.enable_eagerloads(False).statement
+        plan = query.session.execute(Explain(statement)).scalar()
+        collected = self._query_offset + len(self.items) + self._has_next
+        return max(int(plan[0]["Plan"]["Plan Rows"]), collected)
+
+    @property
+    def pages(self):
+        """Return the total number of pages, None if total is unknown."""
+        return None if self.total is None else super().pages
+
+    @property
+    def has_next(self):
+        """Return True if a next page exists."""
+        if self._has_next is not None:
+            return self._has_next
+        return super().has_next
+
+
+class Explain(Executable, ClauseElement):
+    """Statement returning the plan of a query in JSON format."""
+
+    inherit_cache = False
+
+    def __init__(self, statement):
+        """Wrap the statement to explain."""
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element, compiler, **kwargs):
+    """Compile the explain statement for PostgreSQL."""
+    statement = compiler.process(element.statement, **kwargs)
+    return f"EXPLAIN (FORMAT JSON) {statement}"
+
+
+#: Hint returned when a query exceeds the budget
+budget_hint = (
+    "Reduce the number of json filters and sorts, include indexed "
+    "arguments such as benchmark_id or use count=estimate"
+)
+
+
+def check_budget(query, page, per_page, count="exact", after=None):
+    """Check the statements of a page are within the query budget.
+
+    The statement timeout of the transaction is set to
+    RESULTS_QUERY_TIMEOUT and the statements collecting and counting the
+    page items are explained, without executing them, to reject those
+    with an estimated cost over RESULTS_QUERY_MAX_COST. Settings with
+    value 0 are not applied.
+
+    :param query: Query to paginate
+    :type query: :class:`flask_sqlalchemy.BaseQuery`
+    :param page: The page index to return (1 indexed)
+    :type page: int
+    :param per_page: The number of items to be displayed on a page
+    :type per_page: int
+    :param count: Method to calculate the total, default "exact"
+    :type count: str
+    :param after: Cursor the page starts after, defaults to None
+    :type after: str, optional
+    :raises UnprocessableEntity: A statement cost exceeds the budget
+    """
+    config, session = current_app.config, query.session
+    timeout = config['RESULTS_QUERY_TIMEOUT']
+    if timeout:
+        session.execute(text(f"SET LOCAL statement_timeout = {int(timeout)}"))
+    max_cost = config['RESULTS_QUERY_MAX_COST']
+    if not max_cost:
+        return
+    for statement in page_statements(query, page, per_page, count, after):
+        cost = explain(session, statement)["cost"]
+        if cost > max_cost:
+            flask_smorest.abort(422, messages={
+                'error': f"Query estimated cost {cost:.0f} exceeds "
+                         f"the limit of {max_cost}",
+                'hint': budget_hint,
+            })
+
+
+def page_statements(query, page, per_page, count="exact", after=None):
+    """Return the statements executed to collect and count a page.
+
+    :param query: Query to paginate
+    :type query: :class:`flask_sqlalchemy.BaseQuery`
+    :param page: The page index to return (1 indexed)
+    :type page: int
+    :param per_page: The number of items to be displayed on a page
+    :type per_page: int
+    :param count: Method to calculate the total, default "exact"
+    :type count: str
+    :param after: Cursor the page starts after, defaults to None
+    :type after: str, optional
+    :return: Statements selecting the page items and the total
+    :rtype: list
+    """
+    offset = 0 if after is not None else (page - 1) * per_page
+    statements = [query.limit(per_page + 1).offset(offset).statement]
+    if after is None and count == "exact":
+        subquery = query.order_by(None).subquery()
+        statements.append(select(func.count()).select_from(subquery))
+    return statements
+
+
+def explain(session, statement):
+    """Return the plan of a statement without executing it.
+
+    :param session: Session to explain the statement
+    :type session: :class:`sqlalchemy.orm.Session`
+    :param statement: Statement to explain
+    :type statement: :class:`sqlalchemy.sql.expression.Select`
+    :return: The SQL, estimated cost and rows, indexes used and plan
+    :rtype: dict
+    """
+    plan = session.execute(Explain(statement)).scalar()[0]["Plan"]
+    compiled = statement.compile(dialect=session.get_bind().dialect)
+    return {
+        'statement': str(compiled),
+        'parameters': {k: str(v) for k, v in compiled.params.items()},
+        'cost': plan["Total Cost"],
+        'rows': plan["Plan Rows"],
+        'indexes': sorted(plan_indexes(plan)),
+        'plan': plan,
+    }
+
+
+def plan_indexes(plan):
+    """Return the names of the indexes scanned by a plan node."""
+    indexes = {plan["Index Name"]} if "Index Name" in plan else set()
+    for node in plan.get("Plans", []):
+        indexes |= plan_indexes(node)
+    return indexes
+
+
+class KeysetPagination(object):
+    """Page of items collected after a cursor.
+
+    Keyset pagination does not count the total of items matching the
+    query nor uses OFFSET. The query is expected to be sorted and to
+    include the sorting keys after the model entity, as produced by
+    :func:`add_sorting` when the `after` argument is present.
+
+    :param query: Sorted query with the entity and sorting keys per row
+    :type query: :class:`flask_sqlalchemy.BaseQuery`
+    :param after: Cursor the page starts after, empty for the first page
+    :type after: str
+    :param per_page: The number of items to be displayed on a page
+    :type per_page: int
+    """
+
+    def __init__(self, query, after, per_page):
+        """Collect the page items and the cursor to the next page."""
+        rows = query.limit(per_page + 1).all()
+        self.per_page = per_page
+        self.has_prev = after != ""
+        self.has_next = len(rows) > per_page
+        self.items = [row[0] for row in rows[:per_page]]
+        if self.has_next:
+            self.next_after = encode_cursor(rows[per_page - 1][1:])
+        else:
+            self.next_after = None
+
+
+def encode_cursor(values):
+    """Return an opaque cursor token from the sorting key values."""
+    data = json.dumps(list(values), default=_cursor_value)
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def decode_cursor(keys, after):
+    """Return the sorting key values contained in a cursor token."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(after.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        values = None
+    if not isinstance(values, list) or len(values) != len(keys):
+        flask_smorest.abort(
+            422,
+            message={
+                "ValueError": f"Invalid cursor '{after}'",
+                "hint": "Use 'next_after' from a response with same sort_by",
+            },
+        )
+    return [_key_value(field, x) for (field, _), x in zip(keys, values)]
+
+
+def _cursor_value(value):
+    """Serialize sorting key values not supported by JSON."""
+    if isinstance(value, (dt.datetime, dt.date)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, enum.Enum):
+        return value.name
+    raise TypeError(f"Cannot use {type(value)} as cursor value")
+
+
+def _key_value(field, value):
+    """Deserialize a sorting key value to the field python type."""
+    if value is not None and isinstance(field.type, DateTime):
+        return dt.datetime.fromisoformat(value)
+    return value
+
+
+def eager_loading(model, schema):
+    """Load with the items the relationships nested on the response schema.
+
+    Relationships to one item are loaded on the same statement using a
+    join, relationships to many items are loaded with a single additional
+    statement per page, see :func:`load_options`.
+
+    When the arguments `fields` or `json_fields` are included, only the
+    selected columns and relationships are loaded, see :func:`add_projection`.
+
+    :param model: Model returned by the query of the controller method
+    :type model: :class:`backend.model.core.BaseModel`
+    :param schema: Schema used to serialize each of the query items
+    :type schema: :class:`marshmallow.Schema`
+    :return: Decorated function
+    :rtype: fun
+    """
+    def decorator_eager_loading(func):
+        @functools.wraps(func)
+        def decorator(*args, **kwargs):
+            """Extend the returned function query with load options."""
+            query_args = args[0]
+            names = query_args.pop("fields", None)
+            paths = query_args.pop("json_fields", None)
+            if names is None and paths is None:
+                return func(*args, **kwargs).options(
+                    *load_options(model, schema())
+                )
+            tree = selection(schema(), names, paths)
+            query = func(*args, **kwargs)
+            if paths is not None:
+                query = query.populate_existing()
+            return query.options(*projection_options(model, schema(), tree))
+        return decorator
+    return decorator_eager_loading
+
+
+def load_options(model, schema, parent=None):
+    """Return the loader options for the relationships nested on a schema.
+
+    Nested fields which do not match a model relationship (for example
+    fields using a dotted attribute) are ignored and loaded lazily.
+    """
+    options, mapper = [], inspect(model)
+    for name, field in schema.fields.items():
+        if not isinstance(field, fields.Nested) or field.load_only:
+            continue
+        key = field.attribute or name
+        if key not in mapper.relationships:
+            continue
+        relationship = mapper.relationships[key]
+        loader = selectinload if relationship.uselist else joinedload
+        if parent is None:
+            option = loader(getattr(model, key))
+        else:
+            option = getattr(parent, loader.__name__)(getattr(model, key))
+        options.append(option)
+        nested_model = relationship.mapper.class_
+        options += load_options(nested_model, field.schema, option)
+    return options
+
+
+def add_projection(schema):
+    """Return only the fields of the items selected on the request.
+
+    Place it over :func:`to_pagination`. The argument `fields` selects
+    the item fields to return separated by coma, using '.' to select the
+    fields of nested items. The argument `json_fields` selects the paths
+    of the item json to return, paths not found return null. Items are
+    converted to dictionaries with the selected values, which are loaded
+    by :func:`eager_loading` and the rest of fields omitted on the
+    response.
+
+    :param schema: Schema used to serialize each of the query items
+    :type schema: :class:`marshmallow.Schema`
+    :return: Decorated function
+    :rtype: fun
+    """
+    def decorator_add_projection(func):
+        @functools.wraps(func)
+        def decorator(*args, **kwargs):
+            """Replace the page items by the selected fields."""
+            query_args = args[0]
+            names = query_args.get("fields")  # Consumed by eager_loading
+            paths = query_args.get("json_fields")  # Consumed by eager_loading
+            page = func(*args, **kwargs)
+            if names is None and paths is None:
+                return page
+            tree = selection(schema(), names, paths)
+            page.items = [project(x, schema(), tree) for x in page.items]
+            return page
+        return decorator
+    return decorator_add_projection
+
+
+def selection(schema, names, paths=None):
+    """Return the tree of fields selected on a schema.
+
+    Each selected field maps to None when selected complete, to the
+    tree of selected nested fields, or for json to the list of paths.
+    """
+    if names is None:
+        names = [x for x, y in schema.fields.items() if not y.load_only]
+    else:
+        names = names.split(",")
+    tree = {}
+    for name in names:
+        node, nested = tree, schema
+        keys = name.split(".")
+        for n, key in enumerate(keys):
+            field = nested.fields.get(key) if nested is not None else None
+            if field is None or field.load_only:
+                flask_smorest.abort(
+                    422,
+                    message={
+                        "KeyError": f"Unexpected field '{name}'",
+                        "hint": "Use ',' to separate fields",
+                    },
+                )
+            if n == len(keys) - 1:
+                node[key] = None
+                break
+            if key in node and node[key] is None:
+                break  # Field already selected complete
+            node = node.setdefault(key, {})
+            nested = getattr(field, "schema", None)
+    if paths is not None:
+        tree["json"] = [path.split(".") for path in paths.split(",")]
+    return tree
+
+
+def projection_options(model, schema, tree, parent=None):
+    """Return the loader options for the fields selected on a schema.
+
+    Only the selected columns are loaded, unless a selected field is not
+    a model column or relationship. The selected json paths are loaded
+    into `json_projection`, see :func:`json_projection`.
+    """
+    options, mapper = [], inspect(model)
+    columns, restrict = [x.key for x in mapper.primary_key], True
+    for name, subtree in tree.items():
+        field = schema.fields[name]
+        key = field.attribute or name
+        if isinstance(subtree, list):
+            expression = json_projection(getattr(model, key), subtree)
+            options.append(with_expression(model.json_projection, expression))
+        elif key in mapper.column_attrs:
+            columns.append(key)
+        elif key in mapper.relationships:
+            relationship = mapper.relationships[key]
+            loader = selectinload if relationship.uselist else joinedload
+            if parent is None:
+                option = loader(getattr(model, key))
+            else:
+                option = getattr(parent, loader.__name__)(getattr(model, key))
+            options.append(option)
+            nested_model = relationship.mapper.class_
+            if subtree is None:
+                options += load_options(nested_model, field.schema, option)
+            else:
+                options += projection_options(
+                    nested_model, field.schema, subtree, option
+                )
+        else:
+            restrict = False  # Other attributes might need any column
+    if restrict and parent is None:
+        options.append(load_only(*columns))
+    elif restrict:
+        options.append(parent.load_only(*columns))
+    return options
+
+
+def json_projection(field, paths):
+    """Return the json object with the values of the selected paths.
+
+    The object is built by the database, so only the selected subtrees
+    of the json field are returned.
+    """
+    tree = {}
+    for path in paths:
+        node = tree
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+            if node is None:
+                break
+        else:
+            node[path[-1]] = None
+
+    def build(node, prefix):
+        values = []
+        for key, subtree in node.items():
+            values.append(literal(key, Text))
+            if subtree is None:
+                values.append(field[tuple(prefix + [key])])
+            else:
+                values.append(build(subtree, prefix + [key]))
+        return func.jsonb_build_object(*values)
+
+    return build(tree, [])
+
+
+def project(item, schema, tree):
+    """Return a dictionary with the selected fields of an item."""
+    if item is None:
+        return None
+    if isinstance(item, (list, tuple)):
+        return [project(x, schema, tree) for x in item]
+    data = {}
+    for name, subtree in tree.items():
+        field = schema.fields[name]
+        key = field.attribute or name
+        if isinstance(subtree, list):
+            data[key] = item.json_projection
+        elif subtree is None:
+            data[key] = getattr(item, key)
+        else:
+            data[key] = project(getattr(item, key), field.schema, subtree)
+    return data
+
+
+def add_etag(model, schema):
+    """Add ETag and Cache-Control headers to a controller method.
+
+    The ETag is computed from the request url and the version of the
+    tables the response is built from: the model table and the tables of
+    the relationships nested on the response schema. When the request
+    ``If-None-Match`` header matches, 304 (Not Modified) is returned
+    before running the controller method and serializing the response.
+
+    :param model: Model returned by the controller method
+    :type model: :class:`backend.model.core.BaseModel`
+    :param schema: Schema used to serialize the returned item or items
+    :type schema: :class:`marshmallow.Schema`
+    :return: Decorated function
+    :rtype: fun
+    """
+    def decorator_add_etag(func):
+        @functools.wraps(func)
+        def decorator(*args, **kwargs):
+            """Return 304 if the response tables did not change."""
+            versions = version.current(etag_tables(model, schema()))
+            data = [current_app.config['API_VERSION'], request.full_path]
+            etag = hashlib.sha1(  # nosec
+                json.dumps([*data, versions]).encode()
+            ).hexdigest()
+
+            @after_this_request
+            def cache_headers(response):
+                if response.status_code in (200, 304):
+                    response.set_etag(etag)
+                    response.cache_control.public = True
+                    max_age = current_app.config['HTTP_CACHE_MAX_AGE']
+                    response.cache_control.max_age = max_age
+                return response
+
+            if request.if_none_match.contains(etag):
+                raise NotModified
+            return func(*args, **kwargs)
+        return decorator
+    return decorator_add_etag
+
+
+def etag_tables(model, schema):
+    """Return the tables of a model and its nested relationships."""
+    mapper = inspect(model)
+    tables = {table.name for table in mapper.tables}
+    for name, field in schema.fields.items():
+        if not isinstance(field, fields.Nested) or field.load_only:
+            continue
+        key = field.attribute or name
+        if key not in mapper.relationships:
+            continue
+        relationship = mapper.relationships[key]
+        if relationship.secondary is not None:
+            tables.add(relationship.secondary.name)
+        nested_model = relationship.mapper.class_
+        tables |= etag_tables(nested_model, field.schema)
+    return tables
+
+
 def add_sorting(model):
     """Add sorting functionality to a controller method.
 
@@ -39,29 +605,108 @@ def add_sorting(model):
             The field must be preceded with a control character:
             - '+' return an ascending sort object
             - '-' return a descending sort object
+
+            The sorting fields replace any order set by the controller,
+            for example the relevance order of a text search.
+
+            When the argument `after` is included, the primary key is
+            added as last sorting key, the rows are restricted to those
+            placed after the cursor and the sorting keys are returned
+            together with each item for :class:`KeysetPagination`.
             """
             query_args = args[0]
-            sort_by = query_args.pop("sort_by")
+            sort_by = query_args.pop("sort_by", None)
             sort_by = sort_by if sort_by is not None else ""
+            after = query_args.pop("after", None)
+            benchmark_id = query_args.get("benchmark_id")
             query = func(*args, **kwargs)
             split = sort_by.split(",")
-            sorting = [parse_sort(model, x) for x in split if x != ""]
-            return query.order_by(*sorting)
+            keys = [
+                sort_key(model, x, benchmark_id) for x in split if x != ""
+            ]
+            if after is None and not keys:
+                return query  # Keep the controller order, if any
+            if after is None:
+                query = query.order_by(None)
+                return query.order_by(*[order(*key) for key in keys])
+            descending = keys[-1][1] if keys else False
+            keys += [(x, descending) for x in inspect(model).primary_key]
+            query = query.order_by(None)
+            query = query.order_by(*[order(*key) for key in keys])
+            if after != "":
+                values = decode_cursor(keys, after)
+                query = query.filter(keyset_filter(keys, values))
+            return query.add_columns(*[field for field, _ in keys])
         return decorator
     return decorator_add_sorting
 
 
+def order(field, descending):
+    """Return the sorting sql object for a field and direction."""
+    return field.desc() if descending else field.asc()
+
+
+def keyset_filter(keys, values):
+    """Return condition to select the rows sorted after the key values.
+
+    Follows the PostgreSQL default placement of nulls (last on ascending
+    and first on descending order). When all keys share direction and
+    cannot be null, a row value comparison is returned so the database
+    can use an index covering the sorting keys.
+    """
+    nulls = any(value is None for value in values)
+    values = [
+        None if value is None else literal(value, field.type)
+        for (field, _), value in zip(keys, values)
+    ]
+    directions = set(descending for _, descending in keys)
+    if len(directions) == 1 and not nulls and \
+            not any(_nullable(field) for field, _ in keys):
+        fields = tuple_(*[field for field, _ in keys])
+        if directions.pop():
+            return fields < tuple_(*values)
+        return fields > tuple_(*values)
+
+    conditions, equals = [], []
+    for (field, descending), value in zip(keys, values):
+        if value is None and descending:
+            conditions.append(and_(*equals, field.isnot(None)))
+        elif value is None:
+            conditions.append(and_(*equals, false()))
+        elif descending:
+            conditions.append(and_(*equals, field < value))
+        elif _nullable(field):
+            conditions.append(and_(*equals, or_(
+                field > value, field.is_(None)
+            )))
+        else:
+            conditions.append(and_(*equals, field > value))
+        equals.append(field.is_(None) if value is None else field == value)
+    return or_(*conditions)
+
+
+def _nullable(field):
+    """Return False only when the field is a not nullable column."""
+    column = getattr(field, "expression", field)
+    return getattr(column, "nullable", True)
+
+
 def parse_sort(model, control_field):
     """Sort a model by a control field."""
+    return order(*sort_key(model, control_field))
+
+
+def sort_key(model, control_field, benchmark_id=None):
+    """Return the field and if descending order from a control field."""
     if hasattr(model, "json") and control_field[1:6] == "json.":
-        field = json_field(model, control_field)
+        field = json_field(model, control_field, benchmark_id)
     else:
         field = generic_field(model, control_field)
     operator = control_field[0]
     if operator == "+":
-        return field.asc()
+        return field, False
     if operator == "-":
-        return field.desc()
+        return field, True
     else:
         flask_smorest.abort(
             422,
@@ -72,10 +717,17 @@ def parse_sort(model, control_field):
         )
 
 
-def json_field(model, control_field):
-    """Return control field from json field."""
-    path = control_field[6:]
-    return path_iter(model.json, path.split("."))
+def json_field(model, control_field, benchmark_id=None):
+    """Return control field from json field.
+
+    When the path is promoted for the benchmark, the indexed typed
+    expression is returned, see :mod:`backend.models.models.promoted`.
+    """
+    path = control_field[6:].split(".")
+    promoted_type = promoted.lookup(benchmark_id, path)
+    if promoted_type is not None:
+        return promoted.expression(model.json, path, promoted_type)
+    return path_iter(model.json, path)
 
 
 def path_iter(fields, path):
@@ -0,0 +1,402 @@
+"""Module with the rate limiter of the requests.
+
+Each client has a token bucket which holds up to RATE_LIMIT_CAPACITY
+tokens and is refilled with RATE_LIMIT_RATE tokens per minute. Every
+request takes the cost of its route from the bucket, 1 by default or
+the value set with :func:`cost` for the expensive ones, and fails with
+429 when the bucket has not enough tokens. Clients are identified by
+the (sub, iss) of the access token or, for anonymous requests, by the
+client IP, see PROXY_FIX_X_FOR to take it from X-Forwarded-For. The
+token is verified only after its client IP paid one token for it.
+
+All responses include the `RateLimit-Limit`, `RateLimit-Remaining` and
+`RateLimit-Reset` headers and the rejected ones `Retry-After`.
+
+The backend is selected with RATE_LIMIT_BACKEND:
+ - memory: Buckets on each worker process.
+ - database: Unlogged table shared by all the workers and hosts.
+ - none: Requests are not rate limited.
+
+Additionally, RATE_LIMIT_CONCURRENCY limits the requests each worker
+process serves at the same time to the same client, identified by IP
+when requests are not rate limited.
+"""
+import abc
+import math
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+import flask_smorest
+from flaat.exceptions import FlaatException
+from flask import current_app, g, request
+from prometheus_client import Counter
+from sqlalchemy import (Column, Float, Index, Table, Text, delete, func,
+                        select, update)
+from sqlalchemy.dialects.postgresql import insert
+
+from ..extensions import db, flaat
+from .metrics import operation_id
+
+#: Unlogged table with the buckets of the database backend
+buckets = Table(
+    "rate_limit", db.metadata,
+    Column("key", Text, primary_key=True),
+    Column("tokens", Float, nullable=False),
+    Column("updated", Float, nullable=False),
+    Index("ix_rate_limit_updated", "updated"),
+    prefixes=["UNLOGGED"],
+)
+
+#: Number of requests rejected by operation and reason
+rejections = Counter(
+    "rate_limit_rejections", "Requests rejected by the rate limiter",
+    ["operation", "reason"],
+)
+
+#: Maximum number of buckets kept by the memory backend
+maxsize = 10000
+
+#: Maximum number of full buckets removed by the database backend each
+#: time it creates a new one
+evictions = 100
+
+_backends = {}
+_inflight = {}
+_lock = threading.Lock()
+
+
+class Quota(namedtuple("Quota", [
+    "allowed", "limit", "remaining", "reset", "retry_after",
+])):
+    """Result of taking tokens from a bucket, times in seconds."""
+
+
+class Backend(abc.ABC):
+    """Base class for the rate limiter backends.
+
+    Subclasses implement how the buckets are read and written; the
+    refill and take of tokens is computed on this class.
+
+    :param capacity: Maximum tokens of a bucket
+    :type capacity: int
+    :param rate: Tokens refilled per second
+    :type rate: float
+    """
+
+    #: Name of the backend on RATE_LIMIT_BACKEND
+    name = None
+
+    def __init__(self, capacity, rate):
+        """Create a backend with empty buckets."""
+        self.capacity, self.rate = capacity, rate
+        self._lock = threading.Lock()
+
+    def take(self, key, cost=1):
+        """Take tokens from the bucket of a client.
+
+        :param key: Key identifying the client
+        :type key: str
+        :param cost: Number of tokens to take
+        :type cost: int
+        :return: If the tokens were taken and the bucket state
+        :rtype: :class:`Quota`
+        """
+        return self._take(key, cost, time.time())
+
+    def clear(self):
+        """Remove all the buckets."""
+        self._clear()
+
+    def refill(self, tokens, updated, now, cost):
+        """Return the tokens left on a bucket after taking the cost.
+
+        :param tokens: Tokens on the bucket when it was updated
+        :type tokens: float
+        :param updated: Epoch time of the last bucket update
+        :type updated: float
+        :param now: Epoch time of the request
+        :type now: float
+        :param cost: Number of tokens to take
+        :type cost: int
+        :return: The tokens left and the quota of the request
+        :rtype: tuple
+        """
+        elapsed = max(now - updated, 0.0)
+        tokens = min(self.capacity, tokens + elapsed * self.rate)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        return tokens, self.quota(tokens, allowed, cost)
+
+    def quota(self, tokens, allowed, cost):
+        """Return the quota of a request from the tokens left.
+
+        :param tokens: Tokens left on the bucket after the request
+        :type tokens: float
+        :param allowed: If the cost was taken from the bucket
+        :type allowed: bool
+        :param cost: Number of tokens of the request
+        :type cost: int
+        :return: The quota of the request
+        :rtype: :class:`Quota`
+        """
+        retry_after = 0 if allowed else math.ceil((cost - tokens) / self.rate)
+        return Quota(
+            allowed=allowed, limit=self.capacity,
+            remaining=math.floor(tokens),
+            reset=math.ceil((self.capacity - tokens) / self.rate),
+            retry_after=retry_after,
+        )
+
+    @abc.abstractmethod
+    def _take(self, key, cost, now):
+        """Take the tokens from the bucket and return the quota."""
+
+    @abc.abstractmethod
+    def _clear(self):
+        """Remove all the buckets."""
+
+
+class MemoryBackend(Backend):
+    """Process-wide token buckets, least recently used are evicted."""
+
+    name = "memory"
+
+    def __init__(self, capacity, rate):
+        """Create a backend with empty buckets."""
+        super().__init__(capacity, rate)
+        self._buckets = OrderedDict()
+
+    def _take(self, key, cost, now):
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.capacity, now))
+            tokens, quota = self.refill(tokens, updated, now, cost)
+            self._buckets[key] = tokens, now
+            while len(self._buckets) > maxsize:
+                self._buckets.popitem(last=False)
+        return quota
+
+    def _clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class DatabaseBackend(Backend):
+    """Token buckets shared on an unlogged database table.
+
+    Buckets are updated on the request session and committed at once,
+    the rate is limited before the request runs, so the bucket row is
+    locked only while its tokens are taken. The hosts are expected to
+    have synchronized clocks.
+    """
+
+    name = "database"
+
+    def _take(self, key, cost, now):
+        create = insert(buckets).values(
+            key=key, tokens=self.capacity, updated=now,
+        ).on_conflict_do_nothing().returning(buckets.c.key)
+        if db.session.execute(create).first() is not None:
+            full = now - self.capacity / self.rate  # Same as missing
+            stale = select(buckets.c.key).where(
+                buckets.c.updated < full
+            ).limit(evictions)
+            db.session.execute(delete(buckets).where(
+                buckets.c.key.in_(stale.scalar_subquery())
+            ))
+        refilled = func.least(self.capacity, buckets.c.tokens + func.greatest(
+            now - buckets.c.updated, 0.0
+        ) * self.rate)
+        taken = update(buckets).where(
+            buckets.c.key == key, refilled >= cost
+        ).values(tokens=refilled - cost, updated=now).returning(
+            buckets.c.tokens
+        )
+        left = db.session.execute(taken).scalar()
+        if left is not None:
+            quota = self.quota(left, True, cost)
+        else:  # Not enough tokens, the bucket is not modified
+            bucket = select(buckets.c.tokens, buckets.c.updated).where(
+                buckets.c.key == key
+            )
+            tokens, updated = db.session.execute(bucket).one()
+            quota = self.refill(tokens, updated, now, cost)[1]
+        db.session.commit()
+        return quota
+
+    def _clear(self):
+        db.session.execute(delete(buckets))
+        db.session.commit()
+
+
+#: Backends available to select on RATE_LIMIT_BACKEND
+backends = {
+    MemoryBackend.name: MemoryBackend,
+    DatabaseBackend.name: DatabaseBackend,
+}
+
+
+def backend():
+    """Return the rate limiter backend configured on the application.
+
+    :return: The backend or None if requests are not rate limited
+    :rtype: :class:`Backend`
+    """
+    config = current_app.config
+    name = config['RATE_LIMIT_BACKEND']
+    if name == "none":
+        return None
+    key = name, config['RATE_LIMIT_CAPACITY'], config['RATE_LIMIT_RATE']
+    with _lock:
+        if key not in _backends:
+            _backends[key] = backends[name](key[1], key[2] / 60)
+        return _backends[key]
+
+
+def cost(tokens):
+    """Set the tokens a controller method takes from the bucket.
+
+    Place it after the route and doc decorators. Routes with cost 0 are
+    not rate limited.
+
+    :param tokens: Number of tokens to take on each request
+    :type tokens: int
+    :return: Decorated function
+    :rtype: fun
+    """
+    def decorator_cost(func):
+        func._ratelimit_cost = tokens
+        return func
+    return decorator_cost
+
+
+def init_app(app):
+    """Rate limit the requests of the application.
+
+    :param app: Application to rate limit
+    :type app: :class:`flask.Flask`
+    """
+    app.before_request(limit_request)
+    app.after_request(add_headers)
+    app.teardown_request(finish_request)
+
+
+def limit_request():
+    """Take the route cost from the client bucket or fail with 429.
+
+    Requests with an access token first take one token from the bucket
+    of the client IP to pay for the token verification, so invalid
+    tokens cannot query the identity provider faster than the IP rate.
+
+    :raises TooManyRequests: The client exceeded the rate or concurrency
+    """
+    cost = route_cost()
+    limiter, concurrency = backend(), current_app.config[
+        'RATE_LIMIT_CONCURRENCY'
+    ]
+    if not cost or (limiter is None and not concurrency):
+        return
+    key = f"ip:{request.remote_addr}"
+    if limiter is not None:
+        if request.headers.get('Authorization', "").startswith("Bearer "):
+            take(limiter, key, 1)
+            key = client_key()
+        take(limiter, key, cost)
+    if concurrency:
+        with _lock:
+            exceeded = _inflight.get(key, 0) >= concurrency
+            if not exceeded:
+                _inflight[key] = _inflight.get(key, 0) + 1
+                g.ratelimit_key = key
+        if exceeded:
+            rejections.labels(operation_id(), "concurrency").inc()
+            flask_smorest.abort(429, messages={
+                'error': f"Concurrency limit of {concurrency} requests "
+                         f"exceeded, retry when they finish",
+            })
+
+
+def take(limiter, key, cost):
+    """Take tokens from a client bucket or fail with 429.
+
+    :param limiter: Backend with the client bucket
+    :type limiter: :class:`Backend`
+    :param key: Key identifying the client
+    :type key: str
+    :param cost: Number of tokens to take
+    :type cost: int
+    :raises TooManyRequests: The bucket has not enough tokens
+    """
+    g.ratelimit = quota = limiter.take(key, cost)
+    if not quota.allowed:
+        rejections.labels(operation_id(), "rate").inc()
+        flask_smorest.abort(429, messages={
+            'error': f"Rate limit exceeded, retry after "
+                     f"{quota.retry_after} seconds",
+        })
+
+
+def add_headers(response):
+    """Add the rate limit headers of the client bucket to the response.
+
+    :param response: Response to the request
+    :type response: :class:`flask.Response`
+    :return: The same response
+    :rtype: :class:`flask.Response`
+    """
+    quota = g.pop('ratelimit', None)
+    if quota is not None:
+        response.headers['RateLimit-Limit'] = str(quota.limit)
+        response.headers['RateLimit-Remaining'] = str(quota.remaining)
+        response.headers['RateLimit-Reset'] = str(quota.reset)
+        if not quota.allowed:
+            response.headers['Retry-After'] = str(quota.retry_after)
+    return response
+
+
+def finish_request(exception=None):
+    """Release the concurrency slot taken by the request."""
+    key = g.pop('ratelimit_key', None)
+    if key is not None:
+        with _lock:
+            _inflight[key] -= 1
+            if not _inflight[key]:
+                del _inflight[key]
+
+
+def route_cost():
+    """Return the tokens taken by the route matching the request.
+
+    :return: The route cost, 1 if not set or no route matches
+    :rtype: int
+    """
+    if request.endpoint is None:
+        return 1
+    view = current_app.view_functions[request.endpoint]
+    return getattr(view, '_ratelimit_cost', 1)
+
+
+def client_key():
+    """Return the key identifying the client of the request.
+
+    The access token is verified with the identity provider, only call
+    it once the client IP paid for it, see :func:`limit_request`.
+
+    :return: The (sub, iss) of a valid access token or the client IP
+    :rtype: str
+    """
+    try:
+        user_infos = flaat.get_user_infos_from_request(request)
+    except FlaatException:
+        user_infos = None
+    if user_infos is not None and user_infos.subject:
+        return f"user:{user_infos.subject}@{user_infos.issuer}"
+    return f"ip:{request.remote_addr}"
+
+
+def clear():
+    """Remove the buckets of the configured backend."""
+    limiter = backend()
+    if limiter is not None:
+        limiter.clear()
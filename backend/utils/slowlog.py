@@ -0,0 +1,198 @@
+"""Module with the log of the SQL statements exceeding a time threshold.
+
+User filters and sorts on the result JSON, see :mod:`backend.utils.filters`
+and :func:`backend.utils.queries.json_field`, can produce plans much
+slower than expected. Each statement taking longer than
+SLOW_QUERY_THRESHOLD milliseconds is logged with the operationId of the
+route and its normalized parameters and accumulated on
+:class:`backend.models.SlowQuery`, so administrators can find the
+statements and JSON paths that need an index.
+
+The slow statements are kept on the application context and written at
+its teardown on the request session, so no other connection is taken
+from the pool, see :func:`flush`. When SLOW_QUERY_EXPLAIN is set, the
+estimated plan of the slow SELECT statements is captured with `EXPLAIN`,
+which does not execute the statement again.
+"""
+import hashlib
+import json
+import time
+from datetime import datetime as dt
+
+from flask import current_app, g, has_app_context, has_request_context
+from sqlalchemy import case, event, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Engine
+
+from .. import models
+from ..extensions import db
+from .metrics import operation_id
+
+#: Maximum number of characters kept of each parameter value
+max_length = 100
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def start_statement(conn, cursor, statement, parameters, context, many):
+    """Start measuring the time of an SQL statement."""
+    if context is not None:
+        context.slowlog_start = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def check_statement(conn, cursor, statement, parameters, context, many):
+    """Record the SQL statement if it exceeded the threshold."""
+    start = getattr(context, 'slowlog_start', None)
+    if start is None or not has_app_context():
+        return
+    threshold = current_app.config['SLOW_QUERY_THRESHOLD']
+    if not threshold or not conn.get_execution_options().get('slowlog', True):
+        return
+    elapsed = (time.perf_counter() - start) * 1000
+    if elapsed >= threshold:
+        record(statement, parameters, elapsed, many)
+
+
+def record(statement, parameters, elapsed, many=False):
+    """Log a slow statement and keep it to write with :func:`flush`.
+
+    :param statement: SQL statement with parameter placeholders
+    :type statement: str
+    :param parameters: Parameters used to execute the statement
+    :type parameters: dict or list
+    :param elapsed: Milliseconds the statement took
+    :type elapsed: float
+    :param many: True if the statement was executed for multiple rows
+    :type many: bool
+    """
+    operation = operation_id() if has_request_context() else "none"
+    normalized = normalize(parameters[0] if many else parameters)
+    current_app.logger.warning(
+        "Slow query on %s (%.0f ms): %s %s",
+        operation, elapsed, statement, json.dumps(normalized),
+    )
+
+    fingerprint = hashlib.sha1(  # nosec
+        f"{operation}:{statement}".encode()
+    ).hexdigest()
+    row = dict(
+        fingerprint=fingerprint, operation=operation, statement=statement,
+        parameters=normalized, plan=None, calls=1,
+        total_time=elapsed, max_time=elapsed, last_datetime=dt.now(),
+    )
+    g.setdefault('slow_queries', []).append((row, parameters, many))
+
+
+def flush(exception=None):
+    """Write the slow statements of the context on the request session.
+
+    The request transaction is over at teardown, so it is rolled back
+    before accumulating the statements on their records. Errors writing
+    the records are logged and ignored.
+
+    :param exception: Unhandled exception of the request, if any
+    :type exception: Exception, optional
+    """
+    slow_queries = g.pop('slow_queries', [])
+    if not slow_queries:
+        return
+    try:  # Never fail the request because of the log
+        db.session.rollback()
+        connection = db.session.connection()
+        connection = connection.execution_options(slowlog=False)
+        for row, parameters, many in slow_queries:
+            if current_app.config['SLOW_QUERY_EXPLAIN'] and not many:
+                row['plan'] = explain(connection, row['statement'], parameters)
+            connection.execute(upsert(row))
+        db.session.commit()
+    except Exception as err:  # noqa: B902
+        db.session.rollback()
+        current_app.logger.warning(f"Slow query not recorded: {err}")
+
+
+def upsert(row):
+    """Return the statement accumulating a slow execution on its record.
+
+    :param row: Values of the slow execution
+    :type row: dict
+    :return: Insert statement updating the existing record on conflict
+    :rtype: :class:`sqlalchemy.dialects.postgresql.Insert`
+    """
+    table = models.SlowQuery.__table__
+    statement = insert(table).values(**row)
+    new = statement.excluded
+    slowest = new.max_time > table.c.max_time
+    return statement.on_conflict_do_update(
+        index_elements=[table.c.fingerprint],
+        set_={
+            'calls': table.c.calls + 1,
+            'total_time': table.c.total_time + new.total_time,
+            'max_time': func.greatest(table.c.max_time, new.max_time),
+            'parameters': case(
+                (slowest, new.parameters), else_=table.c.parameters,
+            ),
+            'plan': case((slowest, new.plan), else_=table.c.plan),
+            'last_datetime': new.last_datetime,
+        },
+    )
+
+
+def explain(connection, statement, parameters):
+    """Return the estimated plan of a SELECT statement.
+
+    :param connection: Connection of the request session
+    :type connection: :class:`sqlalchemy.engine.Connection`
+    :param statement: SQL statement with parameter placeholders
+    :type statement: str
+    :param parameters: Parameters used to execute the statement
+    :type parameters: dict
+    :return: The JSON plan or None if the statement is not explained
+    :rtype: list
+    """
+    if not statement.lstrip().upper().startswith("SELECT"):
+        return None
+    explain = f"EXPLAIN (FORMAT JSON) {statement}"
+    savepoint = connection.begin_nested()
+    try:
+        plan = connection.exec_driver_sql(explain, parameters).scalar()
+    except Exception as err:  # noqa: B902
+        current_app.logger.warning(f"Slow query not explained: {err}")
+        savepoint.rollback()
+        return None
+    savepoint.commit()
+    return plan
+
+
+def init_app(app):
+    """Write the slow statements at the teardown of each context.
+
+    Call it after initializing the SQLAlchemy extension, so the records
+    are written before the session is removed.
+
+    :param app: Application to register the teardown functions
+    :type app: :class:`flask.Flask`
+    """
+    app.teardown_request(flush)
+    app.teardown_appcontext(flush)
+
+
+def normalize(parameters):
+    """Return the parameters as JSON values with limited length.
+
+    :param parameters: Parameters used to execute a statement
+    :type parameters: dict or list
+    :return: The normalized parameters
+    :rtype: dict or list
+    """
+    if isinstance(parameters, dict):
+        return {key: normalize(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [normalize(value) for value in parameters]
+    if parameters is None or isinstance(parameters, (bool, int, float)):
+        return parameters
+    if isinstance(parameters, (bytes, memoryview)):
+        return f"<{len(parameters)} bytes>"
+    value = parameters if isinstance(parameters, str) else str(parameters)
+    if len(value) > max_length:
+        return value[:max_length] + "..."
+    return value
@@ -23,12 +23,15 @@ Important: If you want to use the objects produced to be usable
 outside the scope of the session, you need to expunge them for the session.
 For more examples, see http://flask-sqlalchemy.pocoo.org/contexts/
 """
-from .factories import DBBenchmark, DBFlavor, DBResult, DBSite, DBTag, DBUser
+from .factories import (DBBenchmark, DBFlavor, DBLeaderboard, DBResult, DBSite,
+                        DBSlowQuery, DBTag, DBUser)
 
 __all__ = [
     "DBBenchmark",
+    "DBLeaderboard",
     "DBResult",
     "DBSite",
+    "DBSlowQuery",
     "DBFlavor",
     "DBTag",
     "DBUser"
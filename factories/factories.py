@@ -150,3 +150,40 @@ class DBResult(SQLAlchemyModelFactory):
                     uploader=DBUser(), message=msg, resource=self
                 ).approve()
             self.delete
+
+
+class DBLeaderboard(SQLAlchemyModelFactory):
+    """Leaderboard factory. Default kwargs are:"""  # noqa: D400
+
+    class Meta(BaseMeta):  # noqa: D106
+        model = models.Leaderboard
+        sqlalchemy_get_or_create = ("id",)
+
+    id = LazyFunction(uuid.uuid4)
+    name = Sequence(lambda n: f"leaderboard{n}")
+    description = "Leaderboard example"
+    benchmark = SubFactory(DBBenchmark)
+    path = "time"
+    aggregation = "max"
+
+    @post_generation
+    def entries(self, create, extracted, **kwargs):
+        """Entries post generation."""
+        if create:
+            self.refresh()
+
+
+class DBSlowQuery(SQLAlchemyModelFactory):
+    """Slow query factory. Default kwargs are:"""  # noqa: D400
+
+    class Meta(BaseMeta):  # noqa: D106
+        model = models.SlowQuery
+        sqlalchemy_get_or_create = ("fingerprint",)
+
+    fingerprint = LazyFunction(lambda: uuid.uuid4().hex)
+    operation = "ListResults"
+    statement = Sequence(lambda n: f"SELECT {n} FROM result")
+    parameters = {"param_1": "time"}
+    calls = 1
+    total_time = 100.0
+    max_time = 100.0
@@ -0,0 +1,25 @@
+"""Gunicorn configuration to aggregate the metrics of the workers.
+
+When PROMETHEUS_MULTIPROC_DIR is set, each worker writes its metrics
+into that directory, see :mod:`backend.utils.metrics`. The directory is
+emptied when gunicorn starts and the workers which exit are marked as
+dead, so their gauges are not aggregated anymore.
+"""
+import os
+
+from prometheus_client import multiprocess
+
+
+def on_starting(server):
+    """Empty the metrics directory of a previous run."""
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        os.makedirs(path, exist_ok=True)
+        for name in os.listdir(path):
+            os.remove(os.path.join(path, name))
+
+
+def child_exit(server, worker):
+    """Remove the live metrics of an exited worker."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,35 @@
+"""Add query cache table.
+
+Revision ID: 0b7d3e9c4a15
+Revises: e5c8a1f3b962
+Create Date: 2026-10-18 00:41:09.517830
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0b7d3e9c4a15'
+down_revision = 'e5c8a1f3b962'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Upgrade database."""
+    op.create_table(
+        'query_cache',
+        sa.Column('key', sa.Text(), nullable=False),
+        sa.Column('value', sa.LargeBinary(), nullable=False),
+        sa.Column('created', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('key'),
+        prefixes=['UNLOGGED'],
+    )
+    op.create_index(
+        'ix_query_cache_created', 'query_cache', ['created'], unique=False,
+    )
+
+
+def downgrade():
+    """Downgrade database."""
+    op.drop_index('ix_query_cache_created', table_name='query_cache')
+    op.drop_table('query_cache')
@@ -0,0 +1,236 @@
+"""Add leaderboards.
+
+Revision ID: 6e1f4b8d2a97
+Revises: 0b7d3e9c4a15
+Create Date: 2026-10-18 01:27:52.918406
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '6e1f4b8d2a97'
+down_revision = '0b7d3e9c4a15'
+branch_labels = None
+depends_on = None
+
+#: New tables with version counter
+tracked = ['leaderboard', 'leaderboard_entry']
+
+
+def upgrade():
+    """Upgrade database."""
+    op.create_table(
+        'leaderboard',
+        sa.Column('name', sa.Text(), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('benchmark_id', postgresql.UUID(as_uuid=True),
+                  nullable=False),
+        sa.Column('path', sa.Text(), nullable=False),
+        sa.Column('aggregation', sa.Enum(
+            'min', 'max', 'mean', 'median', name='aggregation'
+        ), nullable=False),
+        sa.Column('descending', sa.Boolean(), nullable=False),
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.ForeignKeyConstraint(['benchmark_id'], ['benchmark.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_table(
+        'leaderboard_entry',
+        sa.Column('leaderboard_id', postgresql.UUID(as_uuid=True),
+                  nullable=False),
+        sa.Column('flavor_id', postgresql.UUID(as_uuid=True),
+                  nullable=False),
+        sa.Column('value', sa.Float(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('total', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['flavor_id'], ['flavor.id'],
+                                ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['leaderboard_id'], ['leaderboard.id'],
+                                ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('leaderboard_id', 'flavor_id'),
+    )
+    op.create_index(
+        'ix_leaderboard_entry_rank', 'leaderboard_entry',
+        ['leaderboard_id', 'value'], unique=False,
+    )
+    op.create_index(
+        'ix_result_benchmark_flavor', 'result',
+        ['benchmark_id', 'flavor_id'], unique=False,
+        postgresql_where=sa.text('NOT deleted'),
+    )
+    for table in tracked:
+        op.execute(f"""
+CREATE TRIGGER table_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON "{table}"
+    FOR EACH STATEMENT EXECUTE PROCEDURE bump_table_version();
+""")
+    op.execute("""
+CREATE OR REPLACE FUNCTION leaderboard_refresh(board_id uuid, flavors uuid[])
+RETURNS void AS $$
+DECLARE
+    board RECORD;
+    path text[];
+BEGIN
+    SELECT * INTO board FROM leaderboard WHERE id = board_id;
+    path := string_to_array(board.path, '.');
+
+    -- Concurrent uploads of a flavor refresh its score in turns, so the
+    -- last one aggregates the results committed by the others.
+    PERFORM pg_advisory_xact_lock(hashtextextended(board.id || flavor, 0))
+    FROM unnest(flavors::text[]) AS flavor ORDER BY flavor;
+
+    INSERT INTO leaderboard_entry AS entry
+        (leaderboard_id, flavor_id, value, count, total)
+    SELECT board.id, item.flavor_id, CASE board.aggregation
+            WHEN 'min' THEN min(item.value)
+            WHEN 'max' THEN max(item.value)
+            WHEN 'mean' THEN avg(item.value)
+            ELSE percentile_cont(0.5) WITHIN GROUP (ORDER BY item.value)
+        END, count(*), sum(item.value)
+    FROM (
+        SELECT flavor_id, (json #>> path)::float AS value FROM result
+        WHERE benchmark_id = board.benchmark_id AND NOT deleted
+            AND jsonb_typeof(json #> path) = 'number'
+            AND (flavors IS NULL OR flavor_id = ANY(flavors))
+    ) AS item
+    GROUP BY item.flavor_id
+    ON CONFLICT (leaderboard_id, flavor_id) DO UPDATE
+        SET value = excluded.value, count = excluded.count,
+            total = excluded.total
+        WHERE (entry.value, entry.count, entry.total) IS DISTINCT FROM
+            (excluded.value, excluded.count, excluded.total);
+
+    DELETE FROM leaderboard_entry AS entry WHERE leaderboard_id = board.id
+        AND (flavors IS NULL OR flavor_id = ANY(flavors))
+        AND NOT EXISTS (
+            SELECT FROM result
+            WHERE benchmark_id = board.benchmark_id AND NOT deleted
+                AND flavor_id = entry.flavor_id
+                AND jsonb_typeof(json #> path) = 'number'
+        );
+END $$ LANGUAGE plpgsql;
+""")
+    op.execute("""
+CREATE OR REPLACE FUNCTION leaderboard_apply(added result[], removed result[])
+RETURNS void AS $$
+DECLARE
+    board RECORD;
+    delta RECORD;
+    entry RECORD;
+    path text[];
+BEGIN
+    FOR board IN
+        SELECT * FROM leaderboard WHERE benchmark_id IN (
+            SELECT benchmark_id FROM unnest(added)
+            UNION SELECT benchmark_id FROM unnest(removed)
+        ) ORDER BY id
+    LOOP
+        path := string_to_array(board.path, '.');
+        FOR delta IN
+            SELECT item.flavor_id,
+                sum(item.sign) AS count, sum(item.sign * item.value) AS total,
+                min(item.value) FILTER (WHERE item.sign > 0) AS low,
+                max(item.value) FILTER (WHERE item.sign > 0) AS high,
+                min(item.value) FILTER (WHERE item.sign < 0) AS removed_low,
+                max(item.value) FILTER (WHERE item.sign < 0) AS removed_high
+            FROM (
+                SELECT flavor_id, 1 AS sign, (json #>> path)::float AS value
+                FROM unnest(added) WHERE benchmark_id = board.benchmark_id
+                    AND NOT deleted AND jsonb_typeof(json #> path) = 'number'
+                UNION ALL
+                SELECT flavor_id, -1, (json #>> path)::float
+                FROM unnest(removed) WHERE benchmark_id = board.benchmark_id
+                    AND NOT deleted AND jsonb_typeof(json #> path) = 'number'
+            ) AS item
+            GROUP BY item.flavor_id ORDER BY item.flavor_id
+        LOOP
+            -- Same lock as refresh, so updates apply on the last score.
+            PERFORM pg_advisory_xact_lock(
+                hashtextextended(board.id || delta.flavor_id::text, 0)
+            );
+            SELECT * INTO entry FROM leaderboard_entry
+            WHERE leaderboard_id = board.id AND flavor_id = delta.flavor_id;
+            IF NOT FOUND OR board.aggregation = 'median'
+                    OR (board.aggregation = 'min'
+                        AND delta.removed_low <= entry.value)
+                    OR (board.aggregation = 'max'
+                        AND delta.removed_high >= entry.value) THEN
+                PERFORM leaderboard_refresh(board.id, ARRAY[delta.flavor_id]);
+            ELSIF entry.count + delta.count <= 0 THEN
+                DELETE FROM leaderboard_entry WHERE leaderboard_id = board.id
+                    AND flavor_id = delta.flavor_id;
+            ELSIF delta.count <> 0 OR delta.low IS NOT NULL THEN
+                UPDATE leaderboard_entry SET
+                    count = entry.count + delta.count,
+                    total = entry.total + delta.total,
+                    value = CASE board.aggregation
+                        WHEN 'min' THEN least(entry.value, delta.low)
+                        WHEN 'max' THEN greatest(entry.value, delta.high)
+                        ELSE (entry.total + delta.total)
+                            / (entry.count + delta.count)
+                    END
+                WHERE leaderboard_id = board.id
+                    AND flavor_id = delta.flavor_id;
+            END IF;
+        END LOOP;
+    END LOOP;
+END $$ LANGUAGE plpgsql;
+""")
+    op.execute("""
+CREATE OR REPLACE FUNCTION result_sync_leaderboards() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM leaderboard_apply(ARRAY(
+            SELECT n::result FROM new_rows AS n
+            WHERE n.benchmark_id IN (SELECT benchmark_id FROM leaderboard)
+        ), '{}');
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM leaderboard_apply('{}', ARRAY(
+            SELECT o::result FROM old_rows AS o
+            WHERE o.benchmark_id IN (SELECT benchmark_id FROM leaderboard)
+        ));
+    ELSE
+        PERFORM leaderboard_apply(ARRAY(
+            SELECT n::result FROM old_rows AS o JOIN new_rows AS n USING (id)
+            WHERE (o.json, o.deleted, o.benchmark_id, o.flavor_id)
+                IS DISTINCT FROM
+                (n.json, n.deleted, n.benchmark_id, n.flavor_id)
+                AND n.benchmark_id IN (SELECT benchmark_id FROM leaderboard)
+        ), ARRAY(
+            SELECT o::result FROM old_rows AS o JOIN new_rows AS n USING (id)
+            WHERE (o.json, o.deleted, o.benchmark_id, o.flavor_id)
+                IS DISTINCT FROM
+                (n.json, n.deleted, n.benchmark_id, n.flavor_id)
+                AND o.benchmark_id IN (SELECT benchmark_id FROM leaderboard)
+        ));
+    END IF;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+""")
+    op.execute("""
+CREATE TRIGGER result_insert_leaderboards
+    AFTER INSERT ON result REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE PROCEDURE result_sync_leaderboards();
+
+CREATE TRIGGER result_delete_leaderboards
+    AFTER DELETE ON result REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE PROCEDURE result_sync_leaderboards();
+
+CREATE TRIGGER result_update_leaderboards
+    AFTER UPDATE ON result
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE PROCEDURE result_sync_leaderboards();
+""")
+
+
+def downgrade():
+    """Downgrade database."""
+    op.execute("DROP FUNCTION result_sync_leaderboards() CASCADE")
+    op.execute("DROP FUNCTION leaderboard_apply(result[], result[])")
+    op.execute("DROP FUNCTION leaderboard_refresh(uuid, uuid[])")
+    op.drop_index('ix_result_benchmark_flavor', table_name='result')
+    op.drop_index('ix_leaderboard_entry_rank', table_name='leaderboard_entry')
+    op.drop_table('leaderboard_entry')
+    op.drop_table('leaderboard')
+    op.execute("DROP TYPE aggregation")
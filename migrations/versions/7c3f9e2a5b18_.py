@@ -0,0 +1,35 @@
+"""Add rate limit table.
+
+Revision ID: 7c3f9e2a5b18
+Revises: d2a6f8c4e173
+Create Date: 2026-10-18 10:27:05.614932
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '7c3f9e2a5b18'
+down_revision = 'd2a6f8c4e173'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Upgrade database."""
+    op.create_table(
+        'rate_limit',
+        sa.Column('key', sa.Text(), nullable=False),
+        sa.Column('tokens', sa.Float(), nullable=False),
+        sa.Column('updated', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('key'),
+        prefixes=['UNLOGGED'],
+    )
+    op.create_index(
+        'ix_rate_limit_updated', 'rate_limit', ['updated'], unique=False,
+    )
+
+
+def downgrade():
+    """Downgrade database."""
+    op.drop_index('ix_rate_limit_updated', table_name='rate_limit')
+    op.drop_table('rate_limit')
@@ -0,0 +1,83 @@
+"""Denormalize result benchmark, flavor and site names.
+
+Revision ID: 8d41b6f0c2e9
+Revises: 5a3c9e1f7b2d
+Create Date: 2026-10-17 11:03:54.118734
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '8d41b6f0c2e9'
+down_revision = '5a3c9e1f7b2d'
+branch_labels = None
+depends_on = None
+
+columns = ['benchmark_name', 'flavor_name', 'site_name', 'site_address']
+
+
+def upgrade():
+    """Upgrade database."""
+    for column in columns:
+        op.add_column('result', sa.Column(column, sa.Text(), nullable=True))
+    op.execute("""
+CREATE OR REPLACE FUNCTION result_sync_names() RETURNS trigger AS $$
+BEGIN
+    SELECT docker_image || ':' || docker_tag INTO NEW.benchmark_name
+        FROM benchmark WHERE id = NEW.benchmark_id;
+    SELECT name INTO NEW.flavor_name
+        FROM flavor WHERE id = NEW.flavor_id;
+    SELECT name, address INTO NEW.site_name, NEW.site_address
+        FROM site WHERE id = NEW.site_id;
+    RETURN NEW;
+END $$ LANGUAGE plpgsql;
+
+CREATE TRIGGER result_sync_names
+    BEFORE INSERT OR UPDATE OF benchmark_id, flavor_id, site_id ON result
+    FOR EACH ROW EXECUTE PROCEDURE result_sync_names();
+
+CREATE OR REPLACE FUNCTION benchmark_sync_names() RETURNS trigger AS $$
+BEGIN
+    UPDATE result
+        SET benchmark_name = NEW.docker_image || ':' || NEW.docker_tag
+        WHERE benchmark_id = NEW.id;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE TRIGGER benchmark_sync_names
+    AFTER UPDATE OF docker_image, docker_tag ON benchmark
+    FOR EACH ROW EXECUTE PROCEDURE benchmark_sync_names();
+
+CREATE OR REPLACE FUNCTION flavor_sync_names() RETURNS trigger AS $$
+BEGIN
+    UPDATE result SET flavor_name = NEW.name WHERE flavor_id = NEW.id;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE TRIGGER flavor_sync_names
+    AFTER UPDATE OF name ON flavor
+    FOR EACH ROW EXECUTE PROCEDURE flavor_sync_names();
+
+CREATE OR REPLACE FUNCTION site_sync_names() RETURNS trigger AS $$
+BEGIN
+    UPDATE result SET site_name = NEW.name, site_address = NEW.address
+        WHERE site_id = NEW.id;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE TRIGGER site_sync_names
+    AFTER UPDATE OF name, address ON site
+    FOR EACH ROW EXECUTE PROCEDURE site_sync_names();
+""")
+    op.execute("UPDATE result SET benchmark_id = benchmark_id")  # Backfill
+    for column in columns:
+        op.alter_column('result', column, nullable=False)
+
+
+def downgrade():
+    """Downgrade database."""
+    for table in ['result', 'benchmark', 'flavor', 'site']:
+        op.execute(f"DROP TRIGGER {table}_sync_names ON {table}")
+        op.execute(f"DROP FUNCTION {table}_sync_names()")
+    for column in columns:
+        op.drop_column('result', column)
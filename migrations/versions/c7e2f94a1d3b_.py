@@ -0,0 +1,115 @@
+"""Add text search vectors to results, benchmarks and sites.
+
+Revision ID: c7e2f94a1d3b
+Revises: 8d41b6f0c2e9
+Create Date: 2026-10-17 12:20:07.553190
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'c7e2f94a1d3b'
+down_revision = '8d41b6f0c2e9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Upgrade database."""
+    op.add_column('benchmark', sa.Column(
+        'search_vector', postgresql.TSVECTOR(), sa.Computed(
+            "to_tsvector('simple', docker_image || ' ' || docker_tag || ' ' || "
+            "coalesce(description, ''))", persisted=True,
+        ), nullable=True,
+    ))
+    op.create_index(
+        'ix_benchmark_search_vector', 'benchmark', ['search_vector'],
+        unique=False, postgresql_using='gin',
+    )
+    op.add_column('site', sa.Column(
+        'search_vector', postgresql.TSVECTOR(), sa.Computed(
+            "to_tsvector('simple', name || ' ' || address || ' ' || "
+            "coalesce(description, ''))", persisted=True,
+        ), nullable=True,
+    ))
+    op.create_index(
+        'ix_site_search_vector', 'site', ['search_vector'],
+        unique=False, postgresql_using='gin',
+    )
+    op.add_column('result', sa.Column(
+        'search_vector', postgresql.TSVECTOR(), nullable=True,
+    ))
+    op.execute("""
+CREATE OR REPLACE FUNCTION result_search_vector(item result)
+RETURNS tsvector AS $$
+    SELECT to_tsvector('simple', concat_ws(' ',
+        item.benchmark_name, item.site_name, item.site_address,
+        item.flavor_name, (
+            SELECT string_agg(tag.name, ' ') FROM result_tags
+            JOIN tag ON tag.id = result_tags.tag_id
+            WHERE result_tags.result_id = item.id
+        )
+    ))
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION result_sync_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := result_search_vector(NEW);
+    RETURN NEW;
+END $$ LANGUAGE plpgsql;
+
+CREATE TRIGGER result_sync_vector
+    BEFORE INSERT OR UPDATE OF
+        benchmark_name, flavor_name, site_name, site_address ON result
+    FOR EACH ROW EXECUTE PROCEDURE result_sync_vector();
+
+CREATE OR REPLACE FUNCTION result_tags_sync_vector() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        UPDATE result SET search_vector = result_search_vector(result)
+            WHERE id = OLD.result_id;
+    ELSE
+        UPDATE result SET search_vector = result_search_vector(result)
+            WHERE id = NEW.result_id;
+    END IF;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE TRIGGER result_tags_sync_vector
+    AFTER INSERT OR DELETE ON result_tags
+    FOR EACH ROW EXECUTE PROCEDURE result_tags_sync_vector();
+
+CREATE OR REPLACE FUNCTION tag_sync_vector() RETURNS trigger AS $$
+BEGIN
+    UPDATE result SET search_vector = result_search_vector(result)
+        WHERE id IN (
+            SELECT result_id FROM result_tags WHERE tag_id = NEW.id
+        );
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE TRIGGER tag_sync_vector
+    AFTER UPDATE OF name ON tag
+    FOR EACH ROW EXECUTE PROCEDURE tag_sync_vector();
+""")
+    op.execute("UPDATE result SET search_vector = result_search_vector(result)")
+    op.alter_column('result', 'search_vector', nullable=False)
+    op.create_index(
+        'ix_result_search_vector', 'result', ['search_vector'],
+        unique=False, postgresql_using='gin',
+    )
+
+
+def downgrade():
+    """Downgrade database."""
+    op.drop_index('ix_result_search_vector', table_name='result')
+    for table in ['result', 'result_tags', 'tag']:
+        op.execute(f"DROP TRIGGER {table}_sync_vector ON {table}")
+        op.execute(f"DROP FUNCTION {table}_sync_vector()")
+    op.execute("DROP FUNCTION result_search_vector(result)")
+    op.drop_column('result', 'search_vector')
+    op.drop_index('ix_site_search_vector', table_name='site')
+    op.drop_column('site', 'search_vector')
+    op.drop_index('ix_benchmark_search_vector', table_name='benchmark')
+    op.drop_column('benchmark', 'search_vector')
@@ -0,0 +1,55 @@
+"""Add table version counters.
+
+Revision ID: e5c8a1f3b962
+Revises: a4b9d2e7f031
+Create Date: 2026-10-17 23:58:41.203117
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'e5c8a1f3b962'
+down_revision = 'a4b9d2e7f031'
+branch_labels = None
+depends_on = None
+
+#: Tables with version counter
+tracked = [
+    'benchmark', 'claim', 'flavor', 'result', 'result_tags',
+    'site', 'submit', 'tag', 'user',
+]
+
+
+def upgrade():
+    """Upgrade database."""
+    op.create_table(
+        'table_version',
+        sa.Column('name', sa.Text(), nullable=False),
+        sa.Column('slot', sa.SmallInteger(), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('name', 'slot'),
+    )
+    op.execute("""
+CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO table_version (name, slot, version)
+        VALUES (TG_TABLE_NAME, pg_backend_pid() % 16, 1)
+        ON CONFLICT (name, slot)
+        DO UPDATE SET version = table_version.version + 1;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+""")
+    for table in tracked:
+        op.execute(f"""
+CREATE TRIGGER table_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON "{table}"
+    FOR EACH STATEMENT EXECUTE PROCEDURE bump_table_version();
+""")
+
+
+def downgrade():
+    """Downgrade database."""
+    for table in tracked:
+        op.execute(f'DROP TRIGGER table_version ON "{table}"')
+    op.execute("DROP FUNCTION bump_table_version()")
+    op.drop_table('table_version')
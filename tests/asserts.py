@@ -1,7 +1,12 @@
 """Function asserts for tests."""
+import statistics
+from json import loads
 from urllib import parse
 
-from backend.extensions import mail
+from pytest import approx
+
+from backend import models, notifications
+from backend.extensions import db, mail
 
 
 def match_pagination(json, url):
@@ -11,17 +16,40 @@ def match_pagination(json, url):
 
     assert 'has_next' in json and type(json['has_next']) is bool
     assert 'has_prev' in json and type(json['has_prev']) is bool
-    assert 'total' in json and type(json['total']) is int
     assert 'items' in json and type(json['items']) is list
-    assert 'pages' in json and type(json['pages']) is int
     assert 'per_page' in json and type(json['per_page']) is int
     assert 'page' in json and type(json['page']) is int
+    if query_param.get('count', ['exact'])[0] == 'none':
+        assert 'total' not in json and 'pages' not in json
+    else:
+        assert 'total' in json and type(json['total']) is int
+        assert 'pages' in json and type(json['pages']) is int
 
     # Pagination checks
     if 'per_page' in query_param:
-        assert json['per_page'] == query_param['per_page'][0]
+        assert json['per_page'] == int(query_param['per_page'][0])
     if 'page' in query_param:
-        assert json['page'] == query_param['page'][0]
+        assert json['page'] == int(query_param['page'][0])
+
+    return True
+
+
+def match_keyset(json, url):
+    """Check the json is a keyset pagination object."""
+    parsed_url = parse.urlparse(url)
+    query_param = parse.parse_qs(parsed_url.query)
+
+    assert 'has_next' in json and type(json['has_next']) is bool
+    assert 'has_prev' in json and type(json['has_prev']) is bool
+    assert 'items' in json and type(json['items']) is list
+    assert 'per_page' in json and type(json['per_page']) is int
+    assert 'total' not in json and 'pages' not in json
+
+    # Cursor checks
+    if json['has_next']:
+        assert 'next_after' in json and type(json['next_after']) is str
+    if query_param.get('after', [''])[0] == '':
+        assert json['has_prev'] is False
 
     return True
 
@@ -144,6 +172,60 @@ def match_flavor(json, flavor):
     return True
 
 
+def match_leaderboard(json, leaderboard):
+    """Check the json db_instances matches the leaderboard object."""
+    # Check the leaderboard has id
+    assert 'id' in json and type(json['id']) is str
+    assert json['id'] == str(leaderboard.id)
+
+    # Check the leaderboard has name
+    assert 'name' in json and type(json['name']) is str
+    assert json['name'] == leaderboard.name
+
+    # Check the leaderboard has benchmark_id
+    assert 'benchmark_id' in json and type(json['benchmark_id']) is str
+    assert json['benchmark_id'] == str(leaderboard.benchmark_id)
+
+    # Check the leaderboard has path, aggregation and descending
+    assert json['path'] == leaderboard.path
+    assert json['aggregation'] == leaderboard.aggregation.name
+    assert json['descending'] == leaderboard.descending
+
+    return True
+
+
+def match_entries(json, leaderboard):
+    """Check the json entries match the leaderboard results."""
+    aggregate = {
+        "min": min, "max": max,
+        "mean": statistics.mean, "median": statistics.median,
+    }[leaderboard.aggregation.name]
+    values = {}
+    for result in models.Result.query.filter_by(
+        benchmark_id=leaderboard.benchmark_id
+    ):
+        value = result.json
+        for key in leaderboard.path.split('.'):
+            value = value.get(key) if isinstance(value, dict) else None
+        if type(value) in (int, float):
+            values.setdefault(str(result.flavor_id), []).append(value)
+
+    scores = {k: aggregate(v) for k, v in values.items()}
+    sign = -1 if leaderboard.descending else 1
+    assert {x['flavor']['id'] for x in json} == set(scores)
+    for item in json:
+        flavor_id = item['flavor']['id']
+        assert item['value'] == approx(scores[flavor_id])
+        assert item['count'] == len(values[flavor_id])
+        better = [x for x in scores.values()
+                  if sign * x < sign * scores[flavor_id]]
+        assert item['rank'] == len(better) + 1
+        flavor = models.Flavor.query.get(flavor_id)
+        assert item['site']['id'] == str(flavor.site_id)
+
+    return True
+
+
 def match_tag(json, tag):
     """Check the json tag contains the correct attributes."""
     # Check the tag has an id
@@ -222,6 +304,77 @@ def match_result(json, result):
     return True
 
 
+def match_stats(json, values, percentiles):
+    """Check the json are the statistics of the values."""
+    values = sorted(values)
+    assert json['count'] == len(values)
+    assert json['min'] == values[0]
+    assert json['max'] == values[-1]
+    assert json['mean'] == approx(statistics.mean(values))
+    if len(values) > 1:
+        assert json['stddev'] == approx(statistics.stdev(values))
+    for fraction in percentiles:  # Linear interpolation as percentile_cont
+        position = (len(values) - 1) * fraction
+        lower, upper = int(position), min(int(position) + 1, len(values) - 1)
+        expected = values[lower] + \
+            (values[upper] - values[lower]) * (position - lower)
+        assert json['percentiles'][str(fraction)] == approx(expected)
+    return True
+
+
+def match_projection(json, item, fields=None, json_fields=None):
+    """Check the json has only the selected fields of the full item."""
+    def select(item, names):
+        if isinstance(item, list):
+            return [select(x, names) for x in item]
+        selected = {}
+        for name in names:
+            key, _, rest = name.partition(".")
+            if key in item:
+                selected.setdefault(key, []).append(rest)
+        return {
+            key: item[key] if "" in rest else select(item[key], rest)
+            for key, rest in selected.items()
+        }
+
+    expected = select(item, fields.split(",")) if fields else dict(item)
+    if json_fields:
+        expected["json"] = {}
+        for path in json_fields.split(","):
+            *parents, leaf = path.split(".")
+            node, value = expected["json"], item["json"]
+            for key in parents:
+                node = node.setdefault(key, {})
+                value = value.get(key) if type(value) is dict else None
+            node[leaf] = value.get(leaf) if type(value) is dict else None
+    assert json == expected
+
+    return True
+
+
+def match_row(row, json):
+    """Check the csv row has the json values by column path."""
+    for column, value in row.items():
+        expected = json
+        for key in column.split("."):
+            expected = expected.get(key) if type(expected) is dict else None
+        if type(expected) in (dict, list):
+            assert loads(value) == expected
+        else:
+            assert value == ("" if expected is None else str(expected))
+
+    # Check the json values have a column
+    def leaves(json, prefix):
+        for key, value in json.items():
+            if type(value) is dict:
+                yield from leaves(value, f"{prefix}{key}.")
+            elif value is not None:
+                yield f"{prefix}{key}"
+    assert set(leaves(json.get('json', {}), "json.")) <= set(row)
+
+    return True
+
+
 def match_query(json, url):
     """Check the json db_instances matches the url query."""
     parsed_url = parse.urlparse(url)
@@ -318,6 +471,13 @@ def match_query(json, url):
         if 'name' in query_param:
             assert json['name'] == query_param['name'][0]
 
+    # Exclusive for /leaderboards
+    if parsed_url.path == "/leaderboards":
+        if 'name' in query_param:
+            assert json['name'] == query_param['name'][0]
+        if 'benchmark_id' in query_param:
+            assert json['benchmark_id'] == query_param['benchmark_id'][0]
+
     # Exclusive for /tags
     if parsed_url.path == "/tags":
         if 'name' in query_param:
@@ -418,6 +578,8 @@ def user_welcome(user):
 
 def pop_notification(mail_outbox, filter):
     """Pop notification from outbox."""
+    db.session.begin_nested()  # Rollback dispatcher commit
+    notifications.dispatch()
     for index, item in enumerate(mail_outbox):
         if filter(item):
             return mail_outbox.pop(index)
@@ -1,8 +1,13 @@
 """Defines fixtures available to benchmarks tests."""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
 from flask import url_for
 from pytest import fixture
 
 from backend import models
+from backend.utils import imagerepo
 
 
 @fixture(scope='function')
@@ -27,3 +32,56 @@ def request_id(request, benchmark_id):
 def url(endpoint, request_id, query):
     """Fixture that return the url for the request."""
     return url_for(endpoint, id=request_id, **query)
+
+
+class RegistryHandler(BaseHTTPRequestHandler):
+    """Stand-in container registry serving manifests to the tests."""
+
+    #: Manifests served by repository and tag
+    manifests = {
+        ("library/image", "v1.0"): {"schemaVersion": 2, "layers": []},
+        ("private/image", "v1.0"): {"schemaVersion": 2, "layers": []},
+    }
+
+    def do_GET(self):  # noqa N802
+        """Serve tokens and manifests, private images require a token."""
+        self.server.requests.append(self.path)
+        host = f"{self.server.server_name}:{self.server.server_port}"
+        if self.path.startswith("/token"):
+            return self.reply(200, {"token": "secret"})
+        repository, tag = self.path[len("/v2/"):].split("/manifests/")
+        if repository.startswith("private/") and \
+                self.headers.get("Authorization") != "Bearer secret":
+            challenge = f'Bearer realm="http://{host}/token",' \
+                f'service="registry",scope="repository:{repository}:pull"'
+            return self.reply(401, {}, {"WWW-Authenticate": challenge})
+        if (repository, tag) not in self.manifests:
+            return self.reply(404, {})
+        return self.reply(200, self.manifests[(repository, tag)])
+
+    def reply(self, status, body, headers={}):
+        """Send a json response."""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(json.dumps(body).encode())
+
+    def log_message(self, *args):
+        """Do not log the requests."""
+
+
+@fixture(scope='function')
+def registry():
+    """Start a stand-in container registry for the test."""
+    imagerepo.clear()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RegistryHandler)
+    server.requests = []
+    server.host = f"127.0.0.1:{server.server_port}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    imagerepo.clear()
@@ -0,0 +1,66 @@
+"""Functional tests using pytest-flask."""
+from pytest import mark, raises
+
+from backend.utils import imagerepo
+
+
+@mark.parametrize("image, registry, repository", [
+    ("ubuntu", imagerepo.default_registry, "library/ubuntu"),
+    ("org/image", imagerepo.default_registry, "org/image"),
+    ("docker.io/ubuntu", imagerepo.default_registry, "library/ubuntu"),
+    ("ghcr.io/org/image", "https://ghcr.io", "org/image"),
+    ("localhost:5000/image", "http://localhost:5000", "image"),
+])
+def test_parse(image, registry, repository):
+    """Parse returns the registry url and the image repository."""
+    assert imagerepo.parse(image) == (registry, repository)
+
+
+class TestManifest:
+    """Test manifest lookups on a stand-in registry."""
+
+    def test_found(self, registry):
+        """Manifests found are cached."""
+        image = f"{registry.host}/library/image"
+        for _ in range(3):
+            assert imagerepo.manifest(image, "v1.0")["schemaVersion"] == 2
+        assert len(registry.requests) == 1
+
+    def test_token(self, registry):
+        """Private manifests request a bearer token."""
+        image = f"{registry.host}/private/image"
+        assert imagerepo.manifest(image, "v1.0")["schemaVersion"] == 2
+        assert [x.split("?")[0] for x in registry.requests] == [
+            "/v2/private/image/manifests/v1.0", "/token",
+            "/v2/private/image/manifests/v1.0",
+        ]
+
+    def test_not_found(self, registry):
+        """Manifests not found are cached as negative entries."""
+        image = f"{registry.host}/library/image"
+        for _ in range(3):
+            with raises(imagerepo.ManifestNotFound):
+                imagerepo.manifest(image, "v9.9")
+        assert len(registry.requests) == 1
+
+    def test_expired(self, app, monkeypatch, registry):
+        """Expired entries are looked up again."""
+        monkeypatch.setitem(app.config, "REGISTRY_CACHE_TTL", -1)
+        monkeypatch.setitem(app.config, "REGISTRY_CACHE_NEGATIVE_TTL", -1)
+        image = f"{registry.host}/library/image"
+        imagerepo.manifest(image, "v1.0")
+        imagerepo.manifest(image, "v1.0")
+        for _ in range(2):
+            with raises(imagerepo.ManifestNotFound):
+                imagerepo.manifest(image, "v9.9")
+        assert len(registry.requests) == 4
+
+    def test_unreachable(self, app, monkeypatch, registry):
+        """Registry errors are not cached."""
+        monkeypatch.setitem(app.config, "REGISTRY_TIMEOUT", 1)
+        image = f"{registry.host}/library/image"
+        registry.shutdown()
+        registry.server_close()
+        with raises(imagerepo.RegistryError, match="pulling manifest"):
+            imagerepo.manifest(image, "v1.0")
+        assert imagerepo._cache == {}
@@ -5,6 +5,7 @@ from flask import url_for
 from pytest import fixture, mark
 
 from backend import models
+from backend.models.models import validators
 from backend.schemas import schemas
 from tests import asserts
 from tests.db_instances import benchmarks, users
@@ -40,6 +41,22 @@ class TestList:
             asserts.match_benchmark(item, benchmark)
             assert benchmark.status.name == "approved"
 
+    def test_304(self, client, url, response_GET):  # noqa N803
+        """GET method returns 304 if the benchmark did not change."""
+        etag = response_GET.headers["ETag"]
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+
+    def test_200_modified(self, client, url, response_GET, session):  # noqa N803
+        """GET method returns 200 if the benchmark changed."""
+        etag = response_GET.headers["ETag"]
+        models.Benchmark.query.first().description = "Modified description"
+        session.flush()
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
     @mark.parametrize("query", indirect=True, argvalues=[
         {"bad_key": "This is a non expected query key"},
         {"sort_by": "Bad sort command"},
@@ -72,6 +89,22 @@ class TestCreate:
         asserts.match_benchmark(response_POST.json, benchmark)
         asserts.submit_notification(benchmark.submit_report)
 
+    @mark.parametrize("token_sub", [users[0]["sub"]], indirect=True)
+    @mark.parametrize("token_iss", [users[0]["iss"]], indirect=True)
+    @mark.parametrize("tag, status", [("v1.0", 201), ("v9.9", 422)])
+    def test_registry(self, client, url, headers, registry, tag, status):
+        """POST method validates the image on the registry."""
+        body = {
+            "docker_image": f"{registry.host}/library/image",
+            "docker_tag": tag, "json_schema": {"x": 1},
+            "url": "https://my-new-benchmark.com",
+        }
+        response = client.post(url, headers=headers, json=body)
+        assert response.status_code == status
+        if status == 422:
+            error = response.json["errors"]["error"]
+            assert error.endswith("Error: manifest not found")
+
     @mark.parametrize("token_sub", [None], indirect=True)
     @mark.parametrize("token_iss", [None], indirect=True)
     @mark.parametrize("body", indirect=True, argvalues=[
@@ -133,6 +166,7 @@ class TestSearch:
         {"terms[]": ["b1"]},
         {"terms": ["b1", "v1.0"]},
         {"terms[]": ["b1", "v1.0"]},
+        {"terms": ["b", "v1"]},  # Words prefix
         {"terms": []},  # Empty query
         {"terms[]": []},  # Empty query
         {"sort_by": "+docker_image,+docker_tag"},
@@ -201,6 +235,24 @@ class TestUpdate:
         assert response_PUT.status_code == 204
         json = schemas.Benchmark().dump(benchmark)
         asserts.match_body(json, body)
+        for result in models.Result.query.filter_by(benchmark=benchmark):
+            assert result.benchmark_name == benchmark.name
+
+    @mark.usefixtures("grant_admin", "mock_docker_registry")
+    @mark.parametrize("token_sub", [users[0]["sub"]], indirect=True)
+    @mark.parametrize("token_iss", [users[0]["iss"]], indirect=True)
+    @mark.parametrize("body", indirect=True, argvalues=[
+        {"docker_image": "new_name", "docker_tag": "v1.0",
+         "url": "https://my-new-benchmark.com",
+         "json_schema": {"x": 2}},
+    ])
+    def test_204_validators(self, client, url, headers, body, benchmark):
+        """PUT method invalidates the benchmark cached validators."""
+        validators.get(benchmark)
+        assert benchmark.id in validators._cache
+        response = client.put(url, headers=headers, json=body)
+        assert response.status_code == 204
+        assert benchmark.id not in validators._cache
 
     @mark.parametrize("body", indirect=True, argvalues=[
         {"docker_tag": "new_tag"},
@@ -264,6 +316,16 @@ class TestDelete:
         assert response_DELETE.status_code == 204
         assert models.Benchmark.query.get(benchmark.id) is None
 
+    @mark.usefixtures("grant_admin")
+    @mark.parametrize("token_sub", [users[0]["sub"]], indirect=True)
+    @mark.parametrize("token_iss", [users[0]["iss"]], indirect=True)
+    def test_204_validators(self, client, url, headers, benchmark):
+        """DELETE method invalidates the benchmark cached validators."""
+        validators.get(benchmark)
+        response = client.delete(url, headers=headers)
+        assert response.status_code == 204
+        assert benchmark.id not in validators._cache
+
     def test_401(self, benchmark, response_DELETE):  # noqa N803
         """DELETE method fails 401 if not authorized."""
         assert response_DELETE.status_code == 401
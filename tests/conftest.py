@@ -8,7 +8,9 @@ import os
 from flaat.user_infos import UserInfos
 from pytest import fixture
 from pytest_postgresql.janitor import DatabaseJanitor
+from sqlalchemy import event
 
+import backend.utils.cache as cache
 import backend.utils.imagerepo as imagerepo
 import factories
 from backend import create_app, extensions
@@ -68,6 +70,7 @@ def db(app):
     [factories.DBSite(**x) for x in db_instances.sites]
     [factories.DBFlavor(**x) for x in db_instances.flavors]
     [factories.DBResult(**x) for x in db_instances.results]
+    [factories.DBLeaderboard(**x) for x in db_instances.leaderboards]
     extensions.db.session.commit()
     yield extensions.db
     extensions.db.drop_all()
@@ -76,12 +79,24 @@ def db(app):
 @fixture(scope='function', autouse=True)
 def session(db):
     """Upload a new database session for a test."""
+    def restart_savepoint(session, transaction):
+        if transaction.nested and not transaction.parent.nested:
+            session.begin_nested()  # Rollback the next app commit too
+
     db.session.begin(nested=True)  # Rollback app commits
+    event.listen(db.session, "after_transaction_end", restart_savepoint)
     yield db.session
+    event.remove(db.session, "after_transaction_end", restart_savepoint)
     db.session.rollback()   # Discard test changes
     db.session.close()      # Next test gets a new session
 
 
+@fixture(scope='function', autouse=True)
+def clear_query_cache(app):
+    """Empty the query cache, versions are reused after rollbacks."""
+    cache.clear()
+
+
 @fixture(scope='function')
 def token_sub(request):
     """Return the sub to include on the user token."""
@@ -121,6 +136,20 @@ def user_infos(mocker, token_sub, token_iss, user_email):
     )
 
 
+@fixture(scope='function')
+def sql_statements(session):
+    """Return the list of SQL statements executed during the test."""
+    statements = []
+
+    def collect(conn, cursor, statement, *args):
+        if not statement.startswith(("SAVEPOINT", "RELEASE SAVEPOINT")):
+            statements.append(statement)  # Skip test transaction control
+    engine = session.get_bind()
+    event.listen(engine, "before_cursor_execute", collect)
+    yield statements
+    event.remove(engine, "before_cursor_execute", collect)
+
+
 @fixture(scope='function')
 def grant_admin(monkeypatch):
     """Patch fixture to test function as admin user."""
@@ -0,0 +1,30 @@
+"""Defines fixtures available to database tests."""
+from prometheus_client import REGISTRY
+from pytest import fixture
+from sqlalchemy import create_engine
+
+from backend.utils import pool
+
+
+@fixture(scope='function')
+def config(app, request):
+    """Return the app configuration updated with the test settings."""
+    settings = request.param if hasattr(request, 'param') else {}
+    return {**app.config, **settings}
+
+
+@fixture(scope='function')
+def engine(app, config):
+    """Return an engine created with the pool settings of the config."""
+    options = pool.engine_options(config)
+    engine = create_engine(app.config['SQLALCHEMY_DATABASE_URI'], **options)
+    yield engine
+    engine.dispose()
+
+
+@fixture(scope='function')
+def sample():
+    """Return a function to read the current value of a metric."""
+    def sample(name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+    return sample
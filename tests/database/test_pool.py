@@ -0,0 +1,81 @@
+"""Functional tests using pytest-flask."""
+from pytest import mark, raises
+from sqlalchemy import exc, text
+
+from backend.extensions import db
+from backend.utils import pool
+
+
+def test_app_engine(app):
+    """The application engine uses the pool settings."""
+    assert isinstance(db.engine.pool, pool.TimedQueuePool)
+    assert db.engine.pool.size() == app.config['DB_POOL_SIZE']
+    assert db.engine.pool._timeout == app.config['DB_POOL_TIMEOUT']
+
+
+wait = "db_pool_checkout_wait_seconds"
+
+
+class TestPool:
+    """Test the connection pool checkouts."""
+
+    @mark.parametrize("config", indirect=True, argvalues=[
+        {'DB_POOL_SIZE': 2, 'DB_MAX_OVERFLOW': 0},
+    ])
+    def test_checkouts(self, engine, sample):
+        """Checkouts waits are observed on the histogram."""
+        count, total = sample(f"{wait}_count"), sample(f"{wait}_sum")
+        with engine.connect(), engine.connect():
+            assert engine.pool.checkedout() == 2
+            assert engine.pool.overflow() == 0
+        assert engine.pool.checkedout() == 0
+        assert sample(f"{wait}_count") == count + 2
+        assert sample(f"{wait}_sum") >= total
+        assert sample(f"{wait}_bucket", le="+Inf") == count + 2
+
+    @mark.parametrize("config", indirect=True, argvalues=[
+        {'DB_POOL_SIZE': 1, 'DB_MAX_OVERFLOW': 0, 'DB_POOL_TIMEOUT': 0.1},
+    ])
+    def test_timeout(self, engine, sample):
+        """Checkouts waiting longer than the pool timeout fail."""
+        name = "db_pool_checkout_timeouts_total"
+        count, timeouts = sample(f"{wait}_count"), sample(name)
+        fast = sample(f"{wait}_bucket", le="0.05")
+        with engine.connect():
+            with raises(exc.TimeoutError):
+                engine.connect()
+        assert sample(f"{wait}_count") == count + 2
+        assert sample(f"{wait}_bucket", le="0.05") == fast + 1
+        assert sample(name) == timeouts + 1
+
+    @mark.parametrize("config", indirect=True, argvalues=[
+        {'DB_POOL_RECYCLE': 60, 'DB_POOL_PRE_PING': True},
+    ])
+    def test_options(self, engine, config):
+        """Recycle and pre ping are applied to the pool."""
+        assert engine.pool._recycle == config['DB_POOL_RECYCLE']
+        assert engine.pool._pre_ping is True
+
+
+@mark.parametrize("config", indirect=True, argvalues=[
+    {'DB_STATEMENT_TIMEOUT': 100, 'DB_PGBOUNCER': False},
+    {'DB_STATEMENT_TIMEOUT': 100, 'DB_PGBOUNCER': True},
+])
+class TestStatementTimeout:
+    """Test the statement timeout settings."""
+
+    def test_timeout(self, engine):
+        """Statements longer than the timeout are canceled."""
+        with engine.begin() as connection:
+            statement = text("SHOW statement_timeout")
+            assert connection.execute(statement).scalar() == "100ms"
+            with raises(exc.OperationalError, match="statement timeout"):
+                connection.execute(text("SELECT pg_sleep(1)"))
+
+    def test_options(self, config):
+        """Startup options are not sent in PgBouncer mode."""
+        options = pool.engine_options(config)
+        if config['DB_PGBOUNCER']:
+            assert 'connect_args' not in options
+        else:
+            assert 'execution_options' not in options
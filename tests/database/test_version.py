@@ -0,0 +1,38 @@
+"""Functional tests using pytest-flask."""
+from contextlib import ExitStack
+
+from sqlalchemy import text
+
+from backend.models.models import version
+
+slot = text(f"SELECT pg_backend_pid() % {version.slots}")
+modify = text("UPDATE tag SET name = name WHERE false")
+
+
+def test_current(engine):
+    """Modifying statements increment the version of the table."""
+    before = version.current(["tag", "unknown"])
+    with engine.begin() as connection:
+        connection.execute(modify)
+        connection.execute(modify)
+    assert version.current(["tag", "unknown"]) == {
+        "tag": before["tag"] + 2, "unknown": 0,
+    }
+
+
+def test_concurrent(engine):
+    """Sessions on different slots do not wait for each other."""
+    before = version.current(["tag"])["tag"]
+    with ExitStack() as stack:
+        connections = {}
+        while len(connections) < 2:  # Connections on different slots
+            connection = stack.enter_context(engine.connect())
+            connections[connection.execute(slot).scalar()] = connection
+        first, second = connections.values()
+        transactions = first.begin(), second.begin()
+        first.execute(modify)
+        second.execute(text("SET LOCAL lock_timeout = '1s'"))
+        second.execute(modify)  # Fails if the counter row is locked
+        for transaction in transactions:
+            transaction.commit()
+    assert version.current(["tag"])["tag"] == before + 2
@@ -173,3 +173,21 @@ results[5]["benchmark__id"] = benchmarks[0]["id"]
 results[5]["flavor__id"] = flavors[0]["id"]
 results[5]["uploader__email"] = users[0]["email"]
 results[5]["upload_datetime"] = datetime(2020, 1, 1)
+
+
+# Leaderboard specifications
+leaderboards = [{"id": uuid4()} for _ in range(2)]
+
+leaderboards[0]["name"] = "Fastest b0"
+leaderboards[0]["description"] = "Lowest time on benchmark 0"
+leaderboards[0]["benchmark__id"] = benchmarks[0]["id"]
+leaderboards[0]["path"] = "time"
+leaderboards[0]["aggregation"] = "min"
+leaderboards[0]["descending"] = False
+
+leaderboards[1]["name"] = "Highest b1"
+leaderboards[1]["description"] = "Highest mean s1.t2 on benchmark 1"
+leaderboards[1]["benchmark__id"] = benchmarks[1]["id"]
+leaderboards[1]["path"] = "s1.t2"
+leaderboards[1]["aggregation"] = "mean"
+leaderboards[1]["descending"] = True
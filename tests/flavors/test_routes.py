@@ -31,6 +31,13 @@ class TestGet:
         assert response_GET.status_code == 200
         asserts.match_flavor(response_GET.json, flavor)
 
+    def test_304(self, client, url, response_GET):  # noqa N803
+        """GET method returns 304 if the flavor did not change."""
+        etag = response_GET.headers["ETag"]
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+
     @mark.parametrize("request_id", [uuid4()], indirect=True)
     def test_404(self, response_GET):  # noqa N803
         """GET method fails 404 if no id found."""
@@ -59,6 +66,8 @@ class TestUpdate:
         assert response_PUT.status_code == 204
         json = schemas.Flavor().dump(flavor)
         asserts.match_body(json, body)
+        for result in models.Result.query.filter_by(flavor_id=flavor.id):
+            assert result.flavor_name == flavor.name
 
     @mark.parametrize("token_sub", [None], indirect=True)
     @mark.parametrize("token_iss", [None], indirect=True)
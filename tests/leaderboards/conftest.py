@@ -0,0 +1,22 @@
+"""Defines fixtures available to leaderboards tests."""
+from pytest import fixture
+
+from backend import models
+
+
+@fixture(scope='function')
+def leaderboard_id(request):
+    """Return leaderboard id of the leaderboard to test."""
+    return request.param if hasattr(request, 'param') else None
+
+
+@fixture(scope='function')
+def leaderboard(leaderboard_id):
+    """Return the leaderboard to test."""
+    return models.Leaderboard.query.get(leaderboard_id)
+
+
+@fixture(scope='function')
+def request_id(request, leaderboard_id):
+    """Return leaderboard id to use on the url call."""
+    return request.param if hasattr(request, 'param') else leaderboard_id
@@ -0,0 +1,343 @@
+"""Functional tests using pytest-flask."""
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep
+from uuid import uuid4
+
+from flask import url_for
+from pytest import fixture, mark
+from sqlalchemy import text
+
+import factories
+from backend import models
+from backend.extensions import db
+from tests import asserts
+from tests.db_instances import benchmarks, flavors, leaderboards, users
+
+
+@fixture(scope="function")
+def url(endpoint, request_id, query):
+    """Fixture that return the url for the request."""
+    return url_for(endpoint, leaderboard_id=request_id, **query)
+
+
+@mark.parametrize("endpoint", ["leaderboards.list"], indirect=True)
+class TestList:
+    """Test leaderboards list endpoint."""
+
+    @mark.parametrize("query", indirect=True, argvalues=[
+        {"name": leaderboards[0]["name"]},
+        {"benchmark_id": benchmarks[1]["id"]},
+        {},  # Multiple results
+        {"sort_by": "+name"},
+        {"sort_by": "-benchmark_id"},
+        {"sort_by": "+id"},
+    ])
+    def test_200(self, response_GET, url):  # noqa N803
+        """GET method succeeded 200."""
+        assert response_GET.status_code == 200
+        asserts.match_pagination(response_GET.json, url)
+        assert response_GET.json["items"] != []
+        for item in response_GET.json["items"]:
+            leaderboard = models.Leaderboard.query.get(item["id"])
+            asserts.match_query(item, url)
+            asserts.match_leaderboard(item, leaderboard)
+
+    def test_304(self, client, url, response_GET):  # noqa N803
+        """GET method returns 304 if the leaderboards did not change."""
+        etag = response_GET.headers["ETag"]
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+
+    @mark.parametrize("query", indirect=True, argvalues=[
+        {"bad_key": "This is a non expected query key"},
+        {"sort_by": "Bad sort command"},
+    ])
+    def test_422(self, response_GET):  # noqa N803
+        """GET method fails 422 if bad request body."""
+        assert response_GET.status_code == 422
+
+
+@mark.parametrize("endpoint", ["leaderboards.create"], indirect=True)
+class TestCreate:
+    """Test leaderboards create endpoint."""
+
+    @mark.usefixtures("grant_admin")
+    @mark.parametrize("token_sub", [users[0]["sub"]], indirect=True)
+    @mark.parametrize("token_iss", [users[0]["iss"]], indirect=True)
+    @mark.parametrize("body", indirect=True, argvalues=[
+        {"name": "l2", "benchmark_id": str(benchmarks[0]["id"]),
+         "path": "time", "aggregation": "max"},
+        {"name": "l3", "benchmark_id": str(benchmarks[0]["id"]),
+         "path": "s1.t2", "aggregation": "median", "descending": False},
+        {"name": "l4", "benchmark_id": str(benchmarks[1]["id"]),
+         "path": "time", "aggregation": "mean", "description": "Text"},
+    ])
+    def test_201(self, client, response_POST, body):  # noqa N803
+        """POST method succeeded 201."""
+        assert response_POST.status_code == 201
+        asserts.match_body(response_POST.json, body)
+        leaderboard = models.Leaderboard.query.get(response_POST.json["id"])
+        asserts.match_leaderboard(response_POST.json, leaderboard)
+        url = url_for("leaderboards.list_entries",
+                      leaderboard_id=leaderboard.id)
+        response = client.get(url)
+        assert response.json["items"] != []
+        asserts.match_entries(response.json["items"], leaderboard)
+
+    @mark.parametrize("token_sub", [None], indirect=True)
+    @mark.parametrize("token_iss", [None], indirect=True)
+    @mark.parametrize("body", indirect=True, argvalues=[
+        {"name": "l2", "benchmark_id": benchmarks[0]["id"],
+         "path": "time", "aggregation": "max"},
+    ])
+    def test_401(self, response_POST):  # noqa N803
+        """POST method fails 401 if not authorized."""
+        assert response_POST.status_code == 401
+
+    @mark.parametrize("token_sub", [users[0]["sub"]], indirect=True)
+    @mark.parametrize("token_iss", [users[0]["iss"]], indirect=True)
+    @mark.parametrize("body", indirect=True, argvalues=[
+        {"name": "l2", "benchmark_id": benchmarks[0]["id"],
+         "path": "time", "aggregation": "max"},
+    ])
+    def test_403(self, response_POST):  # noqa N803
+        """POST method fails 403 if forbidden."""
+        assert response_POST.status_code == 403
+
+    @mark.usefixtures("grant_admin")
+    @mark.parametrize("token_sub", [users[0]["sub"]], indirect=True)
+    @mark.parametrize("token_iss", [users[0]["iss"]], indirect=True)
+    @mark.parametrize("body", indirect=True, argvalues=[
+        {"name": "l2", "benchmark_id": uuid4(),
+         "path": "time", "aggregation": "max"},
+    ])
+    def test_404(self, response_POST):  # noqa N803
+        """POST method fails 404 if benchmark not found."""
+        assert response_POST.status_code == 404
+
+    @mark.usefixtures("grant_admin")
+    @mark.parametrize("token_sub", [users[0]["sub"]], indirect=True)
+    @mark.parametrize("token_iss", [users[0]["iss"]], indirect=True)
+    @mark.parametrize("body", indirect=True, argvalues=[
+        {"benchmark_id": benchmarks[0]["id"],
+         "path": "time", "aggregation": "max"},
+        {"name": "l2", "benchmark_id": benchmarks[0]["id"],
+         "path": "time..x", "aggregation": "max"},
+        {"name": "l2", "benchmark_id": benchmarks[0]["id"],
+         "path": "time", "aggregation": "sum"},
+    ])
+    def test_422(self, response_POST):  # noqa N803
+        """POST method fails 422 if bad request body."""
+        assert response_POST.status_code == 422
+
+
+@mark.parametrize("endpoint", ["leaderboards.get"], indirect=True)
+@mark.parametrize("leaderboard_id", indirect=True, argvalues=[
+    leaderboards[0]["id"],
+    leaderboards[1]["id"],
+])
+class TestGet:
+    """Test leaderboards get endpoint."""
+
+    def test_200(self, leaderboard, response_GET):  # noqa N803
+        """GET method succeeded 200."""
+        assert response_GET.status_code == 200
+        asserts.match_leaderboard(response_GET.json, leaderboard)
+
+    @mark.parametrize("request_id", [uuid4()], indirect=True)
+    def test_404(self, response_GET):  # noqa N803
+        """GET method fails 404 if no id found."""
+        assert response_GET.status_code == 404
+
+
+@mark.parametrize("endpoint", ["leaderboards.delete"], indirect=True)
+@mark.parametrize("leaderboard_id", indirect=True, argvalues=[
+    leaderboards[0]["id"],
+    leaderboards[1]["id"],
+])
+class TestDelete:
+    """Test leaderboards delete endpoint."""
+
+    @mark.usefixtures("grant_admin")
+    @mark.parametrize("token_sub", [users[0]["sub"]], indirect=True)
+    @mark.parametrize("token_iss", [users[0]["iss"]], indirect=True)
+    def test_204(self, leaderboard, response_DELETE):  # noqa N803
+        """DELETE method succeeded 204."""
+        assert response_DELETE.status_code == 204
+        assert models.Leaderboard.query.get(leaderboard.id) is None
+        entries = models.LeaderboardEntry.query.filter_by(
+            leaderboard_id=leaderboard.id
+        )
+        assert entries.count() == 0
+
+    @mark.parametrize("token_sub", [None], indirect=True)
+    @mark.parametrize("token_iss", [None], indirect=True)
+    def test_401(self, leaderboard, response_DELETE):  # noqa N803
+        """DELETE method fails 401 if not authorized."""
+        assert response_DELETE.status_code == 401
+        assert models.Leaderboard.query.get(leaderboard.id) is not None
+
+    @mark.parametrize("token_sub", [users[0]["sub"]], indirect=True)
+    @mark.parametrize("token_iss", [users[0]["iss"]], indirect=True)
+    def test_403(self, leaderboard, response_DELETE):  # noqa N803
+        """DELETE method fails 403 if forbidden."""
+        assert response_DELETE.status_code == 403
+        assert models.Leaderboard.query.get(leaderboard.id) is not None
+
+    @mark.usefixtures("grant_admin")
+    @mark.parametrize("token_sub", [users[0]["sub"]], indirect=True)
+    @mark.parametrize("token_iss", [users[0]["iss"]], indirect=True)
+    @mark.parametrize("request_id", [uuid4()], indirect=True)
+    def test_404(self, response_DELETE):  # noqa N803
+        """DELETE method fails 404 if no id found."""
+        assert response_DELETE.status_code == 404
+
+
+@mark.parametrize("endpoint", ["leaderboards.list_entries"], indirect=True)
+@mark.parametrize("leaderboard_id", indirect=True, argvalues=[
+    leaderboards[0]["id"],
+    leaderboards[1]["id"],
+])
+class TestListEntries:
+    """Test leaderboards list entries endpoint."""
+
+    @mark.parametrize("query", indirect=True, argvalues=[
+        {},
+        {"sort_by": "-value"},
+        {"sort_by": "+count,+flavor_id"},
+    ])
+    def test_200(self, leaderboard, response_GET, url):  # noqa N803
+        """GET method succeeded 200."""
+        assert response_GET.status_code == 200
+        asserts.match_pagination(response_GET.json, url)
+        assert response_GET.json["items"] != []
+        asserts.match_entries(response_GET.json["items"], leaderboard)
+
+    def test_200_created(self, client, leaderboard, url):  # noqa N803
+        """GET method returns the entries of the new results."""
+        for flavor, time in [(1, 3), (1, 9), (2, 1), (3, 15), (3, 5)]:
+            factories.DBResult(
+                benchmark__id=leaderboard.benchmark_id,
+                flavor__id=flavors[flavor]["id"],
+                json={"time": time, "s1": {"t2": time}},
+            )
+        response = client.get(url)
+        assert response.status_code == 200
+        assert len(response.json["items"]) > 2
+        asserts.match_entries(response.json["items"], leaderboard)
+
+    def test_200_deleted(self, client, leaderboard, url, session):  # noqa N803
+        """GET method does not return the entries of deleted results."""
+        results = models.Result.query.filter_by(
+            benchmark_id=leaderboard.benchmark_id
+        )
+        results.first().delete()  # Soft delete, as claims do
+        session.flush()
+        asserts.match_entries(client.get(url).json["items"], leaderboard)
+        for result in results:
+            session.delete(result)
+        session.flush()
+        assert client.get(url).json["items"] == []
+
+    def test_200_updated(self, client, leaderboard, url, session):  # noqa N803
+        """GET method returns the entries of the updated results."""
+        result = models.Result.query.filter_by(
+            benchmark_id=leaderboard.benchmark_id
+        ).first()
+        result.json = {"time": 100, "s1": {"t2": 100}}
+        result.flavor_id = flavors[3]["id"]
+        session.flush()
+        response = client.get(url)
+        asserts.match_entries(response.json["items"], leaderboard)
+
+    def test_200_concurrent(self, client, leaderboard, url):  # noqa N803
+        """GET method returns the entries of concurrent uploads."""
+        table = models.Result.__table__
+        template = models.Result.query.filter_by(
+            benchmark_id=leaderboard.benchmark_id
+        ).first()
+        rows = [{
+            **{c.name: getattr(template, c.key) for c in table.columns},
+            'id': uuid4(), 'json': {"time": value, "s1": {"t2": value}},
+        } for value in (0, 1000)]
+        waiting = text("SELECT count(*) FROM pg_locks WHERE NOT granted")
+        with db.engine.connect() as first, db.engine.connect() as second:
+            transactions = first.begin(), second.begin()
+            first.execute(table.insert(), rows[0])
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                upload = executor.submit(
+                    second.execute, table.insert(), rows[1],
+                )
+                while not db.session.execute(waiting).scalar():
+                    sleep(0.01)  # Second upload waits for the first
+                transactions[0].commit()
+                upload.result()
+            transactions[1].commit()
+        try:
+            response = client.get(url, query_string={"per_page": 100})
+            asserts.match_entries(response.json["items"], leaderboard)
+        finally:
+            with db.engine.begin() as connection:  # Uploads are committed
+                connection.execute(table.delete().where(
+                    table.c.id.in_([x['id'] for x in rows])
+                ))
+
+    def test_304(self, client, url, response_GET):  # noqa N803
+        """GET method returns 304 if the entries did not change."""
+        etag = response_GET.headers["ETag"]
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+
+    def test_200_modified(self, client, leaderboard, url, response_GET):  # noqa N803
+        """GET method returns 200 if a result changed the entries."""
+        etag = response_GET.headers["ETag"]
+        factories.DBResult(
+            benchmark__id=leaderboard.benchmark_id,
+            flavor__id=flavors[1]["id"], json={"time": 1, "s1": {"t2": 1}},
+        )
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
+    @mark.parametrize("request_id", [uuid4()], indirect=True)
+    def test_404(self, response_GET):  # noqa N803
+        """GET method fails 404 if no id found."""
+        assert response_GET.status_code == 404
+
+    @mark.parametrize("query", indirect=True, argvalues=[
+        {"bad_key": "This is a non expected query key"},
+        {"sort_by": "Bad sort command"},
+    ])
+    def test_422(self, response_GET):  # noqa N803
+        """GET method fails 422 if bad request body."""
+        assert response_GET.status_code == 422
+
+
+@mark.parametrize("endpoint", ["leaderboards.list_entries"], indirect=True)
+@mark.parametrize("aggregation", ["min", "max", "mean", "median"])
+def test_maintained(client, endpoint, session, aggregation):
+    """Entries follow the results created, claimed, updated and deleted."""
+    leaderboard = factories.DBLeaderboard(
+        benchmark__id=benchmarks[0]["id"], aggregation=aggregation,
+    )
+    session.refresh(leaderboard)  # Load the aggregation enum
+    url = url_for(endpoint, leaderboard_id=leaderboard.id, per_page=100)
+    results = [factories.DBResult(
+        benchmark__id=benchmarks[0]["id"], flavor__id=flavors[flavor]["id"],
+        json={"time": time},
+    ) for flavor, time in [(0, 50), (0, -50), (1, 5), (1, 5), (2, 7)]]
+    for change in [
+        lambda: None,
+        lambda: results[0].delete(),  # Claimed maximum
+        lambda: results[1].delete(),  # Claimed minimum
+        lambda: setattr(results[0], "deleted", False),  # Restored
+        lambda: setattr(results[2], "json", {"time": 1}),
+        lambda: setattr(results[3], "flavor_id", flavors[2]["id"]),
+        lambda: session.delete(results[4]),
+    ]:
+        change()
+        session.flush()
+        response = client.get(url)
+        asserts.match_entries(response.json["items"], leaderboard)
@@ -0,0 +1,18 @@
+"""Defines fixtures available to metrics tests."""
+from flask import url_for
+from prometheus_client import REGISTRY
+from pytest import fixture
+
+
+@fixture(scope='function')
+def url(endpoint, query):
+    """Fixture that return the url for the request."""
+    return url_for(endpoint, **query)
+
+
+@fixture(scope='function')
+def sample():
+    """Return a function to read the current value of a metric."""
+    def sample(name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+    return sample
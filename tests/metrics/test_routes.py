@@ -0,0 +1,83 @@
+"""Functional tests using pytest-flask."""
+from flask import url_for
+from pytest import mark
+
+from backend import models
+from backend.models.models import validators
+from tests.db_instances import benchmarks
+
+
+@mark.parametrize("endpoint", ["metrics"], indirect=True)
+class TestMetrics:
+    """Test metrics endpoint."""
+
+    def test_200(self, client, url):
+        """GET method returns the metrics in prometheus format."""
+        client.get(url_for("results.list"))
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.mimetype == "text/plain"
+        text = response.get_data(as_text=True)
+        for name in [
+            "http_request_duration_seconds",
+            "http_request_sql_statements",
+            "http_request_sql_duration_seconds",
+            "db_pool_checkout_wait_seconds",
+            "query_cache_lookups_total",
+            "json_schema_validation_seconds",
+            "notifications_send_seconds",
+        ]:
+            assert f"# TYPE {name} " in text
+
+
+class TestInstrumentation:
+    """Test the metrics observed by the application."""
+
+    def test_requests(self, client, sample):
+        """Requests are measured by operationId and status."""
+        labels = dict(operation="ListResults", method="GET", status="200")
+        count = sample("http_request_duration_seconds_count", **labels)
+        statements = sample(
+            "http_request_sql_statements_sum", operation="ListResults",
+        )
+        client.get(url_for("results.list", sort_by="+id"))
+        assert sample("http_request_duration_seconds_count", **labels) \
+            == count + 1
+        assert sample(
+            "http_request_sql_statements_sum", operation="ListResults",
+        ) > statements
+        assert sample(
+            "http_request_sql_duration_seconds_count", operation="ListResults",
+        ) > 0
+
+    def test_not_found(self, client, sample):
+        """Requests without route are measured as none."""
+        labels = dict(operation="none", method="GET", status="404")
+        count = sample("http_request_duration_seconds_count", **labels)
+        client.get("/not-a-route")
+        assert sample("http_request_duration_seconds_count", **labels) \
+            == count + 1
+
+    def test_cache(self, client, sample):
+        """Query cache lookups are counted by result."""
+        misses = sample(
+            "query_cache_lookups_total", backend="memory", result="miss",
+        )
+        hits = sample(
+            "query_cache_lookups_total", backend="memory", result="hit",
+        )
+        for _ in range(2):
+            client.get(url_for("results.list", per_page=3))
+        assert sample(
+            "query_cache_lookups_total", backend="memory", result="miss",
+        ) == misses + 1
+        assert sample(
+            "query_cache_lookups_total", backend="memory", result="hit",
+        ) == hits + 1
+
+    def test_validation(self, sample):
+        """JSON Schema validations are measured."""
+        count = sample("json_schema_validation_seconds_count")
+        benchmark = models.Benchmark.query.get(benchmarks[0]["id"])
+        validators.validate(benchmark, {"time": 10})
+        assert sample("json_schema_validation_seconds_count") == count + 1
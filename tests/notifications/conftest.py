@@ -0,0 +1,34 @@
+"""Defines fixtures available to notifications tests."""
+from pytest import fixture
+
+from backend import notifications
+from backend.extensions import mail
+
+
+@fixture(scope='function')
+def outbox(request, session):
+    """Return notifications added to the outbox for the test."""
+    count = request.param if hasattr(request, 'param') else 1
+    return [
+        notifications.enqueue(
+            subject=f"Subject {n}", body="Body", to=["user@example.com"],
+            headers={"Resource-ID": f"{n}"},
+        ) for n in range(count)
+    ]
+
+
+@fixture(scope='function')
+def mail_outbox():
+    """Return the test mail backend outbox emptied."""
+    mail_outbox = mail.get_connection().mailman.outbox
+    mail_outbox.clear()
+    return mail_outbox
+
+
+@fixture(scope='function')
+def dispatch(session):
+    """Return a dispatch function that rollbacks its commits."""
+    def dispatch():
+        session.begin_nested()  # Rollback dispatcher commit
+        return notifications.dispatch()
+    return dispatch
@@ -0,0 +1,85 @@
+"""Functional tests using pytest-flask."""
+import smtplib
+from datetime import datetime as dt
+
+from flask_mailman import EmailMessage
+from prometheus_client import REGISTRY
+from pytest import mark
+
+from backend.extensions import mail
+from backend.models.models.notification import DeliveryStatus
+
+
+class TestDispatch:
+    """Test notifications dispatcher."""
+
+    @mark.parametrize("outbox", [3], indirect=True)
+    def test_sent(self, dispatch, outbox, mail_outbox):
+        """Dispatch sends and records the pending notifications."""
+        assert dispatch() == 3
+        assert dispatch() == 0
+        assert len(mail_outbox) == 3
+        for notification, message in zip(outbox, mail_outbox):
+            assert notification.status == DeliveryStatus.sent
+            assert notification.sent_datetime is not None
+            assert message.subject == notification.subject
+            assert message.from_email == "no-reply@example.com"
+            assert message.extra_headers == notification.headers
+
+    @mark.parametrize("outbox", [3], indirect=True)
+    def test_batch(self, app, monkeypatch, mocker, dispatch, outbox):
+        """Dispatch sends batches over a single connection."""
+        monkeypatch.setitem(app.config, "NOTIFICATIONS_BATCH_SIZE", 2)
+        get_connection = mocker.spy(mail, "get_connection")
+        assert dispatch() == 2
+        assert dispatch() == 1
+        assert get_connection.call_count == 2
+        assert [x.status for x in outbox] == [DeliveryStatus.sent] * 3
+
+    def test_retry(self, app, monkeypatch, mocker, dispatch, outbox,
+                   mail_outbox):
+        """Dispatch retries failed deliveries with backoff."""
+        monkeypatch.setitem(app.config, "NOTIFICATIONS_MAX_ATTEMPTS", 3)
+        monkeypatch.setitem(app.config, "NOTIFICATIONS_RETRY_DELAY", 60)
+        error = smtplib.SMTPException("Server unavailable")
+        mocker.patch.object(EmailMessage, "send", side_effect=error)
+        notification = outbox[0]
+        delays = []
+        for attempts in range(1, 4):
+            notification.next_attempt = dt.now()
+            assert dispatch() == 1
+            assert notification.attempts == attempts
+            assert notification.error == "Server unavailable"
+            delays.append(notification.next_attempt)
+        assert notification.status == DeliveryStatus.failed
+        assert (delays[1] - delays[0]).total_seconds() >= 60
+        assert dispatch() == 0
+        assert mail_outbox == []
+
+    @mark.parametrize("outbox", [2], indirect=True)
+    def test_metrics(self, mocker, dispatch, outbox):
+        """Dispatch measures the time to send each notification."""
+        def count(status):
+            name = "notifications_send_seconds_count"
+            return REGISTRY.get_sample_value(name, {"status": status}) or 0
+        sent, failed = count("sent"), count("failed")
+        error = smtplib.SMTPException("Server unavailable")
+        mocker.patch.object(EmailMessage, "send", side_effect=[None, error])
+        assert dispatch() == 2
+        assert (count("sent"), count("failed")) == (sent + 1, failed + 1)
+
+    def test_delayed(self, dispatch, outbox, mail_outbox):
+        """Dispatch skips notifications waiting for the next attempt."""
+        outbox[0].next_attempt = dt(9999, 1, 1)
+        assert dispatch() == 0
+        assert outbox[0].status == DeliveryStatus.pending
+        assert mail_outbox == []
+
+    def test_command(self, app, session, outbox, mail_outbox):
+        """Command dispatch --once sends the pending notifications."""
+        session.begin_nested()  # Rollback dispatcher commit
+        runner = app.test_cli_runner()
+        result = runner.invoke(args=["notifications", "dispatch", "--once"])
+        assert result.exit_code == 0
+        assert outbox[0].status == DeliveryStatus.sent
+        assert len(mail_outbox) == 1
@@ -0,0 +1,39 @@
+"""Defines fixtures available to rate limit tests."""
+from flask import url_for
+from pytest import fixture
+
+from backend.utils import ratelimit
+
+
+@fixture(scope='function')
+def url(endpoint, query):
+    """Fixture that return the url for the request."""
+    return url_for(endpoint, **query)
+
+
+@fixture(scope='function')
+def limiter(request, app, monkeypatch):
+    """Patch the rate limiter backend and return it with empty buckets."""
+    backend = request.param if hasattr(request, 'param') else "memory"
+    monkeypatch.setitem(app.config, 'RATE_LIMIT_BACKEND', backend)
+    monkeypatch.setitem(app.config, 'RATE_LIMIT_CAPACITY', 5)
+    monkeypatch.setitem(app.config, 'RATE_LIMIT_RATE', 1)
+    ratelimit.clear()
+    yield ratelimit.backend()
+    ratelimit.clear()  # Database buckets are committed
+
+
+@fixture(scope='function')
+def concurrency(request, app, monkeypatch):
+    """Patch the maximum concurrent requests per client."""
+    value = request.param if hasattr(request, 'param') else 1
+    monkeypatch.setitem(app.config, 'RATE_LIMIT_CONCURRENCY', value)
+    return value
+
+
+@fixture(scope='function')
+def proxies(request, app, monkeypatch):
+    """Patch the number of trusted proxies setting X-Forwarded-For."""
+    value = request.param if hasattr(request, 'param') else 1
+    monkeypatch.setattr(app.wsgi_app, 'x_for', value)
+    return value
@@ -0,0 +1,127 @@
+"""Functional tests using pytest-flask."""
+import time
+
+from flask import url_for
+from pytest import mark, raises
+from sqlalchemy import select
+from werkzeug.exceptions import TooManyRequests
+
+from backend.extensions import flaat
+from backend.utils import ratelimit
+from tests.db_instances import users
+
+
+@mark.parametrize("limiter", ["memory", "database"], indirect=True)
+@mark.parametrize("endpoint", ["results.list"], indirect=True)
+class TestRateLimit:
+    """Test the rate limit of the requests."""
+
+    def test_200(self, limiter, response_GET):  # noqa N803
+        """Responses include the bucket of the client."""
+        assert response_GET.status_code == 200
+        assert response_GET.headers["RateLimit-Limit"] == "5"
+        assert response_GET.headers["RateLimit-Remaining"] == "3"
+        assert response_GET.headers["RateLimit-Reset"] == "120"
+        assert "Retry-After" not in response_GET.headers
+
+    def test_429(self, limiter, client, url):
+        """Requests fail 429 when the bucket has not enough tokens."""
+        assert client.get(url).status_code == 200
+        assert client.get(url).status_code == 200
+        response = client.get(url)
+        assert response.status_code == 429
+        assert response.headers["RateLimit-Remaining"] == "1"
+        assert response.headers["Retry-After"] == "60"
+
+    def test_429_cost(self, limiter, client, url):
+        """Expensive routes take more tokens from the bucket."""
+        assert client.get(url).status_code == 200
+        export = url_for("results.export", format="ndjson")
+        assert client.get(export).status_code == 429
+        stats = url_for("results.stats")
+        assert client.get(stats).status_code == 429
+        assert client.get(url).status_code == 200
+
+    @mark.parametrize("proxies", [1], indirect=True)
+    def test_ip(self, limiter, proxies, client, url):
+        """Anonymous requests are limited by the forwarded client IP."""
+        for _ in range(2):
+            client.get(url, headers={"X-Forwarded-For": "10.0.0.1"})
+        response = client.get(url, headers={
+            "X-Forwarded-For": "10.0.0.1, 10.0.0.2",
+        })
+        assert response.headers["RateLimit-Remaining"] == "3"
+        response = client.get(url, headers={"X-Forwarded-For": "10.0.0.1"})
+        assert response.status_code == 429
+
+    @mark.parametrize("proxies", [0], indirect=True)
+    def test_ip_untrusted(self, limiter, proxies, client, url):
+        """X-Forwarded-For is ignored without trusted proxies."""
+        for address in ["10.0.0.1", "10.0.0.2"]:
+            client.get(url, headers={"X-Forwarded-For": address})
+        response = client.get(url, headers={"X-Forwarded-For": "10.0.0.3"})
+        assert response.status_code == 429
+
+    @mark.parametrize("token_sub", [users[0]["sub"]], indirect=True)
+    @mark.parametrize("token_iss", [users[0]["iss"]], indirect=True)
+    def test_user(self, limiter, client, url, headers):
+        """Authenticated requests are limited by the token identity."""
+        for _ in range(2):
+            assert client.get(url, headers=headers).status_code == 200
+        assert client.get(url, headers=headers).status_code == 429
+        assert client.get(url).status_code == 200  # Anonymous bucket
+
+    def test_invalid_token(self, limiter, client, url, mocker):
+        """Invalid tokens are verified only while the client IP pays."""
+        verify = mocker.patch.object(
+            flaat, "get_user_infos_from_access_token", return_value=None,
+        )
+        headers = {"Authorization": "Bearer random-token"}
+        assert client.get(url, headers=headers).status_code == 200
+        for _ in range(5):
+            assert client.get(url, headers=headers).status_code == 429
+        assert verify.call_count == 3  # Until the IP bucket is empty
+
+
+@mark.parametrize("limiter", ["database"], indirect=True)
+def test_evicted(limiter, session):
+    """Full database buckets are removed when new buckets are created."""
+    now = time.time()
+    limiter.take("ip:10.0.0.1", 1)
+    session.execute(ratelimit.buckets.update().values(updated=now - 3600))
+    limiter.take("ip:10.0.0.2", 1)
+    keys = session.execute(select(ratelimit.buckets.c.key)).scalars()
+    assert keys.all() == ["ip:10.0.0.2"]
+
+
+@mark.parametrize("endpoint", ["results.list"], indirect=True)
+class TestDisabled:
+    """Test requests are not limited without backend."""
+
+    def test_200(self, client, url):
+        """Responses do not include the rate limit headers."""
+        for _ in range(10):
+            response = client.get(url)
+            assert response.status_code == 200
+            assert "RateLimit-Limit" not in response.headers
+
+
+@mark.parametrize("endpoint", ["results.list"], indirect=True)
+class TestConcurrency:
+    """Test the concurrent requests of a client."""
+
+    @mark.parametrize("concurrency", [2], indirect=True)
+    def test_429(self, app, url, concurrency):
+        """Requests fail 429 over the concurrency limit."""
+        contexts = []
+        for _ in range(2):  # Each request has its own application context
+            contexts += [app.app_context(), app.test_request_context(url)]
+            contexts[-2].push()
+            contexts[-1].push()
+            ratelimit.limit_request()
+        with app.app_context(), app.test_request_context(url):
+            with raises(TooManyRequests):
+                ratelimit.limit_request()
+        for context in reversed(contexts):  # Teardown releases the slots
+            context.pop()
+        assert ratelimit._inflight == {}
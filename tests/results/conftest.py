@@ -3,6 +3,8 @@ from flask import url_for
 from pytest import fixture
 
 from backend import models
+from backend.models.models import promoted
+from backend.utils import cache
 
 
 @fixture(scope='function')
@@ -27,3 +29,41 @@ def request_id(request, result_id):
 def url(endpoint, request_id, query):
     """Return the url for the request."""
     return url_for(endpoint, id=request_id, **query)
+
+
+@fixture(scope='function')
+def promoted_paths(request, monkeypatch):
+    """Patch the registry of promoted json paths for the test."""
+    paths = request.param if hasattr(request, 'param') else []
+    registry = [promoted.PromotedPath(*x) for x in paths]
+    monkeypatch.setattr(promoted, "registry", registry)
+    return registry
+
+
+@fixture(scope='function')
+def promoted_indexes(promoted_paths, session):
+    """Create the indexes of the patched promoted json paths."""
+    table = models.Result.__table__
+    indexes = promoted.indexes(table.c.json, table.c.benchmark_id)
+    for index in indexes:  # Dropped on the test rollback
+        index.create(session.connection())
+    yield indexes
+    table.indexes.difference_update(indexes)
+
+
+@fixture(scope='function')
+def query_cache(request, app, monkeypatch):
+    """Patch the query cache backend and return it empty."""
+    backend = request.param if hasattr(request, 'param') else "memory"
+    monkeypatch.setitem(app.config, 'QUERY_CACHE_BACKEND', backend)
+    cache.clear()
+    return cache.backend()
+
+
+@fixture(scope='function')
+def query_budget(request, app, monkeypatch):
+    """Patch the maximum cost and timeout, in ms, of the result queries."""
+    max_cost, timeout = request.param if hasattr(request, 'param') else (0, 0)
+    monkeypatch.setitem(app.config, 'RESULTS_QUERY_MAX_COST', max_cost)
+    monkeypatch.setitem(app.config, 'RESULTS_QUERY_TIMEOUT', timeout)
+    return max_cost, timeout
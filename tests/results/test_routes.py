@@ -1,11 +1,24 @@
 """Functional tests using pytest-flask."""
+import csv
+import io
+import json
+from urllib import parse
 from uuid import uuid4
 
+from flaat.user_infos import UserInfos
 from flask import url_for
-from pytest import fixture, mark
+from prometheus_client import REGISTRY
+from pytest import fixture, importorskip, mark, raises
+from sqlalchemy import text
+from werkzeug.exceptions import HTTPException
 
+import factories
 from backend import models
+from backend.extensions import db
+from backend.models.models import validators
+from backend.routes import results as routes
 from backend.schemas import schemas
+from backend.utils import exports, queries
 from tests import asserts
 from tests.db_instances import benchmarks, flavors, results, sites, tags, users
 
@@ -23,6 +36,14 @@ post_query = {
     "tags_ids": [tag["id"] for tag in [tags[0], tags[1]]],
 }
 
+batch_record = {
+    "execution_datetime": "2020-05-21T10:31:00.000+03:00",
+    "benchmark_id": str(benchmarks[0]["id"]),
+    "flavor_id": str(flavors[0]["id"]),
+    "tags_ids": [str(tag["id"]) for tag in [tags[0], tags[1]]],
+    "json": {"json_field_1": "Content", "time": 10},
+}
+
 
 @mark.parametrize("endpoint", ["results.list"], indirect=True)
 class TestList:
@@ -34,10 +55,13 @@ class TestList:
         {"flavor_id": flavors[0]["id"]},
         {"tags_ids": [tag["id"] for tag in [tags[0], tags[1]]]},
         {"tags_ids[]": [tag["id"] for tag in [tags[0], tags[1]]]},
+        {"tags_ids": [tags[1]["id"], tags[2]["id"]], "tags_mode": "any"},
         {"upload_before": "3000-01-01"},
         {"upload_after": "1000-01-01"},
         {"filters": ["type == AMD"]},
         {"filters": ["cpu == True"]},
+        {"filters": ["time == 11"]},
+        {"filters": ["s1.t2 == 11.0"]},
         {"filters": ["time < 11", "time > 9"]},
         {"filters[]": ["time < 11", "time > 9"]},
         {},  # Multiple reports
@@ -62,11 +86,336 @@ class TestList:
             asserts.match_result(item, result)
             assert not result.deleted
 
+    @mark.parametrize("query", indirect=True, argvalues=[
+        {"after": ""},
+        {"after": "", "per_page": 2},
+        {"after": "", "benchmark_id": benchmarks[0]["id"]},
+        {"after": "", "filters": ["time < 11", "time > 9"]},
+        {"after": "", "sort_by": "-upload_datetime"},
+        {"after": "", "sort_by": "+site_name,-flavor_name"},
+        {"after": "", "sort_by": "+json.other"},
+    ])
+    def test_200_keyset(self, response_GET, url):  # noqa N803
+        """GET method succeeded 200 using cursor pagination."""
+        assert response_GET.status_code == 200
+        asserts.match_keyset(response_GET.json, url)
+        assert response_GET.json["items"] != []
+        for item in response_GET.json["items"]:
+            result = models.Result.query.get(item["id"])
+            asserts.match_query(item, url)
+            asserts.match_result(item, result)
+            assert not result.deleted
+
+    @mark.parametrize("count", ["exact", "estimate", "none"])
+    @mark.parametrize("query", indirect=True, argvalues=[
+        {"sort_by": "+id"},  # Unique sorting to compare
+        {"sort_by": "+id", "per_page": 1},
+        {"sort_by": "+id", "per_page": 2, "page": 2},
+        {"benchmark_id": benchmarks[0]["id"], "sort_by": "+json.time,+id"},
+    ])
+    def test_200_count(self, client, endpoint, query, count):
+        """Pages are the same regardless of the count method."""
+        url = url_for(endpoint, count=count, **query)
+        response = client.get(url)
+        assert response.status_code == 200
+        asserts.match_pagination(response.json, url)
+        exact = client.get(url_for(endpoint, **query)).json
+        assert response.json["items"] == exact["items"]
+        assert response.json["has_next"] == exact["has_next"]
+        assert response.json["has_prev"] == exact["has_prev"]
+        if count == "estimate":  # Never lower than the collected items
+            page, per_page = response.json["page"], response.json["per_page"]
+            collected = (page - 1) * per_page + len(exact["items"])
+            assert response.json["total"] >= collected
+
+    @mark.parametrize("promoted_paths", indirect=True, argvalues=[
+        [(str(benchmarks[0]["id"]), ("time",), "number")],
+        [(str(benchmarks[0]["id"]), ("type",), "string")],
+    ])
+    @mark.parametrize("query", indirect=True, argvalues=[
+        {"benchmark_id": benchmarks[0]["id"], "filters": ["time < 11"]},
+        {"benchmark_id": benchmarks[0]["id"], "sort_by": "-json.time"},
+        {"benchmark_id": benchmarks[0]["id"], "sort_by": "+json.type"},
+        {"after": "", "benchmark_id": benchmarks[0]["id"],
+         "sort_by": "+json.time"},
+    ])
+    def test_200_promoted(self, promoted_paths, response_GET, url):  # noqa N803
+        """GET method succeeded 200 with promoted json paths."""
+        assert response_GET.status_code == 200
+        assert response_GET.json["items"] != []
+        for item in response_GET.json["items"]:
+            result = models.Result.query.get(item["id"])
+            asserts.match_query(item, url)
+            asserts.match_result(item, result)
+            assert not result.deleted
+
+    @mark.parametrize("sort_by", [  # Unique sorting to compare
+        "+execution_datetime,+id",
+        "-upload_datetime,+benchmark_name,-id",
+        "+json.time,+id",
+        "-json.other,-id",
+        "+json.s1.t2,-id",
+    ])
+    def test_200_keyset_pages(self, client, endpoint, sort_by):
+        """Following cursors returns the same items than offset pages."""
+        query = {"per_page": 1, "sort_by": sort_by}
+        expected = client.get(url_for(endpoint, per_page=100, **{
+            k: v for k, v in query.items() if k != "per_page"
+        })).json["items"]
+        ids, after = [], ""
+        while after is not None:
+            response = client.get(url_for(endpoint, after=after, **query))
+            assert response.status_code == 200
+            ids += [item["id"] for item in response.json["items"]]
+            after = response.json.get("next_after")
+        assert ids == [item["id"] for item in expected]
+
+    @mark.parametrize("query", indirect=True, argvalues=[
+        {},
+        {"per_page": 2},
+        {"after": "", "sort_by": "+benchmark_name"},
+        {"tags_ids": [tags[0]["id"]], "sort_by": "+json.time"},
+    ])
+    def test_200_statements(self, client, url, sql_statements):
+        """Items and nested fields are loaded using fixed statements."""
+        response = client.get(url)
+        assert response.status_code == 200
+        assert len(response.json["items"]) > 1
+        assert len(sql_statements) <= 4  # Versions, items, total and tags
+
+    @mark.parametrize("query_budget", [(1e6, 0), (1e6, 5000)], indirect=True)
+    @mark.parametrize("query", indirect=True, argvalues=[
+        {},
+        {"filters": ["time < 11"], "sort_by": "+json.time"},
+        {"after": "", "sort_by": "+json.time"},
+    ])
+    def test_200_budget(self, query_budget, client, url, sql_statements):
+        """Queries within the budget run with the statement timeout."""
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.json["items"] != []
+        max_cost, timeout = query_budget
+        assert sum(s.startswith("EXPLAIN") for s in sql_statements) >= 1
+        assert any(s == f"SET LOCAL statement_timeout = {timeout}"
+                   for s in sql_statements) == bool(timeout)
+
+    @mark.parametrize("query_budget", [(1e-3, 0)], indirect=True)
+    @mark.parametrize("query", indirect=True, argvalues=[
+        {},
+        {"count": "none"},
+        {"after": "", "sort_by": "+json.time"},
+    ])
+    def test_422_budget(self, query_budget, response_GET):  # noqa N803
+        """GET method fails 422 if the query exceeds the maximum cost."""
+        assert response_GET.status_code == 422
+        assert "hint" in response_GET.json["errors"]
+
+    @mark.parametrize("query_budget", [(0, 10)], indirect=True)
+    def test_503_timeout(self, query_budget, client, url, monkeypatch):
+        """GET method fails 503 if the query exceeds the timeout."""
+        def sleep(*args, **kwargs):
+            db.session.execute(text("SELECT pg_sleep(1)"))
+        monkeypatch.setattr(queries, "OffsetPagination", sleep)
+        response = client.get(url)
+        assert response.status_code == 503
+        assert "hint" in response.json["errors"]
+
+    @mark.parametrize("query", indirect=True, argvalues=[
+        {"fields": "id"},
+        {"fields": "id,execution_datetime,flavor.name,flavor.id"},
+        {"fields": "benchmark.docker_image,tags.name", "per_page": 2},
+        {"fields": "site,json,tags", "sort_by": "+json.time,+id"},
+        {"json_fields": "time,s1.t2,s1.t3", "sort_by": "-id"},
+        {"fields": "id", "json_fields": "s1,other", "after": ""},
+    ])
+    def test_200_fields(self, client, endpoint, response_GET, query):  # noqa N803
+        """GET method returns only the selected fields."""
+        assert response_GET.status_code == 200
+        projection = ("fields", "json_fields")
+        full = client.get(url_for(endpoint, **{
+            k: v for k, v in query.items() if k not in projection
+        }))
+        assert len(response_GET.json["items"]) == len(full.json["items"])
+        assert response_GET.json["items"] != []
+        items = zip(response_GET.json["items"], full.json["items"])
+        for item, expected in items:
+            asserts.match_projection(
+                item, expected, query.get("fields"), query.get("json_fields"),
+            )
+
+    @mark.parametrize("query", indirect=True, argvalues=[
+        {"fields": "id,execution_datetime", "json_fields": "time"},
+    ])
+    def test_200_fields_statements(self, sql_statements, response_GET):  # noqa N803
+        """Only the selected columns and json paths are queried."""
+        assert response_GET.status_code == 200
+        [items] = [x for x in sql_statements if "LIMIT" in x]
+        assert "jsonb_build_object" in items
+        assert "result.json AS" not in items
+        assert "benchmark" not in items.split("FROM")[0]
+        assert not any("tag" in x.split("FROM")[0] for x in sql_statements)
+
+    @mark.parametrize("query_cache", ["memory", "database"], indirect=True)
+    @mark.parametrize("query", indirect=True, argvalues=[
+        {"benchmark_id": benchmarks[0]["id"], "sort_by": "+json.time"},
+    ])
+    def test_200_cached(self, client, url, query_cache, sql_statements):
+        """Repeated queries are served from the cache."""
+        response = client.get(url)
+        sql_statements.clear()
+        cached = client.get(url)
+        assert cached.status_code == 200
+        assert cached.json == response.json
+        assert len(sql_statements) <= 2  # Versions and cache entry
+        info = query_cache.info()
+        assert (info.hits, info.misses, info.currsize) == (1, 1, 1)
+        assert info.nbytes >= len(cached.data)
+
+    @mark.parametrize("query_cache", ["memory", "database"], indirect=True)
+    def test_200_evicted(self, client, endpoint, query_cache, monkeypatch):
+        """The oldest responses are evicted when the cache is full."""
+        monkeypatch.setattr(query_cache, "maxsize", 2)
+        for per_page in [1, 2, 3, 1]:
+            assert client.get(url_for(endpoint, per_page=per_page)).json
+        info = query_cache.info()
+        assert (info.hits, info.misses, info.currsize) == (0, 4, 2)
+
+    @mark.parametrize("query", indirect=True, argvalues=[
+        {"benchmark_id": benchmarks[0]["id"]},
+    ])
+    def test_200_invalidated(self, client, url, query_cache, session):
+        """Cached responses are not used once a result changes."""
+        response = client.get(url)
+        result = models.Result.query.get(response.json["items"][0]["id"])
+        result.tags = []
+        session.flush()
+        updated = client.get(url)
+        assert updated.json["items"][0]["tags"] == []
+        assert query_cache.info().misses == 2
+        models.Result.query.get(result.id).delete()
+        session.flush()
+        deleted = client.get(url)
+        assert deleted.json["total"] == response.json["total"] - 1
+        assert query_cache.info().hits == 0
+
+    @mark.parametrize("tags_ids", [
+        [tags[0]["id"]],
+        [tags[0]["id"], tags[1]["id"]],
+        [tags[0]["id"], tags[1]["id"], tags[2]["id"]],
+        [tags[1]["id"], tags[2]["id"], tags[2]["id"]],
+    ])
+    @mark.parametrize("tags_mode", ["all", "any"])
+    def test_200_tags(self, client, endpoint, tags_ids, tags_mode):
+        """Results include all or any of the tags depending on mode."""
+        response = client.get(url_for(
+            endpoint, tags_ids=tags_ids, tags_mode=tags_mode,
+        ))
+        assert response.status_code == 200
+        ids = sorted(item["id"] for item in response.json["items"])
+        match = all if tags_mode == "all" else any
+        assert ids == sorted(str(x.id) for x in models.Result.query if match(
+            tag_id in x.tags_ids for tag_id in tags_ids
+        ))
+
+    @mark.parametrize("filter, expected", [
+        ("time == 11", ["time >= 11", "time <= 11"]),
+        ("time:number == 1e1", ["time >= 10", "time <= 10"]),
+        ("s1.t2 == 2", ["s1.t2 >= 2", "s1.t2 <= 2"]),
+        ("type == AMD", ["type >= AMD", "type <= AMD"]),
+        ("cpu == TRUE", ["cpu >= true", "cpu <= true"]),
+        ("cpu == false", ["cpu >= false", "cpu <= false"]),
+    ])
+    def test_200_containment(self, client, endpoint, filter, expected):
+        """Equality filters match the same items than value comparison."""
+        response = client.get(url_for(endpoint, filters=[filter]))
+        assert response.status_code == 200
+        compare = client.get(url_for(endpoint, filters=expected))
+        assert compare.status_code == 200
+        ids = sorted(item["id"] for item in response.json["items"])
+        assert ids == sorted(item["id"] for item in compare.json["items"])
+
+    @mark.parametrize("filter, document", [
+        ("s1.t2 == 10", {"s1": {"t2": "10.0"}}),
+        ("s1.t2 in [10, 12]", {"s1": {"t2": "1e1"}}),
+        ("cpu == true", {"cpu": "t"}),
+        ("cpu == False", {"cpu": "no"}),
+    ])
+    def test_200_cast(self, client, endpoint, filter, document):
+        """Inferred numbers and booleans match strings cast to the value."""
+        result = factories.DBResult(
+            benchmark__id=benchmarks[0]["id"], flavor__id=flavors[0]["id"],
+            json=document,
+        )
+        response = client.get(url_for(endpoint, filters=[filter]))
+        assert response.status_code == 200
+        assert str(result.id) in [x["id"] for x in response.json["items"]]
+
+    @mark.parametrize("filter, document", [
+        ("has == 1", {"has": 1}),
+        ("in > 0", {"in": 1}),
+        ("and == yes", {"and": "yes"}),
+        ("s1.or != x", {"s1": {"or": "y"}}),
+        ("between <= 2", {"between": 2}),
+        ("version == 1,2", {"version": "1,2"}),
+        ("formula == a=b", {"formula": "a=b"}),
+        ("check == !ok", {"check": "!ok"}),
+        ("range == <10>", {"range": "<10>"}),
+    ])
+    def test_200_legacy(self, client, endpoint, filter, document):
+        """Filters written before the filter language are accepted."""
+        result = factories.DBResult(
+            benchmark__id=benchmarks[0]["id"], flavor__id=flavors[0]["id"],
+            json=document,
+        )
+        response = client.get(url_for(endpoint, filters=[filter]))
+        assert response.status_code == 200
+        assert [x["id"] for x in response.json["items"]] == [str(result.id)]
+
+    @mark.parametrize("filter, match", [
+        ("time in [10, 12]", lambda x: x.get("time") in (10, 12)),
+        ("time between 10 and 11", lambda x: 10 <= x.get("time") <= 11),
+        ("time:number between -2 and 2e0", lambda x: -2 <= x["time"] <= 2),
+        ("has s1.t2", lambda x: "t2" in x.get("s1", {})),
+        ("has cpu or type == AMD", lambda x: "cpu" in x or "type" in x),
+        ("(time < 0 or time > 11) and has s1",
+         lambda x: "s1" in x and not 0 <= x["time"] <= 11),
+        ("other:string == two", lambda x: x.get("other") == "two"),
+        ("other:number == 1", lambda x: x.get("other") == 1.0),
+        ('type == "AMD"', lambda x: x.get("type") == "AMD"),
+        ("type != AMD", lambda x: x.get("type", "AMD") != "AMD"),
+        ("s1.t2 in [2, 11] and time >= 11", lambda x: x.get("time") == 11),
+    ])
+    def test_200_language(self, client, endpoint, filter, match):
+        """Filters return the results matching the condition."""
+        response = client.get(url_for(endpoint, filters=[filter]))
+        assert response.status_code == 200
+        ids = sorted(item["id"] for item in response.json["items"])
+        assert ids == sorted(
+            str(x.id) for x in models.Result.query if match(x.json)
+        )
+
     @mark.parametrize("query", indirect=True, argvalues=[
         {"filters": ["time <> a"]},
+        {"filters": ["time in [1, 2"]},
+        {"filters": ["time between 1"]},
+        {"filters": ["time between 1 and a"]},
+        {"filters": ["time:integer > 1"]},
+        {"filters": ["time:number > nan"]},
+        {"filters": ["cpu:boolean == 5"]},
+        {"filters": ["has time:number"]},
+        {"filters": ["time == 1 and"]},
+        {"filters": ["(time == 1"]},
         {"bad_key": "This is a non expected query key"},
         {"sort_by": "Bad sort command"},
+        {"fields": "bad_field"},
+        {"fields": "benchmark.bad_field"},
+        {"fields": "json.time"},
+        {"json_fields": "time..t2"},
         {"uploader_email": "sub_1@email.com"},  # GDPR protected
+        {"after": "not-a-cursor"},
+        {"tags_ids": [tags[0]["id"]], "tags_mode": "none"},
+        {"count": "approximate"},
+        {"after": "WzFd", "sort_by": "+json.time"},  # Missing keys
     ])
     def test_422(self, response_GET):  # noqa N803
         """GET method fails 422 if bad request body."""
@@ -94,6 +443,40 @@ class TestCreate:
         result = models.Result.query.get(response_POST.json["id"])
         asserts.match_result(response_POST.json, result)
 
+    @mark.parametrize("token_sub", [users[0]["sub"]], indirect=True)
+    @mark.parametrize("token_iss", [users[0]["iss"]], indirect=True)
+    @mark.parametrize("query", indirect=True, argvalues=[post_query])
+    @mark.parametrize("body", indirect=True, argvalues=[
+        {"json_field_1": "Content", "time": 10},
+    ])
+    def test_201_validators(self, client, url, headers, body):
+        """POST method reuses the compiled benchmark validator."""
+        def lookups(result):
+            name = "json_schema_validator_lookups_total"
+            return REGISTRY.get_sample_value(name, {"result": result}) or 0
+
+        validators.clear()
+        hits, misses = lookups("hit"), lookups("miss")
+        for _ in range(3):
+            response = client.post(url, headers=headers, json=body)
+            assert response.status_code == 201
+        assert (lookups("hit"), lookups("miss")) == (hits + 2, misses + 1)
+        assert list(validators._cache) == [post_query["benchmark_id"]]
+
+    @mark.parametrize("token_sub", [users[0]["sub"]], indirect=True)
+    @mark.parametrize("token_iss", [users[0]["iss"]], indirect=True)
+    @mark.parametrize("query", indirect=True, argvalues=[post_query])
+    @mark.parametrize("body", indirect=True, argvalues=[
+        {"json_field_1": "Content", "time": 10},
+    ])
+    def test_201_validators_outdated(self, client, url, headers, body):
+        """POST method compiles again a schema changed by other worker."""
+        benchmark = models.Benchmark.query.get(post_query["benchmark_id"])
+        validators.get(benchmark)
+        benchmark.json_schema = {**benchmark.json_schema, "required": ["x"]}
+        response = client.post(url, headers=headers, json=body)
+        assert response.status_code == 422
+
     @mark.parametrize("token_sub", [None], indirect=True)
     @mark.parametrize("token_iss", [None], indirect=True)
     @mark.parametrize("body", indirect=True, argvalues=[
@@ -160,6 +543,212 @@ class TestCreate:
         assert response_POST.status_code == 422
 
 
+@mark.parametrize("endpoint", ["results.batch"], indirect=True)
+class TestBatch:
+    """Test results batch create endpoint."""
+
+    @mark.parametrize("token_sub", [users[0]["sub"]], indirect=True)
+    @mark.parametrize("token_iss", [users[0]["iss"]], indirect=True)
+    @mark.parametrize("body", indirect=True, argvalues=[
+        [batch_record],
+        [batch_record, {**batch_record, "tags_ids": []}],
+        [{k: v for k, v in batch_record.items() if k != "tags_ids"}] * 3,
+    ])
+    def test_200(self, response_POST, body):  # noqa N803
+        """POST method succeeded 200 creating all records."""
+        assert response_POST.status_code == 200
+        assert response_POST.json["created"] == len(body)
+        assert response_POST.json["failed"] == 0
+        for index, item in enumerate(response_POST.json["items"]):
+            assert item["index"] == index and item["status"] == 201
+            result = models.Result.query.get(item["id"])
+            assert result.json == body[index]["json"]
+            assert result.benchmark_name == result.benchmark.name
+            assert result.site_id == result.flavor.site_id
+            assert result.uploader.sub == users[0]["sub"]
+            assert sorted(str(x) for x in result.tags_ids) == \
+                sorted(body[index].get("tags_ids", []))
+
+    @mark.parametrize("token_sub", [users[0]["sub"]], indirect=True)
+    @mark.parametrize("token_iss", [users[0]["iss"]], indirect=True)
+    @mark.parametrize("record, status", [
+        ({**batch_record, "benchmark_id": str(uuid4())}, 404),
+        ({**batch_record, "flavor_id": str(uuid4())}, 404),
+        ({**batch_record, "tags_ids": [str(uuid4())]}, 404),
+        ({**batch_record, "benchmark_id": str(benchmarks[2]["id"])}, 422),
+        ({**batch_record, "flavor_id": str(flavors[4]["id"])}, 422),
+        ({**batch_record, "json": {"time": "not-integer"}}, 422),
+        ({**batch_record, "execution_datetime": "9999-01-01T00:00:00Z"}, 422),
+        ({**batch_record, "execution_datetime": "2020-05-21T10:31:00"}, 422),
+        ({k: v for k, v in batch_record.items() if k != "json"}, 422),
+        ("not-an-object", 422),
+    ])
+    def test_200_failed(self, client, url, headers, record, status):
+        """POST method succeeded 200 creating only valid records."""
+        body = [batch_record, record, batch_record]
+        response = client.post(url, headers=headers, json=body)
+        assert response.status_code == 200
+        assert response.json["created"] == 2
+        assert response.json["failed"] == 1
+        statuses = [item["status"] for item in response.json["items"]]
+        assert statuses == [201, status, 201]
+        assert "errors" in response.json["items"][1]
+        assert "id" not in response.json["items"][1]
+
+    @mark.parametrize("token_sub", [users[0]["sub"]], indirect=True)
+    @mark.parametrize("token_iss", [users[0]["iss"]], indirect=True)
+    def test_200_ndjson(self, client, url, headers):
+        """POST method succeeded 200 with newline delimited records."""
+        lines = [json.dumps(batch_record), "", "{not-json", json.dumps({
+            **batch_record, "json": {"time": 11},
+        })]
+        response = client.post(
+            url, headers=headers, data="\n".join(lines),
+            content_type="application/x-ndjson",
+        )
+        assert response.status_code == 200
+        statuses = [item["status"] for item in response.json["items"]]
+        assert statuses == [201, 422, 201]
+        result = models.Result.query.get(response.json["items"][2]["id"])
+        assert result.json == {"time": 11}
+
+    @mark.parametrize("token_sub", [users[0]["sub"]], indirect=True)
+    @mark.parametrize("token_iss", [users[0]["iss"]], indirect=True)
+    def test_200_statements(self, client, url, headers, sql_statements):
+        """Referenced items are collected once per batch."""
+        response = client.post(url, headers=headers, json=[batch_record])
+        assert response.status_code == 200
+        single = len(sql_statements)
+        sql_statements.clear()
+        body = [batch_record] * 10
+        response = client.post(url, headers=headers, json=body)
+        assert response.status_code == 200
+        assert response.json["created"] == 10
+        assert len(sql_statements) == single
+
+    @mark.parametrize("token_sub", [None], indirect=True)
+    @mark.parametrize("token_iss", [None], indirect=True)
+    @mark.parametrize("body", indirect=True, argvalues=[[batch_record]])
+    def test_401(self, response_POST):  # noqa N803
+        """POST method fails 401 if not authorized."""
+        assert response_POST.status_code == 401
+
+    @mark.parametrize("token_sub", ["no-registered"], indirect=True)
+    @mark.parametrize("token_iss", [users[0]["iss"]], indirect=True)
+    @mark.parametrize("body", indirect=True, argvalues=[[batch_record]])
+    def test_403(self, response_POST):  # noqa N803
+        """POST method fails 403 if user not registered."""
+        assert response_POST.status_code == 403
+
+    def test_403_uploader(self, app, url):
+        """Batch records are not processed without a registered uploader."""
+        user_infos = UserInfos(
+            access_token_info=None, introspection_info=None,
+            user_info={'sub': "no-registered", 'iss': users[0]["iss"]},
+        )
+        count = models.Result.query.count()
+        with app.test_request_context(url, json=[batch_record]):
+            with raises(HTTPException) as excinfo:
+                getattr(routes, "__batch")(user_infos)
+        assert excinfo.value.code == 403
+        assert models.Result.query.count() == count
+
+    @mark.parametrize("token_sub", [users[0]["sub"]], indirect=True)
+    @mark.parametrize("token_iss", [users[0]["iss"]], indirect=True)
+    @mark.parametrize("body", indirect=True, argvalues=[
+        batch_record,  # Not a list
+        [batch_record] * 3,  # Over the limit
+    ])
+    def test_422(self, app, monkeypatch, client, url, headers, body):
+        """POST method fails 422 if the body is not a valid batch."""
+        monkeypatch.setitem(app.config, "RESULTS_BATCH_LIMIT", 2)
+        count = models.Result.query.count()
+        response = client.post(url, headers=headers, json=body)
+        assert response.status_code == 422
+        assert models.Result.query.count() == count
+
+
+@mark.parametrize("endpoint", ["results.explain"], indirect=True)
+class TestExplain:
+    """Test results explain endpoint."""
+
+    @mark.parametrize("query", indirect=True, argvalues=[
+        {},
+        {"filters": ["time in [10, 12]"], "benchmark_id": benchmarks[0]["id"]},
+        {"filters": ["has s1.t2"], "count": "estimate"},
+        {"after": "", "sort_by": "+json.time", "fields": "id"},
+    ])
+    def test_200(self, response_GET, query):  # noqa N803
+        """GET method succeeded 200 with the statements to run."""
+        assert response_GET.status_code == 200
+        assert response_GET.json.get("max_cost") is None
+        statements = response_GET.json["statements"]
+        exact = "after" not in query and "count" not in query
+        assert len(statements) == (2 if exact else 1)
+        for statement in statements:
+            assert statement["statement"].startswith("SELECT")
+            assert statement["cost"] > 0
+            assert statement["plan"]["Node Type"]
+
+    @mark.parametrize("query", indirect=True, argvalues=[
+        {"filters": ["time==10", "(has cpu)or type in [AMD,\"1e3\"]"]},
+    ])
+    def test_200_filters(self, response_GET):  # noqa N803
+        """Filters are returned as interpreted by the server."""
+        assert response_GET.status_code == 200
+        assert response_GET.json["filters"] == [
+            "time == 10", 'has cpu or type in [AMD, "1e3"]',
+        ]
+
+    @mark.parametrize("query", indirect=True, argvalues=[
+        {"filters": ["time == 10"]},
+        {"filters": ["time in [10, 12]"]},
+        {"filters": ["has s1.t2"]},
+    ])
+    def test_200_indexes(self, session, client, url):
+        """Equality, in and has filters can use the json index."""
+        session.execute(text("SET LOCAL enable_seqscan = off"))  # Few rows
+        # On few rows scanning all the results is cheaper than the json index
+        session.execute(text("DROP INDEX ix_result_benchmark_flavor"))
+        response = client.get(url)
+        assert response.status_code == 200
+        indexes = response.json["statements"][0]["indexes"]
+        assert "ix_result_json_path_ops" in indexes
+
+    @mark.parametrize("promoted_paths, query", indirect=True, argvalues=[
+        ([(str(benchmarks[0]["id"]), ("time",), "number")],
+         {"benchmark_id": benchmarks[0]["id"], "filters": ["time < 11"]}),
+        ([(str(benchmarks[0]["id"]), ("time",), "number")],
+         {"benchmark_id": benchmarks[0]["id"], "sort_by": "-json.time"}),
+        ([(str(benchmarks[0]["id"]), ("type",), "string")],
+         {"benchmark_id": benchmarks[0]["id"], "filters": ["type == AMD"]}),
+        ([(str(benchmarks[0]["id"]), ("type",), "string")],
+         {"benchmark_id": benchmarks[0]["id"], "sort_by": "+json.type"}),
+    ])
+    def test_200_promoted(self, promoted_indexes, session, client, url):
+        """Filters and sorting on promoted paths can use their index."""
+        session.execute(text("SET LOCAL enable_seqscan = off"))  # Few rows
+        response = client.get(url)
+        assert response.status_code == 200
+        indexes = response.json["statements"][0]["indexes"]
+        assert promoted_indexes[0].name in indexes
+
+    @mark.parametrize("query_budget", [(1e6, 0)], indirect=True)
+    def test_200_budget(self, query_budget, response_GET):  # noqa N803
+        """The maximum cost of the statements is returned."""
+        assert response_GET.status_code == 200
+        assert response_GET.json["max_cost"] == 1e6
+
+    @mark.parametrize("query", indirect=True, argvalues=[
+        {"filters": ["time <> a"]},
+        {"filters": ["time:number == 1e3e3"]},
+        {"bad_key": "This is a non expected query key"},
+    ])
+    def test_422(self, response_GET):  # noqa N803
+        """GET method fails 422 if bad request body."""
+        assert response_GET.status_code == 422
+
+
 @mark.parametrize("endpoint", ["results.search"], indirect=True)
 class TestSearch:
     """Tests results search endpoint."""
@@ -173,6 +762,8 @@ class TestSearch:
         {"terms[]": [sites[0]["name"], flavors[0]["name"]]},
         {"terms": [tag["name"] for tag in tags[0:1]]},
         {"terms[]": [tag["name"] for tag in tags[0:4:2]]},
+        {"terms": [sites[0]["address"]]},
+        {"terms": ["site", "fla"]},  # Words prefix
         {"terms": []},  # Empty terms
         {"terms[]": []},  # Empty terms
         {"sort_by": "+json"},
@@ -193,6 +784,74 @@ class TestSearch:
             asserts.match_result(item, result)
             assert not result.deleted
 
+    @mark.parametrize("query", indirect=True, argvalues=[
+        {"terms": ["site"], "fields": "id,site.name"},
+        {"terms": ["site"], "json_fields": "time", "sort_by": "+id"},
+    ])
+    def test_200_fields(self, client, endpoint, response_GET, query):  # noqa N803
+        """GET method returns only the selected fields."""
+        assert response_GET.status_code == 200
+        projection = ("fields", "json_fields")
+        full = client.get(url_for(endpoint, **{
+            k: v for k, v in query.items() if k not in projection
+        }))
+        assert response_GET.json["items"] != []
+        items = zip(response_GET.json["items"], full.json["items"])
+        for item, expected in items:
+            asserts.match_projection(
+                item, expected, query.get("fields"), query.get("json_fields"),
+            )
+
+    @mark.parametrize("model, item_id, properties", [
+        (models.Site, sites[0]["id"], {"name": "renamed"}),
+        (models.Flavor, flavors[0]["id"], {"name": "renamed"}),
+        (models.Tag, tags[0]["id"], {"name": "renamed"}),
+    ])
+    def test_200_renamed(self, client, endpoint, session, model, item_id,
+                         properties):
+        """Search matches the current names of the result items."""
+        model.query.get(item_id).update(properties)
+        session.flush()
+        response = client.get(url_for(endpoint, terms=["renamed"]))
+        assert response.status_code == 200
+        assert response.json["items"] != []
+        for item in response.json["items"]:
+            result = models.Result.query.get(item["id"])
+            assert item_id in [x.id for x in [
+                result.site, result.flavor, *result.tags
+            ]]
+
+    def test_200_tagged(self, client, endpoint, session):
+        """Search matches the tags added to a result."""
+        result = models.Result.query.get(results[4]["id"])
+        result.tags = [models.Tag.query.get(tags[3]["id"])]
+        session.flush()
+        response = client.get(url_for(endpoint, terms=[tags[3]["name"]]))
+        assert response.status_code == 200
+        assert [x["id"] for x in response.json["items"]] == [str(result.id)]
+
+    @mark.parametrize("query", indirect=True, argvalues=[
+        {"terms": []},
+        {"terms": [benchmarks[0]["docker_image"]], "sort_by": "+site_name"},
+    ])
+    def test_200_statements(self, client, url, sql_statements):
+        """Items and nested fields are loaded using fixed statements."""
+        response = client.get(url)
+        assert response.status_code == 200
+        assert len(response.json["items"]) > 1
+        assert len(sql_statements) <= 4  # Versions, items, total and tags
+
+    @mark.parametrize("query", indirect=True, argvalues=[
+        {"terms": [benchmarks[0]["docker_image"]]},
+    ])
+    def test_200_cached(self, client, url, query_cache):
+        """Repeated searches are served from the cache."""
+        response = client.get(url)
+        assert client.get(url).json == response.json
+        assert client.get(url + "&per_page=1").status_code == 200
+        info = query_cache.info()
+        assert (info.hits, info.misses) == (1, 2)
+
     @mark.parametrize("query", indirect=True, argvalues=[
         {"bad_key": "This is a non expected query key"},
         {"sort_by": "Bad sort command"},
@@ -201,6 +860,290 @@ class TestSearch:
         """GET method fails 422 if bad request body."""
         assert response_GET.status_code == 422
 
+    @mark.parametrize("query_budget", [(1e-3, 0)], indirect=True)
+    @mark.parametrize("query", indirect=True, argvalues=[
+        {"terms": [benchmarks[0]["docker_image"]]},
+    ])
+    def test_422_budget(self, query_budget, response_GET):  # noqa N803
+        """GET method fails 422 if the query exceeds the maximum cost."""
+        assert response_GET.status_code == 422
+        assert "hint" in response_GET.json["errors"]
+
+
+@mark.parametrize("endpoint", ["results.stats"], indirect=True)
+class TestStats:
+    """Test results statistics endpoint."""
+
+    @mark.parametrize("query", indirect=True, argvalues=[
+        {"path": "time"},
+        {"path": "time", "benchmark_id": benchmarks[0]["id"]},
+        {"path": "time", "percentiles": [0.1, 0.5, 1.0]},
+        {"path": "time", "filters": ["time > 5"], "tags_ids": tags[0]["id"]},
+        {"path": "s1.t2", "upload_after": "2010-01-01"},
+        {"path": "other"},  # Not all values are numbers
+    ])
+    def test_200(self, client, response_GET, url, query):  # noqa N803
+        """GET method succeeded 200."""
+        assert response_GET.status_code == 200
+        assert response_GET.json["path"] == query["path"]
+        assert "group_by" not in response_GET.json
+        [item] = response_GET.json["items"]
+        assert "id" not in item and "name" not in item
+        values = self.values(client, url, query["path"])
+        percentiles = query.get("percentiles", [0.5, 0.9, 0.99])
+        asserts.match_stats(item, values, percentiles)
+
+    @mark.parametrize("query", indirect=True, argvalues=[
+        {"path": "time", "group_by": "site"},
+        {"path": "time", "group_by": "flavor"},
+        {"path": "time", "group_by": "benchmark"},
+        {"path": "time", "group_by": "tag"},
+    ])
+    def test_200_group_by(self, client, response_GET, query):  # noqa N803
+        """GET method succeeded 200 with a group per item."""
+        group_by = query["group_by"]
+        assert response_GET.status_code == 200
+        assert response_GET.json["group_by"] == group_by
+        names = [item["name"] for item in response_GET.json["items"]]
+        assert names == sorted(names) and len(names) > 1
+        for item in response_GET.json["items"]:
+            key = f"{group_by}_id" if group_by != "tag" else "tags_ids"
+            url = url_for("results.list", **{key: item["id"]})
+            values = self.values(client, url, "time")
+            asserts.match_stats(item, values, [0.5, 0.9, 0.99])
+
+    @mark.parametrize("query", indirect=True, argvalues=[
+        {"path": "time", "benchmark_id": uuid4()},
+        {"path": "not.a.path"},
+    ])
+    def test_200_empty(self, response_GET):  # noqa N803
+        """GET method succeeded 200 with no values to aggregate."""
+        assert response_GET.status_code == 200
+        assert response_GET.json["items"] == [
+            {"count": 0, "percentiles": {}}
+        ]
+
+    @mark.parametrize("query", indirect=True, argvalues=[
+        {"path": "time", "group_by": "site"},
+    ])
+    def test_200_statements(self, client, url, sql_statements):
+        """Statistics are calculated in a single statement."""
+        response = client.get(url)
+        assert response.status_code == 200
+        assert len(sql_statements) <= 2  # Versions and statistics
+
+    @mark.parametrize("query", indirect=True, argvalues=[
+        {},  # Missing path
+        {"path": "time", "group_by": "uploader"},
+        {"path": "time", "percentiles": [1.5]},
+        {"path": "time..other"},
+        {"path": "time", "filters": ["time > 5 bad"]},
+        {"path": "time", "bad_key": "This is a non expected query key"},
+    ])
+    def test_422(self, response_GET):  # noqa N803
+        """GET method fails 422 if bad request body."""
+        assert response_GET.status_code == 422
+
+    @staticmethod
+    def values(client, url, path):
+        """Return the numbers on the path of the listed results."""
+        parsed = parse.urlparse(url)
+        query = parse.parse_qs(parsed.query)
+        query.pop("path", None), query.pop("group_by", None)
+        query.pop("percentiles", None)
+        response = client.get(url_for("results.list", **query))
+        values = []
+        for item in response.json["items"]:
+            value = item["json"]
+            for key in path.split("."):
+                value = value.get(key) if isinstance(value, dict) else None
+            if type(value) in (int, float):
+                values.append(value)
+        return values
+
+
+@mark.parametrize("endpoint", ["results.export"], indirect=True)
+class TestExport:
+    """Test results export endpoint."""
+
+    @mark.parametrize("query", indirect=True, argvalues=[
+        {},  # Unsorted
+        {"sort_by": "+id"},
+        {"sort_by": "-id", "benchmark_id": benchmarks[0]["id"]},
+        {"sort_by": "+id", "filters": ["time > 5"]},
+        {"sort_by": "+id", "tags_ids": [tags[0]["id"]]},
+        {"sort_by": "+id", "fields": "id,flavor.name", "json_fields": "s1"},
+    ])
+    def test_200_ndjson(self, client, response_GET, query):  # noqa N803
+        """GET method streams the results as JSON lines."""
+        assert response_GET.status_code == 200
+        assert response_GET.is_streamed
+        assert response_GET.mimetype == "application/x-ndjson"
+        lines = response_GET.get_data(as_text=True).splitlines()
+        query = {"sort_by": "+id", **query}
+        expected = client.get(url_for("results.list", per_page=100, **query))
+        assert lines != []
+        items = [json.loads(x) for x in lines]
+        if query.get("sort_by") == "+id":
+            items.sort(key=lambda x: x["id"])  # Export without order
+        assert items == expected.json["items"]
+
+    @mark.parametrize("query", indirect=True, argvalues=[
+        {"format": "csv", "sort_by": "+id"},
+        {"format": "csv", "sort_by": "+id", "fields": "id,site,tags"},
+        {"format": "csv", "sort_by": "+id", "json_fields": "time,s1"},
+    ])
+    def test_200_csv(self, client, response_GET, query):  # noqa N803
+        """GET method streams the results as flattened csv lines."""
+        assert response_GET.status_code == 200
+        assert response_GET.mimetype == "text/csv"
+        rows = list(csv.DictReader(
+            response_GET.get_data(as_text=True).splitlines()
+        ))
+        query = {k: v for k, v in query.items() if k != "format"}
+        expected = client.get(url_for("results.list", per_page=100, **query))
+        assert len(rows) == len(expected.json["items"]) > 0
+        for row, item in zip(rows, expected.json["items"]):
+            asserts.match_row(row, item)
+
+    @mark.parametrize("query", indirect=True, argvalues=[
+        {"sort_by": "+id"},
+        {"format": "csv", "sort_by": "+id"},
+    ])
+    def test_200_batches(self, client, url, query, sql_statements,
+                         monkeypatch, app):
+        """Results are read in batches from a cursor, without count."""
+        expected = client.get(url).data
+        monkeypatch.setitem(app.config, "RESULTS_EXPORT_BATCH_SIZE", 2)
+        sql_statements.clear()
+        response = client.get(url)
+        assert response.data == expected
+        assert not any("count(" in x for x in sql_statements)
+        assert not any("LIMIT" in x for x in sql_statements)
+
+    @mark.parametrize("query", indirect=True, argvalues=[
+        {"format": "parquet", "sort_by": "+id"},
+    ])
+    def test_200_parquet(self, client, response_GET):  # noqa N803
+        """GET method streams the results as a parquet file."""
+        parquet = importorskip("pyarrow.parquet")
+        assert response_GET.status_code == 200
+        table = parquet.read_table(io.BytesIO(response_GET.data))
+        expected = client.get(url_for("results.list", sort_by="+id"))
+        rows = table.to_pylist()
+        assert [row["id"] for row in rows] == \
+            [item["id"] for item in expected.json["items"]]
+        for row, item in zip(rows, expected.json["items"]):
+            assert row["json.time"] == item["json"].get("time")
+
+    @mark.parametrize("query", indirect=True, argvalues=[
+        {"format": "parquet", "sort_by": "+id"},
+    ])
+    def test_200_snapshot(self, client, url, session, monkeypatch):
+        """Columns and rows are read from the same database snapshot."""
+        parquet = importorskip("pyarrow.parquet")
+        session.close()  # The request begins the transaction
+        modify = text("UPDATE result SET json = CAST(:json AS jsonb) "
+                      "WHERE id = :id")
+        json_paths = exports.json_paths
+
+        def json_paths_modified(*args, **kwargs):
+            paths = json_paths(*args, **kwargs)
+            with db.engine.begin() as connection:  # Concurrent upload
+                connection.execute(modify, dict(
+                    id=results[0]["id"], json=json.dumps({"time": "slow"}),
+                ))
+            return paths
+
+        monkeypatch.setattr(exports, "json_paths", json_paths_modified)
+        try:
+            response = client.get(url)
+        finally:
+            with db.engine.begin() as connection:
+                connection.execute(modify, dict(
+                    id=results[0]["id"], json=json.dumps(results[0]["json"]),
+                ))
+        assert response.status_code == 200
+        table = parquet.read_table(io.BytesIO(response.data))
+        times = {row["id"]: row["json.time"] for row in table.to_pylist()}
+        assert times[str(results[0]["id"])] == results[0]["json"]["time"]
+
+    @mark.parametrize("query", indirect=True, argvalues=[
+        {"format": "csv"},
+    ])
+    def test_500(self, client, url, monkeypatch, app):
+        """GET method fails 500 if the first batch cannot be written."""
+        def writer(items, columns, batch_size):
+            raise RuntimeError("Broken writer")
+            yield  # pragma: no cover
+
+        monkeypatch.setitem(exports.writers, "csv", (writer, "text/csv"))
+        monkeypatch.setitem(app.config, "PROPAGATE_EXCEPTIONS", False)
+        response = client.get(url)
+        assert response.status_code == 500
+
+    @mark.parametrize("query", indirect=True, argvalues=[
+        {"format": "parquet"},
+    ])
+    def test_422_unavailable(self, client, url, monkeypatch):
+        """GET method fails 422 if the format is not installed."""
+        monkeypatch.setattr(exports, "pyarrow", None)
+        response = client.get(url)
+        assert response.status_code == 422
+
+    @mark.parametrize("query", indirect=True, argvalues=[
+        {"format": "xml"},
+        {"filters": ["time <> a"]},
+        {"sort_by": "Bad sort command"},
+        {"fields": "bad_field"},
+        {"per_page": 100},
+    ])
+    def test_422(self, response_GET):  # noqa N803
+        """GET method fails 422 if bad request query."""
+        assert response_GET.status_code == 422
+
+
+@mark.parametrize("endpoint", ["results.cache_info"], indirect=True)
+class TestCacheInfo:
+    """Test results query cache statistics endpoint."""
+
+    @mark.usefixtures("grant_admin")
+    @mark.parametrize("token_sub", [users[0]["sub"]], indirect=True)
+    @mark.parametrize("token_iss", [users[0]["iss"]], indirect=True)
+    @mark.parametrize("query_cache", ["memory", "database"], indirect=True)
+    def test_200(self, client, headers, url, query_cache):
+        """GET method succeeded 200."""
+        client.get(url_for("results.list"))
+        client.get(url_for("results.list"))
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        assert response.json == {
+            "backend": query_cache.name, "hits": 1, "misses": 1,
+            "hit_rate": 0.5, "maxsize": query_cache.maxsize,
+            "currsize": 1, "nbytes": query_cache.info().nbytes,
+        }
+
+    @mark.usefixtures("grant_admin")
+    @mark.parametrize("token_sub", [users[0]["sub"]], indirect=True)
+    @mark.parametrize("token_iss", [users[0]["iss"]], indirect=True)
+    @mark.parametrize("query_cache", ["none"], indirect=True)
+    def test_200_disabled(self, query_cache, response_GET):  # noqa N803
+        """GET method succeeded 200 when the cache is disabled."""
+        assert response_GET.status_code == 200
+        assert response_GET.json["backend"] == "none"
+
+    @mark.parametrize("token_sub", [None], indirect=True)
+    @mark.parametrize("token_iss", [None], indirect=True)
+    def test_401(self, response_GET):  # noqa N803
+        """GET method fails 401 if not authorized."""
+        assert response_GET.status_code == 401
+
+    @mark.parametrize("token_sub", [users[0]["sub"]], indirect=True)
+    @mark.parametrize("token_iss", [users[0]["iss"]], indirect=True)
+    def test_403(self, response_GET):  # noqa N803
+        """GET method fails 403 if forbidden."""
+        assert response_GET.status_code == 403
+
 
 @mark.parametrize("endpoint", ["results.get"], indirect=True)
 @mark.parametrize("result_id", indirect=True, argvalues=[
@@ -214,6 +1157,28 @@ class TestGet:
         """GET method succeeded 200."""
         assert response_GET.status_code == 200
         asserts.match_result(response_GET.json, result)
+        assert response_GET.headers["ETag"]
+        assert "public" in response_GET.headers["Cache-Control"]
+
+    def test_304(self, client, url, response_GET, sql_statements):  # noqa N803
+        """GET method returns 304 if the result did not change."""
+        etag = response_GET.headers["ETag"]
+        sql_statements.clear()
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.data == b""
+        assert response.headers["ETag"] == etag
+        assert len(sql_statements) == 1  # Only table versions
+
+    def test_200_modified(self, client, url, result, response_GET, session):  # noqa N803
+        """GET method returns 200 if a nested relationship changed."""
+        etag = response_GET.headers["ETag"]
+        result.tags = []
+        session.flush()
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+        assert response.json["tags"] == []
 
     @mark.parametrize("request_id", [uuid4()], indirect=True)
     def test_404(self, response_GET):  # noqa N803
@@ -39,6 +39,22 @@ class TestList:
             asserts.match_site(item, site)
             assert site.status.name == "approved"
 
+    def test_304(self, client, url, response_GET):  # noqa N803
+        """GET method returns 304 if the sites did not change."""
+        etag = response_GET.headers["ETag"]
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+
+    def test_200_modified(self, client, url, response_GET, session):  # noqa N803
+        """GET method returns 200 if the sites changed."""
+        etag = response_GET.headers["ETag"]
+        models.Site.query.first().description = "Modified description"
+        session.flush()
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
     @mark.parametrize("query", indirect=True, argvalues=[
         {"bad_key": "This is a non expected query key"},
         {"sort_by": "Bad sort command"},
@@ -120,6 +136,7 @@ class TestSearch:
         {"terms[]": [sites[0]["description"]]},
         {"terms": [sites[0]["name"], sites[0]["description"]]},
         {"terms[]": [sites[0]["name"], sites[0]["description"]]},
+        {"terms": ["addr", "site"]},  # Words prefix
         {"terms": []},  # Empty terms
         {"terms[]": []},  # Empty terms
         {"sort_by": "+name,-address"},
@@ -182,6 +199,9 @@ class TestUpdate:
         assert response_PUT.status_code == 204
         json = schemas.Site().dump(site)
         asserts.match_body(json, body)
+        for result in models.Result.query.filter_by(site_id=site.id):
+            assert result.site_name == site.name
+            assert result.site_address == site.address
 
     @mark.parametrize("token_sub", [None], indirect=True)
     @mark.parametrize("token_iss", [None], indirect=True)
@@ -0,0 +1 @@
+"""Tests for slow queries endpoints."""
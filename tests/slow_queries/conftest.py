@@ -0,0 +1,35 @@
+"""Defines fixtures available to slow queries tests."""
+from flask import url_for
+from pytest import fixture
+
+import factories
+from backend.utils import slowlog
+
+
+@fixture(scope='function')
+def url(endpoint, query):
+    """Fixture that return the url for the request."""
+    return url_for(endpoint, **query)
+
+
+@fixture(scope='function')
+def slow_queries(session):
+    """Return slow queries created for the test."""
+    return [
+        factories.DBSlowQuery(operation="ListResults", calls=3,
+                              total_time=300.0, max_time=150.0),
+        factories.DBSlowQuery(operation="ListResults", calls=1,
+                              total_time=500.0, max_time=500.0),
+        factories.DBSlowQuery(operation="SearchResults", calls=2,
+                              total_time=100.0, max_time=60.0),
+    ]
+
+
+@fixture(scope='function')
+def threshold(app, monkeypatch, request):
+    """Patch the slow query threshold, in milliseconds, for the test."""
+    value = request.param if hasattr(request, 'param') else 1e-6
+    monkeypatch.setitem(app.config, "SLOW_QUERY_THRESHOLD", value)
+    yield value
+    app.config["SLOW_QUERY_THRESHOLD"] = 0  # Do not record the cleanup
+    slowlog.flush()  # Written on the test session, rolled back
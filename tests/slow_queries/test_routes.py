@@ -0,0 +1,171 @@
+"""Functional tests using pytest-flask."""
+from flask import url_for
+from pytest import mark
+from sqlalchemy import event, text
+
+from backend import models
+from backend.extensions import db
+from backend.utils import slowlog
+from tests import asserts
+from tests.db_instances import users
+
+
+@mark.parametrize("endpoint", ["slow_queries.list"], indirect=True)
+class TestList:
+    """Test slow queries list endpoint."""
+
+    @mark.usefixtures("grant_admin", "slow_queries")
+    @mark.parametrize("token_sub", [users[0]["sub"]], indirect=True)
+    @mark.parametrize("token_iss", [users[0]["iss"]], indirect=True)
+    @mark.parametrize("query, order", indirect=["query"], argvalues=[
+        ({}, ("total_time", True)),
+        ({"operation": "ListResults"}, ("total_time", True)),
+        ({"sort_by": "-max_time"}, ("max_time", True)),
+        ({"sort_by": "+calls"}, ("calls", False)),
+    ])
+    def test_200(self, response_GET, url, query, order):  # noqa N803
+        """GET method succeeded 200."""
+        assert response_GET.status_code == 200
+        asserts.match_pagination(response_GET.json, url)
+        items = response_GET.json["items"]
+        assert items != []
+        for item in items:
+            asserts.match_query(item, url)
+            slow_query = models.SlowQuery.query.get(item["fingerprint"])
+            assert item["statement"] == slow_query.statement
+            assert item["parameters"] == slow_query.parameters
+        field, descending = order
+        values = [item[field] for item in items]
+        assert values == sorted(values, reverse=descending)
+
+    @mark.parametrize("token_sub", [None], indirect=True)
+    @mark.parametrize("token_iss", [None], indirect=True)
+    def test_401(self, response_GET):  # noqa N803
+        """GET method fails 401 if not authorized."""
+        assert response_GET.status_code == 401
+
+    @mark.parametrize("token_sub", [users[0]["sub"]], indirect=True)
+    @mark.parametrize("token_iss", [users[0]["iss"]], indirect=True)
+    def test_403(self, response_GET):  # noqa N803
+        """GET method fails 403 if forbidden."""
+        assert response_GET.status_code == 403
+
+    @mark.usefixtures("grant_admin")
+    @mark.parametrize("token_sub", [users[0]["sub"]], indirect=True)
+    @mark.parametrize("token_iss", [users[0]["iss"]], indirect=True)
+    @mark.parametrize("query", indirect=True, argvalues=[
+        {"bad_key": "This is a non expected query key"},
+        {"sort_by": "Bad sort command"},
+    ])
+    def test_422(self, response_GET):  # noqa N803
+        """GET method fails 422 if bad request body."""
+        assert response_GET.status_code == 422
+
+
+@mark.parametrize("endpoint", ["slow_queries.clear"], indirect=True)
+class TestClear:
+    """Test slow queries clear endpoint."""
+
+    @mark.usefixtures("grant_admin", "slow_queries")
+    @mark.parametrize("token_sub", [users[0]["sub"]], indirect=True)
+    @mark.parametrize("token_iss", [users[0]["iss"]], indirect=True)
+    def test_204(self, response_DELETE):  # noqa N803
+        """DELETE method succeeded 204."""
+        assert response_DELETE.status_code == 204
+        assert models.SlowQuery.query.count() == 0
+
+    @mark.usefixtures("slow_queries")
+    @mark.parametrize("token_sub", [None], indirect=True)
+    @mark.parametrize("token_iss", [None], indirect=True)
+    def test_401(self, response_DELETE):  # noqa N803
+        """DELETE method fails 401 if not authorized."""
+        assert response_DELETE.status_code == 401
+        assert models.SlowQuery.query.count() == 3
+
+    @mark.usefixtures("slow_queries")
+    @mark.parametrize("token_sub", [users[0]["sub"]], indirect=True)
+    @mark.parametrize("token_iss", [users[0]["iss"]], indirect=True)
+    def test_403(self, response_DELETE):  # noqa N803
+        """DELETE method fails 403 if forbidden."""
+        assert response_DELETE.status_code == 403
+        assert models.SlowQuery.query.count() == 3
+
+
+class TestSlowLog:
+    """Test the recording of slow statements."""
+
+    def test_recorded(self, client, threshold):
+        """Slow statements are recorded with the route operation."""
+        query = {"filters": ["time > 1"], "sort_by": "-json.time"}
+        assert client.get(url_for("results.list", **query)).status_code == 200
+        slow_queries = models.SlowQuery.query.filter_by(
+            operation="ListResults"
+        ).all()
+        assert slow_queries != []
+        assert any("param_1" in x.parameters for x in slow_queries)
+        assert all(x.plan is None for x in slow_queries)
+
+    def test_accumulated(self, session, threshold):
+        """Executions of a statement are accumulated on a record."""
+        for seconds in [0.02, 0.01]:
+            session.execute(text("SELECT pg_sleep(:s)"), {"s": seconds})
+        assert models.SlowQuery.query.count() == 0  # Written at teardown
+        slowlog.flush()
+        slow_query = models.SlowQuery.query.filter(
+            models.SlowQuery.statement.contains("pg_sleep")
+        ).one()
+        assert slow_query.calls == 2
+        assert slow_query.parameters == {"s": 0.02}
+        assert slow_query.max_time >= 20
+        assert slow_query.total_time >= 30
+
+    @mark.parametrize("threshold", [50], indirect=True)
+    def test_threshold(self, session, threshold):
+        """Statements under the threshold are not recorded."""
+        session.execute(text("SELECT pg_sleep(0.001)"))
+        slowlog.flush()
+        assert models.SlowQuery.query.count() == 0
+
+    def test_explain(self, app, monkeypatch, session, threshold):
+        """Estimated plans of the slow select statements are captured."""
+        monkeypatch.setitem(app.config, "SLOW_QUERY_EXPLAIN", True)
+        session.execute(text("SELECT pg_sleep(0.001)"))
+        session.execute(text("SELECT id FROM result LIMIT 1 FOR UPDATE"))
+        slowlog.flush()
+        slow_query = models.SlowQuery.query.filter(
+            models.SlowQuery.statement.contains("pg_sleep")
+        ).one()
+        assert "Total Cost" in slow_query.plan[0]["Plan"]
+        assert "Actual Total Time" not in slow_query.plan[0]["Plan"]
+        slow_query = models.SlowQuery.query.filter(
+            models.SlowQuery.statement.contains("FOR UPDATE")
+        ).one()
+        assert slow_query.plan[0]["Plan"]["Node Type"] == "Limit"
+
+    def test_request_session(self, client, threshold):
+        """Records are written without taking other connections."""
+        checkedout = []
+        listener = lambda *args: checkedout.append(  # noqa: E731
+            db.engine.pool.checkedout()
+        )
+        event.listen(db.engine.pool, "checkout", listener)
+        query = {"filters": ["time > 1"]}
+        try:
+            response = client.get(url_for("results.list", **query))
+        finally:
+            event.remove(db.engine.pool, "checkout", listener)
+        assert response.status_code == 200
+        assert max(checkedout, default=1) == 1
+        assert models.SlowQuery.query.filter_by(
+            operation="ListResults"
+        ).count() > 0
+
+
+@mark.parametrize("parameters, normalized", [
+    ({"a": 1, "b": None, "c": True}, {"a": 1, "b": None, "c": True}),
+    ({"a": "x" * 200}, {"a": "x" * slowlog.max_length + "..."}),
+    ({"a": b"bytes", "b": [1, "2"]}, {"a": "<5 bytes>", "b": [1, "2"]}),
+])
+def test_normalize(parameters, normalized):
+    """Parameters are normalized into short JSON values."""
+    assert slowlog.normalize(parameters) == normalized
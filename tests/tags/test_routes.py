@@ -36,6 +36,22 @@ class TestList:
             asserts.match_query(item, url)
             asserts.match_tag(item, tag)
 
+    def test_304(self, client, url, response_GET):  # noqa N803
+        """GET method returns 304 if the tags did not change."""
+        etag = response_GET.headers["ETag"]
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+
+    def test_200_modified(self, client, url, response_GET, session):  # noqa N803
+        """GET method returns 200 if the tags changed."""
+        etag = response_GET.headers["ETag"]
+        models.Tag.query.first().description = "Modified description"
+        session.flush()
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
     @mark.parametrize("query", indirect=True, argvalues=[
         {"bad_key": "This is a non expected query key"},
         {"sort_by": "Bad sort command"},
@@ -0,0 +1,60 @@
+"""Functional tests using pytest-flask."""
+import flaat
+from flaat.user_infos import UserInfos
+from flask import g
+from pytest import fixture, mark
+
+from backend import authorization, extensions
+from tests.db_instances import users
+
+
+def infos(sub, iss):
+    """Return user infos for a subject and issuer."""
+    return UserInfos(
+        access_token_info=None, introspection_info=None,
+        user_info={'sub': sub, 'iss': iss},
+    )
+
+
+@fixture(scope='function')
+def introspection(mocker, token_sub, token_iss):
+    """Patch the OIDC provider user infos."""
+    return mocker.patch.object(
+        flaat.BaseFlaat, "get_user_infos_from_access_token",
+        return_value=infos(token_sub, token_iss),
+    )
+
+
+def user_queries(statements):
+    """Return the statements reading the user table."""
+    return [x for x in statements if 'FROM "user"' in x]
+
+
+@mark.parametrize("sub, iss, registered", [
+    (users[0]["sub"], users[0]["iss"], True),
+    ("no-registered", users[0]["iss"], False),
+])
+def test_identity(app, sql_statements, sub, iss, registered):
+    """The request user is read once per request."""
+    for _ in range(2):
+        queries = len(user_queries(sql_statements))
+        with app.test_request_context():
+            for _ in range(3):
+                assert authorization.is_registered(infos(sub, iss)) \
+                    == registered
+                authorization.is_admin(infos(sub, iss))
+        assert len(user_queries(sql_statements)) - queries <= 1
+        assert 'users' not in g and 'admins' not in g
+
+
+@mark.parametrize("token_sub", [users[0]["sub"]], indirect=True)
+@mark.parametrize("token_iss", [users[0]["iss"]], indirect=True)
+def test_user_infos(app, introspection):
+    """User infos are resolved once per request."""
+    method = authorization.Flaat.get_user_infos_from_access_token
+    for _ in range(2):
+        with app.test_request_context():
+            for _ in range(3):
+                user_infos = method(extensions.flaat, "some-access-token")
+                assert user_infos.subject == users[0]["sub"]
+    assert introspection.call_count == 2
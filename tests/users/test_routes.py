@@ -32,6 +32,27 @@ class TestList:
             asserts.match_query(item, url)
             asserts.match_user(item, user)
 
+    @mark.usefixtures('grant_admin')
+    @mark.parametrize("token_sub", [users[0]["sub"]], indirect=True)
+    @mark.parametrize("token_iss", [users[0]["iss"]], indirect=True)
+    @mark.parametrize('query', indirect=True, argvalues=[
+        {'after': "", 'per_page': 1},
+        {'after': "", 'per_page': 1, 'sort_by': "-email"},
+        {'after': (  # Cursor after [iss, sub_0, sub_0, iss]
+            "WyJodHRwczovL2FhaS1kZXYuZWdpLmV1L29pZGMiLCAic3ViXzAiLCAic3ViXzAi"
+            "LCAiaHR0cHM6Ly9hYWktZGV2LmVnaS5ldS9vaWRjIl0="
+        )},
+    ])
+    def test_200_keyset(self, response_GET, url):  # noqa N803
+        """GET method succeeded 200 using cursor pagination."""
+        assert response_GET.status_code == 200
+        asserts.match_keyset(response_GET.json, url)
+        assert response_GET.json['items'] != []
+        for item in response_GET.json['items']:
+            user = models.User.query.get((item['sub'], item['iss']))
+            asserts.match_query(item, url)
+            asserts.match_user(item, user)
+
     @mark.parametrize("token_sub", [None], indirect=True)
     @mark.parametrize("token_iss", [None], indirect=True)
     @mark.parametrize('query', indirect=True, argvalues=[